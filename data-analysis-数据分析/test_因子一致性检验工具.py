@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""因子一致性检验工具 - 回归测试 (python -m pytest)"""
+
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+MODULE_PATH = Path(__file__).with_name('因子一致性检验工具.py')
+spec = importlib.util.spec_from_file_location('factor_checker', MODULE_PATH)
+checker = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(checker)
+
+
+def write_raster(path, data, nodata=None):
+    with rasterio.open(path, 'w', driver='GTiff', width=data.shape[1], height=data.shape[0], count=1,
+                       dtype=data.dtype, transform=from_origin(100, 200, 1, 1), nodata=nodata) as dst:
+        dst.write(data, 1)
+
+
+def test_statistics_exclude_infinite_pixels(tmp_path):
+    data = np.arange(200, dtype=np.float32).reshape(20, 10)
+    data[3, 4] = np.inf
+    data[15, 2] = -np.inf
+    data[7, 7] = np.nan
+    path = str(tmp_path / 'factor.tif')
+    write_raster(path, data)
+
+    # 小行块使 ±inf 出现在不同的块中，也覆盖直方图扩展范围的路径
+    result = checker.compute_raster_statistics(path, block_rows=4)
+
+    finite = data[np.isfinite(data)].astype(np.float64)
+    assert result['infinite_pixels'] == 2
+    assert result['valid_pixels'] == finite.size
+    assert result['min'] == finite.min()
+    assert result['max'] == finite.max()
+    assert result['mean'] == pytest.approx(finite.mean())
+    assert result['std'] == pytest.approx(finite.std())
+    assert sum(result['hist_counts']) == finite.size
+
+
+def test_histogram_rejects_infinite_values():
+    histogram = checker.StreamingHistogram(8)
+    with pytest.raises(ValueError):
+        histogram.update(np.array([1.0, np.inf]))
@@ -2,19 +2,1228 @@
 # -*- coding: utf-8 -*-
 """
 滑坡易发性评价因子一致性检查工具
-GUI界面版本
+GUI界面版本，带目录参数运行时为命令行批处理模式:
+
+    python 因子一致性检验工具.py <因子目录> [--filter *.tif] [--json 报告.json] [--csv 报告.csv]
+
+命令行模式不导入 tkinter 及 pandas/openpyxl，可在无显示环境的服务器上运行。
 """
 
-import tkinter as tk
-from tkinter import ttk, filedialog, messagebox, scrolledtext
 import rasterio
-import pandas as pd
+from rasterio.windows import Window
 import numpy as np
 from pathlib import Path
 import sys
 import os
+import argparse
+import csv
+import hashlib
+import json
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack
 from datetime import datetime
 
+# 并发读取栅格的最大线程数 (网络共享盘上I/O等待为主，线程数可高于CPU核数)
+MAX_WORKERS = 16
+
+# 界面队列轮询间隔 (毫秒) 及每次最多处理的消息数
+UI_POLL_INTERVAL_MS = 50
+UI_BATCH_SIZE = 500
+
+# 扫描目录时每批发送给界面的文件数
+SCAN_BATCH_SIZE = 500
+
+# 深度检查时每次读取的行数
+DEEP_CHECK_BLOCK_ROWS = 256
+
+# 统计直方图的分箱数 (须为偶数，值域扩大时相邻两箱合并)
+HIST_BINS = 64
+
+# 方差膨胀因子超过该值时视为存在严重多重共线性
+VIF_THRESHOLD = 10
+
+# 内容指纹: 每个哈希块的行数，及每个并行任务处理的块数
+FINGERPRINT_BLOCK_ROWS = 512
+FINGERPRINT_SEGMENT_BLOCKS = 8
+FINGERPRINT_STATUS_TEXT = {
+    "unchanged": "未变化",
+    "changed": "内容已变化",
+    "new": "无历史记录",
+    "incomparable": "参数不同无法比较"
+}
+
+# 0-255 各字节值中为1的位数，用于统计打包位掩码
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+# 网格原点允许的偏移 (像元的比例)，超出时视为未对齐
+SNAP_TOLERANCE = 0.01
+
+# 监视模式轮询间隔 (秒)；可用 watchdog 文件系统事件时仅作兜底
+WATCH_INTERVAL_S = 2.0
+WATCH_EVENT_FALLBACK_S = 60.0
+
+# 收到文件系统事件后等待写入完成的时间 (秒)
+WATCH_SETTLE_S = 0.5
+
+# 命令行模式退出码
+EXIT_OK = 0
+EXIT_INCONSISTENT = 1
+EXIT_ERROR = 2
+
+# 元数据缓存默认位置
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".factor_checker", "metadata_cache.sqlite")
+
+
+def filter_extension(pattern):
+    """将文件类型过滤条件 (如 "*.tif") 转为小写扩展名，"*.*" 表示不过滤 (返回None)"""
+    pattern = pattern.strip()
+    if pattern in ("", "*", "*.*"):
+        return None
+    return "." + pattern.lstrip("*.").lower()
+
+
+def iter_raster_files(directory, extension=None):
+    """
+    单次遍历目录树，按名称顺序逐个产出匹配扩展名的文件
+    
+    Parameters:
+    -----------
+    directory : str
+        根目录
+    extension : str, optional
+        小写扩展名 (如 ".tif")，None 表示所有文件
+    
+    Yields:
+    -------
+    os.DirEntry
+        匹配的文件项 (可直接调用 stat() 获取大小和修改时间)
+    """
+    try:
+        with os.scandir(directory) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+    except OSError:
+        return
+    
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_raster_files(entry.path, extension)
+            elif entry.is_file() and (extension is None or entry.name.lower().endswith(extension)):
+                yield entry
+        except OSError:
+            continue
+
+
+def read_raster_info(path):
+    """
+    读取栅格文件的元数据
+    
+    Parameters:
+    -----------
+    path : str
+        栅格文件路径
+    
+    Returns:
+    --------
+    dict
+        尺寸、坐标系、分辨率、范围、无效值及数据类型
+    """
+    with rasterio.open(path) as src:
+        return {
+            'name': Path(path).name,
+            'path': path,
+            'width': src.width,
+            'height': src.height,
+            'total_pixels': src.width * src.height,
+            'crs': str(src.crs) if src.crs else "无",
+            'res_x': src.transform.a,
+            'res_y': abs(src.transform.e),
+            'bounds': tuple(src.bounds),
+            'nodata': src.nodata,
+            'dtype': src.dtypes[0]
+        }
+
+
+def compare_with_reference(info, reference_info):
+    """
+    将因子元数据与参考因子比较
+    
+    Returns:
+    --------
+    list
+        不一致项描述，一致时为空列表
+    """
+    issues = []
+    
+    # 检查尺寸
+    if info['width'] != reference_info['width']:
+        issues.append(f"宽度不一致 ({info['width']} != {reference_info['width']})")
+    if info['height'] != reference_info['height']:
+        issues.append(f"高度不一致 ({info['height']} != {reference_info['height']})")
+    
+    # 检查坐标系
+    if info['crs'] != reference_info['crs']:
+        issues.append("坐标系不一致")
+    
+    # 检查分辨率（允许微小差异）
+    if abs(info['res_x'] - reference_info['res_x']) > 0.001:
+        issues.append(f"X分辨率差异 ({info['res_x']:.6f} != {reference_info['res_x']:.6f})")
+    if abs(info['res_y'] - reference_info['res_y']) > 0.001:
+        issues.append(f"Y分辨率差异 ({info['res_y']:.6f} != {reference_info['res_y']:.6f})")
+    
+    # 检查网格原点 (左上角) 是否落在参考网格上及是否重合
+    if info['crs'] == reference_info['crs']:
+        offset_x = (info['bounds'][0] - reference_info['bounds'][0]) / reference_info['res_x']
+        offset_y = (reference_info['bounds'][3] - info['bounds'][3]) / reference_info['res_y']
+        fraction_x = offset_x - round(offset_x)
+        fraction_y = offset_y - round(offset_y)
+        if abs(fraction_x) > SNAP_TOLERANCE or abs(fraction_y) > SNAP_TOLERANCE:
+            issues.append(f"网格未对齐 (原点偏移 {fraction_x:+.3f}, {fraction_y:+.3f} 像元)")
+        elif round(offset_x) or round(offset_y):
+            issues.append(f"范围不一致 (原点偏移 {round(offset_x):+d}, {round(offset_y):+d} 像元)")
+    
+    return issues
+
+
+def write_aligned_vrt(path, reference_info, vrt_path, resampling=None):
+    """
+    生成将因子重采样到参考网格的 VRT 文件 (只记录变换关系，不复制像元数据)
+    
+    Parameters:
+    -----------
+    path : str
+        待对齐的因子文件路径
+    reference_info : dict
+        参考因子元数据 (见 read_raster_info)
+    vrt_path : str
+        输出 VRT 路径
+    resampling : rasterio.enums.Resampling, optional
+        重采样方法，默认整型 (分类) 因子用最邻近，浮点型因子用双线性
+    """
+    from rasterio.enums import Resampling
+    from rasterio.shutil import copy as copy_dataset
+    from rasterio.transform import from_origin
+    from rasterio.vrt import WarpedVRT
+    
+    transform = from_origin(
+        reference_info['bounds'][0], reference_info['bounds'][3],
+        reference_info['res_x'], reference_info['res_y']
+    )
+    crs = None if reference_info['crs'] == "无" else reference_info['crs']
+    
+    # VRT 中以绝对路径引用源文件，从任意工作目录打开均有效
+    with rasterio.open(os.path.abspath(path)) as src:
+        if resampling is None:
+            floating = np.issubdtype(np.dtype(src.dtypes[0]), np.floating)
+            resampling = Resampling.bilinear if floating else Resampling.nearest
+        with WarpedVRT(
+            src,
+            crs=crs or src.crs,
+            transform=transform,
+            width=reference_info['width'],
+            height=reference_info['height'],
+            resampling=resampling,
+            src_nodata=src.nodata,
+            nodata=src.nodata
+        ) as vrt:
+            copy_dataset(vrt, vrt_path, driver='VRT')
+
+
+def fix_alignment(infos, reference_info, output_dir, progress=None):
+    """
+    为与参考因子网格不一致的因子批量生成对齐 VRT
+    
+    Parameters:
+    -----------
+    infos : list
+        待修复因子的元数据列表
+    reference_info : dict
+        参考因子元数据
+    output_dir : str
+        VRT 输出目录 (文件名为原文件名加 .vrt)
+    progress : callable, optional
+        进度回调 progress(已完成数, 总数)
+    
+    Returns:
+    --------
+    list
+        (源文件路径, VRT路径或None, 错误信息或None)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    results = []
+    used_names = set()
+    for done, info in enumerate(infos, 1):
+        # 不同子目录下的同名因子加序号区分
+        stem = Path(info['path']).stem
+        name, n = stem, 1
+        while name in used_names:
+            name = f"{stem}_{n}"
+            n += 1
+        used_names.add(name)
+        vrt_path = os.path.join(output_dir, name + ".vrt")
+        try:
+            write_aligned_vrt(info['path'], reference_info, vrt_path)
+            results.append((info['path'], vrt_path, None))
+        except Exception as e:
+            results.append((info['path'], None, str(e)))
+        if progress is not None:
+            progress(done, len(infos))
+    return results
+
+
+class MetadataCache:
+    """栅格元数据的磁盘缓存 (SQLite)，以路径、文件大小和修改时间为键"""
+    
+    def __init__(self, db_path=DEFAULT_CACHE_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS metadata ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, info TEXT)"
+        )
+        self.conn.commit()
+    
+    def get(self, path, size, mtime_ns):
+        """查询缓存，文件大小或修改时间变化时视为未命中 (返回None)"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT info FROM metadata WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (path, size, mtime_ns)
+            ).fetchone()
+        if row is None:
+            return None
+        info = json.loads(row[0])
+        info['bounds'] = tuple(info['bounds'])
+        return info
+    
+    def put(self, path, size, mtime_ns, info):
+        """写入缓存 (调用 commit 后落盘)"""
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO metadata (path, size, mtime_ns, info) VALUES (?, ?, ?, ?)",
+                (path, size, mtime_ns, json.dumps(info))
+            )
+    
+    def commit(self):
+        with self.lock:
+            self.conn.commit()
+    
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM metadata")
+            self.conn.commit()
+    
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def read_raster_info_cached(path, cache=None):
+    """
+    读取栅格元数据，优先使用缓存
+    
+    Returns:
+    --------
+    tuple
+        (元数据, 是否命中缓存)
+    """
+    if cache is None:
+        return read_raster_info(path), False
+    
+    stat = os.stat(path)
+    info = cache.get(path, stat.st_size, stat.st_mtime_ns)
+    if info is not None:
+        return info, True
+    
+    info = read_raster_info(path)
+    cache.put(path, stat.st_size, stat.st_mtime_ns, info)
+    return info, False
+
+
+def iter_check_results(paths, max_workers=MAX_WORKERS, cancel_event=None, cache=None, reference_info=None):
+    """
+    并发读取栅格元数据并与参考因子比较，按输入顺序逐个产出结果
+    
+    未指定 reference_info 时，参考因子为第一个能成功读取的文件。
+    
+    Parameters:
+    -----------
+    paths : list
+        栅格文件路径列表
+    max_workers : int
+        并发读取线程数
+    cancel_event : threading.Event, optional
+        置位后停止提交新的读取任务
+    cache : MetadataCache, optional
+        元数据缓存，只有新增或修改过的文件才会重新打开
+    reference_info : dict, optional
+        已知的参考因子元数据 (增量检查时使用)，所有文件均与其比较
+    
+    Yields:
+    -------
+    dict
+        path, info, is_reference, issues, error, cached
+    """
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(paths)))) as pool:
+        futures = [pool.submit(read_raster_info_cached, path, cache) for path in paths]
+        try:
+            for path, future in zip(paths, futures):
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                
+                try:
+                    info, cached = future.result()
+                except Exception as e:
+                    yield {'path': path, 'info': None, 'is_reference': False, 'issues': [], 'error': str(e), 'cached': False}
+                    continue
+                
+                # 确定参考因子（第一个有效的因子）
+                if reference_info is None:
+                    reference_info = info
+                    yield {'path': path, 'info': info, 'is_reference': True, 'issues': [], 'error': None, 'cached': cached}
+                else:
+                    issues = compare_with_reference(info, reference_info)
+                    yield {'path': path, 'info': info, 'is_reference': False, 'issues': issues, 'error': None, 'cached': cached}
+        finally:
+            for future in futures:
+                future.cancel()
+            if cache is not None:
+                cache.commit()
+
+
+def _valid_mask(data, nodata):
+    """有效像元掩码 (排除 NaN、±inf 及无效值)"""
+    if np.issubdtype(data.dtype, np.floating):
+        # inf 会使统计值和直方图范围无穷大，与 NaN 一样视为无效
+        valid = np.isfinite(data)
+    else:
+        valid = np.ones(data.shape, dtype=bool)
+    if nodata is not None and not np.isnan(nodata):
+        valid &= data != nodata
+    return valid
+
+
+def snapshot_directory(directory, extension=None):
+    """
+    记录目录中匹配文件的大小和修改时间
+    
+    Returns:
+    --------
+    dict
+        路径 -> (大小, 修改时间ns)，按遍历顺序排列
+    """
+    snapshot = {}
+    for entry in iter_raster_files(directory, extension):
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        snapshot[entry.path] = (stat.st_size, stat.st_mtime_ns)
+    return snapshot
+
+
+def diff_snapshots(old, new):
+    """
+    比较两次目录快照
+    
+    Returns:
+    --------
+    tuple
+        (新增路径列表, 修改路径列表, 删除路径列表)
+    """
+    added = [path for path in new if path not in old]
+    modified = [path for path in new if path in old and new[path] != old[path]]
+    removed = [path for path in old if path not in new]
+    return added, modified, removed
+
+
+class DirectoryWatcher:
+    """
+    监视目录中栅格文件的新增、修改和删除
+    
+    以轮询目录快照 (文件大小和修改时间) 的方式检测变化。安装了 watchdog 时
+    改为由文件系统事件 (Linux 下为 inotify) 唤醒后再比较快照，空闲时不再频繁遍历目录，
+    轮询仅作兜底。
+    """
+    
+    def __init__(self, directory, extension=None, interval=WATCH_INTERVAL_S, use_events=True):
+        self.directory = directory
+        self.extension = extension
+        self.interval = interval
+        self.snapshot = snapshot_directory(directory, extension)
+        self._wakeup = threading.Event()
+        self._observer = None
+        if use_events:
+            self._start_observer()
+    
+    def _start_observer(self):
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            return
+        
+        wakeup = self._wakeup
+        
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                wakeup.set()
+        
+        try:
+            observer = Observer()
+            observer.schedule(_Handler(), self.directory, recursive=True)
+            observer.start()
+        except Exception:
+            return
+        self._observer = observer
+    
+    @property
+    def uses_events(self):
+        return self._observer is not None
+    
+    def wait_for_changes(self, stop_event=None):
+        """
+        阻塞直至检测到变化或 stop_event 置位
+        
+        Returns:
+        --------
+        tuple or None
+            (新增, 修改, 删除) 路径列表，停止时返回None
+        """
+        while stop_event is None or not stop_event.is_set():
+            timeout = WATCH_EVENT_FALLBACK_S if self.uses_events else self.interval
+            woken = self._wakeup.wait(timeout)
+            if stop_event is not None and stop_event.is_set():
+                break
+            if woken:
+                # 合并一次写入产生的多个事件
+                self._wakeup.clear()
+                time.sleep(WATCH_SETTLE_S)
+                self._wakeup.clear()
+            
+            snapshot = snapshot_directory(self.directory, self.extension)
+            changes = diff_snapshots(self.snapshot, snapshot)
+            self.snapshot = snapshot
+            if any(changes):
+                return changes
+        return None
+    
+    def wake(self):
+        """唤醒等待中的 wait_for_changes (用于停止监视)"""
+        self._wakeup.set()
+    
+    def stop(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+
+
+class WatchSession:
+    """
+    监视模式下维护各文件的检查结果，只重新检查发生变化的文件
+    
+    新增和修改的文件与保留的参考因子比较；参考因子本身被修改或删除时全部重新检查。
+    """
+    
+    def __init__(self, max_workers=MAX_WORKERS, cache=None):
+        self.max_workers = max_workers
+        self.cache = cache
+        self.paths = []
+        self.results = {}
+        self.reference_path = None
+    
+    def full_check(self, paths, cancel_event=None):
+        """检查全部文件，返回结果列表"""
+        self.paths = list(paths)
+        self.results = {}
+        self.reference_path = None
+        for result in iter_check_results(self.paths, self.max_workers, cancel_event, self.cache):
+            self.results[result['path']] = result
+            if result['is_reference']:
+                self.reference_path = result['path']
+        return [self.results[path] for path in self.paths if path in self.results]
+    
+    def apply_changes(self, paths, added, modified, removed, cancel_event=None):
+        """
+        根据目录变化更新检查结果
+        
+        Parameters:
+        -----------
+        paths : list
+            变化后的全部文件路径 (决定结果顺序)
+        added, modified, removed : list
+            新增、修改和删除的文件路径
+        
+        Returns:
+        --------
+        tuple
+            (重新检查的结果列表, 删除的路径列表, 是否全部重新检查)
+        """
+        if self.reference_path is None or self.reference_path in modified or self.reference_path in removed:
+            old_paths = set(self.results)
+            results = self.full_check(paths, cancel_event)
+            return results, [path for path in old_paths if path not in self.results], True
+        
+        for path in removed:
+            self.results.pop(path, None)
+        self.paths = list(paths)
+        
+        changed_set = set(added) | set(modified)
+        changed = [path for path in paths if path in changed_set]
+        reference_info = self.results[self.reference_path]['info']
+        rechecked = []
+        for result in iter_check_results(changed, self.max_workers, cancel_event, self.cache, reference_info):
+            self.results[result['path']] = result
+            rechecked.append(result)
+        return rechecked, list(removed), False
+    
+    def ordered_results(self):
+        """按文件顺序返回当前全部结果"""
+        return [self.results[path] for path in self.paths if path in self.results]
+
+
+def _read_packed_validity(src, window):
+    """读取窗口数据，返回打包后的有效像元位掩码及无效像元数"""
+    valid = _valid_mask(src.read(1, window=window), src.nodata)
+    return np.packbits(valid, axis=None), int(valid.size - np.count_nonzero(valid))
+
+
+class StreamingHistogram:
+    """
+    分箱数固定的流式直方图
+    
+    初始值域取第一批数据的范围，之后遇到超出范围的值时将箱宽加倍 (相邻两箱合并)
+    并向超出的一侧扩展，因此只需遍历数据一次，且合并过程不损失计数。
+    """
+    
+    def __init__(self, n_bins=HIST_BINS):
+        if n_bins < 2 or n_bins % 2:
+            raise ValueError("分箱数须为不小于2的偶数")
+        self.n_bins = n_bins
+        self.lower = None
+        self.width = None
+        self.counts = np.zeros(n_bins, dtype=np.int64)
+    
+    @property
+    def upper(self):
+        return self.lower + self.width * self.n_bins
+    
+    def _grow(self, vmin, vmax):
+        """箱宽加倍直至覆盖 [vmin, vmax]"""
+        half = self.n_bins // 2
+        while vmin < self.lower or vmax >= self.upper:
+            merged = self.counts.reshape(half, 2).sum(axis=1)
+            self.counts = np.zeros(self.n_bins, dtype=np.int64)
+            if vmin < self.lower:
+                # 向下扩展: 原有各箱合并后落在上半部分
+                self.lower -= self.width * self.n_bins
+                self.counts[half:] = merged
+            else:
+                self.counts[:half] = merged
+            self.width *= 2
+    
+    def update(self, values):
+        """累加一批有效值 (一维有限值数组)"""
+        if values.size == 0:
+            return
+        vmin, vmax = float(values.min()), float(values.max())
+        if not (np.isfinite(vmin) and np.isfinite(vmax)):
+            # 无穷值会使箱宽加倍的循环永不结束
+            raise ValueError("直方图只接受有限值，请先用 _valid_mask 排除 NaN 和 ±inf")
+        if self.lower is None:
+            self.lower = vmin
+            self.width = (vmax - vmin) / (self.n_bins - 1) if vmax > vmin else 1.0
+            # 保证最大值落在最后一箱内 (区间左闭右开)
+            while vmax >= self.upper:
+                self.width *= 2
+        else:
+            self._grow(vmin, vmax)
+        
+        index = ((values - self.lower) / self.width).astype(np.int64)
+        np.clip(index, 0, self.n_bins - 1, out=index)
+        self.counts += np.bincount(index, minlength=self.n_bins)
+    
+    def edges(self):
+        """箱边界 (n_bins + 1 个)，尚无数据时返回None"""
+        if self.lower is None:
+            return None
+        return self.lower + self.width * np.arange(self.n_bins + 1)
+
+
+def compute_raster_statistics(path, block_rows=DEEP_CHECK_BLOCK_ROWS, n_bins=HIST_BINS, cancel_event=None):
+    """
+    单次按行块流式读取栅格，统计有效像元的最值、均值、标准差及直方图
+    
+    各块的计数、均值和离差平方和按 Welford/Chan 方法合并，
+    避免大栅格上累加平方和带来的精度损失，内存占用只与块大小有关。
+    
+    Parameters:
+    -----------
+    path : str
+        栅格文件路径
+    block_rows : int
+        每次读取的行数
+    n_bins : int
+        直方图分箱数
+    cancel_event : threading.Event, optional
+        置位后停止统计
+    
+    Returns:
+    --------
+    dict
+        path, valid_pixels, infinite_pixels, min, max, mean, std, hist_counts, hist_edges, cancelled
+        (±inf 像元不参与统计，单独计入 infinite_pixels；无有效像元时最值、均值、标准差为None)
+    """
+    count = 0
+    mean = 0.0
+    m2 = 0.0
+    vmin = np.inf
+    vmax = -np.inf
+    infinite = 0
+    histogram = StreamingHistogram(n_bins)
+    cancelled = False
+    
+    with rasterio.open(path) as src:
+        for row in range(0, src.height, block_rows):
+            if cancel_event is not None and cancel_event.is_set():
+                cancelled = True
+                break
+            
+            window = Window(0, row, src.width, min(block_rows, src.height - row))
+            data = src.read(1, window=window)
+            if np.issubdtype(data.dtype, np.floating):
+                infinite += int(np.count_nonzero(np.isinf(data)))
+            values = data[_valid_mask(data, src.nodata)].astype(np.float64)
+            if values.size == 0:
+                continue
+            
+            # 合并本块的计数、均值及离差平方和
+            block_count = values.size
+            block_mean = float(values.mean())
+            block_m2 = float(((values - block_mean) ** 2).sum())
+            delta = block_mean - mean
+            total = count + block_count
+            mean += delta * block_count / total
+            m2 += block_m2 + delta * delta * count * block_count / total
+            count = total
+            
+            vmin = min(vmin, float(values.min()))
+            vmax = max(vmax, float(values.max()))
+            histogram.update(values)
+    
+    edges = histogram.edges()
+    return {
+        'path': path,
+        'valid_pixels': count,
+        'infinite_pixels': infinite,
+        'min': vmin if count else None,
+        'max': vmax if count else None,
+        'mean': mean if count else None,
+        'std': float(np.sqrt(m2 / count)) if count else None,
+        'hist_counts': histogram.counts.tolist(),
+        'hist_edges': edges.tolist() if edges is not None else [],
+        'cancelled': cancelled
+    }
+
+
+def compute_statistics(paths, block_rows=DEEP_CHECK_BLOCK_ROWS, n_bins=HIST_BINS,
+                       max_workers=MAX_WORKERS, cancel_event=None, progress=None):
+    """
+    并行统计多个栅格 (每个文件由一个线程单次流式读取)
+    
+    Parameters:
+    -----------
+    paths : list
+        栅格文件路径列表
+    progress : callable, optional
+        进度回调 progress(已完成文件数, 总文件数)
+    
+    Returns:
+    --------
+    list
+        与 paths 顺序一致的统计结果 (见 compute_raster_statistics)，读取失败的项含 error
+    """
+    results = [None] * len(paths)
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(paths)))) as pool:
+        futures = {
+            pool.submit(compute_raster_statistics, path, block_rows, n_bins, cancel_event): i
+            for i, path in enumerate(paths)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                results[i] = {'path': paths[i], 'error': str(e)}
+            if progress is not None:
+                progress(done, len(paths))
+    
+    return results
+
+
+def check_nodata_footprints(paths, mismatch_path=None, block_rows=DEEP_CHECK_BLOCK_ROWS,
+                            max_workers=MAX_WORKERS, cancel_event=None, progress=None):
+    """
+    逐像元比较各因子的NoData范围
+    
+    按行块流式读取所有因子 (各文件并行读取)，将有效像元压缩为位掩码后，
+    统计每个因子在"其余因子均有效"处的无效像元数，即该因子单独导致样本被丢弃的像元数。
+    内存占用只与块大小有关。
+    
+    Parameters:
+    -----------
+    paths : list
+        尺寸一致的因子文件路径列表 (至少两个)
+    mismatch_path : str, optional
+        不一致栅格输出路径，像元值为该处无效的因子个数 (全部有效或全部无效处为0)
+    block_rows : int
+        每次读取的行数
+    max_workers : int
+        并发读取线程数
+    cancel_event : threading.Event, optional
+        置位后停止检查
+    progress : callable, optional
+        进度回调 progress(已完成块数, 总块数)
+    
+    Returns:
+    --------
+    dict
+        total_pixels, jointly_valid_pixels, mismatch_pixels, cancelled,
+        factors: [{path, name, invalid_pixels, unique_invalid_pixels}]
+    """
+    if len(paths) < 2:
+        raise ValueError("至少需要两个因子才能比较NoData范围")
+    
+    with ExitStack() as stack:
+        sources = [stack.enter_context(rasterio.open(path)) for path in paths]
+        reference = sources[0]
+        width, height = reference.width, reference.height
+        for path, src in zip(paths, sources):
+            if (src.width, src.height) != (width, height):
+                raise ValueError(f"{Path(path).name} 尺寸与参考因子不一致，无法逐像元比较")
+        
+        n = len(sources)
+        count_dtype = np.uint8 if n < 256 else np.uint16
+        dst = None
+        if mismatch_path:
+            dst = stack.enter_context(rasterio.open(
+                mismatch_path, 'w',
+                driver='GTiff',
+                width=width,
+                height=height,
+                count=1,
+                dtype=count_dtype,
+                crs=reference.crs,
+                transform=reference.transform,
+                compress='deflate'
+            ))
+        
+        pool = stack.enter_context(ThreadPoolExecutor(max_workers=max(1, min(max_workers, n))))
+        
+        invalid = np.zeros(n, dtype=np.int64)
+        unique_invalid = np.zeros(n, dtype=np.int64)
+        jointly_valid = 0
+        mismatch_pixels = 0
+        cancelled = False
+        n_blocks = (height + block_rows - 1) // block_rows
+        
+        for b, row in enumerate(range(0, height, block_rows)):
+            if cancel_event is not None and cancel_event.is_set():
+                cancelled = True
+                break
+            
+            window = Window(0, row, width, min(block_rows, height - row))
+            results = list(pool.map(lambda src: _read_packed_validity(src, window), sources))
+            packed = [result[0] for result in results]
+            invalid += [result[1] for result in results]
+            n_pixels = window.width * window.height
+            
+            # 前缀/后缀按位与: except_i 为除第 i 个因子外全部有效的像元
+            ones = np.full(packed[0].shape, 0xFF, dtype=np.uint8)
+            prefix = [ones]
+            for mask in packed[:-1]:
+                prefix.append(prefix[-1] & mask)
+            suffix = [ones]
+            for mask in reversed(packed[1:]):
+                suffix.append(suffix[-1] & mask)
+            suffix.reverse()
+            
+            invalid_count = np.zeros(n_pixels, dtype=count_dtype)
+            for i, mask in enumerate(packed):
+                unique_invalid[i] += int(_POPCOUNT[~mask & prefix[i] & suffix[i]].sum())
+                invalid_count += np.unpackbits(~mask, count=n_pixels)
+            jointly_valid += int(_POPCOUNT[prefix[-1] & packed[-1]].sum())
+            
+            # 全部有效或全部无效处视为一致
+            invalid_count[invalid_count == n] = 0
+            mismatch_pixels += int(np.count_nonzero(invalid_count))
+            if dst is not None:
+                dst.write(invalid_count.reshape(window.height, window.width), 1, window=window)
+            
+            if progress is not None:
+                progress(b + 1, n_blocks)
+    
+    return {
+        'total_pixels': width * height,
+        'jointly_valid_pixels': jointly_valid,
+        'mismatch_pixels': mismatch_pixels,
+        'cancelled': cancelled,
+        'factors': [
+            {
+                'path': path,
+                'name': Path(path).name,
+                'invalid_pixels': int(invalid[i]),
+                'unique_invalid_pixels': int(unique_invalid[i])
+            }
+            for i, path in enumerate(paths)
+        ]
+    }
+
+
+def _read_block(src, window):
+    """读取窗口数据，返回展平的 float64 数组及有效像元掩码"""
+    data = src.read(1, window=window)
+    return data.astype(np.float64).ravel(), _valid_mask(data, src.nodata).ravel()
+
+
+def compute_correlation(paths, block_rows=DEEP_CHECK_BLOCK_ROWS, sample_fraction=1.0, random_state=42,
+                        max_workers=MAX_WORKERS, cancel_event=None, progress=None):
+    """
+    流式计算因子间 Pearson 相关系数矩阵及方差膨胀因子 (VIF)
+    
+    按行块并行读取所有因子，只在各因子均有效的像元上累加计数、和及叉积矩阵，
+    不需要将栅格整体载入内存。累加前减去第一块的均值，以减小大数相减的精度损失。
+    
+    Parameters:
+    -----------
+    paths : list
+        尺寸一致的因子文件路径列表 (至少两个)
+    block_rows : int
+        每次读取的行数
+    sample_fraction : float
+        像元采样比例 (0, 1]，小于1时每块随机抽取相应比例的像元参与统计
+    random_state : int
+        采样随机种子
+    max_workers : int
+        并发读取线程数
+    cancel_event : threading.Event, optional
+        置位后停止计算
+    progress : callable, optional
+        进度回调 progress(已完成块数, 总块数)
+    
+    Returns:
+    --------
+    dict
+        names, n_pixels, correlation (二维列表), vif, tolerance, cancelled
+        (常数因子的相关系数及VIF为NaN)
+    """
+    if len(paths) < 2:
+        raise ValueError("至少需要两个因子才能计算相关系数")
+    if not 0 < sample_fraction <= 1:
+        raise ValueError("采样比例须在 (0, 1] 范围内")
+    
+    rng = np.random.default_rng(random_state)
+    n = len(paths)
+    count = 0
+    shift = None
+    sums = np.zeros(n)
+    cross = np.zeros((n, n))
+    cancelled = False
+    
+    with ExitStack() as stack:
+        sources = [stack.enter_context(rasterio.open(path)) for path in paths]
+        width, height = sources[0].width, sources[0].height
+        for path, src in zip(paths, sources):
+            if (src.width, src.height) != (width, height):
+                raise ValueError(f"{Path(path).name} 尺寸与参考因子不一致，无法计算相关系数")
+        
+        pool = stack.enter_context(ThreadPoolExecutor(max_workers=max(1, min(max_workers, n))))
+        n_blocks = (height + block_rows - 1) // block_rows
+        
+        for b, row in enumerate(range(0, height, block_rows)):
+            if cancel_event is not None and cancel_event.is_set():
+                cancelled = True
+                break
+            
+            window = Window(0, row, width, min(block_rows, height - row))
+            blocks = list(pool.map(lambda src: _read_block(src, window), sources))
+            
+            joint = np.logical_and.reduce([valid for _, valid in blocks])
+            if sample_fraction < 1:
+                joint &= rng.random(joint.size) < sample_fraction
+            
+            if joint.any():
+                X = np.column_stack([values[joint] for values, _ in blocks])
+                if shift is None:
+                    shift = X.mean(axis=0)
+                X -= shift
+                count += X.shape[0]
+                sums += X.sum(axis=0)
+                cross += X.T @ X
+            
+            if progress is not None:
+                progress(b + 1, n_blocks)
+    
+    names = [Path(path).name for path in paths]
+    if count < 2:
+        raise ValueError("共同有效像元不足，无法计算相关系数")
+    
+    mean = sums / count
+    covariance = cross / count - np.outer(mean, mean)
+    std = np.sqrt(np.clip(np.diag(covariance), 0, None))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlation = covariance / np.outer(std, std)
+    np.fill_diagonal(correlation, 1.0)
+    correlation[std == 0, :] = np.nan
+    correlation[:, std == 0] = np.nan
+    correlation = np.clip(correlation, -1.0, 1.0)
+    
+    # VIF_i 为相关系数矩阵逆矩阵的第 i 个对角元 (只对非常数因子计算)
+    vif = np.full(n, np.nan)
+    usable = std > 0
+    if usable.sum() >= 2:
+        try:
+            vif[usable] = np.diag(np.linalg.inv(correlation[np.ix_(usable, usable)]))
+        except np.linalg.LinAlgError:
+            # 完全共线
+            vif[usable] = np.inf
+    elif usable.sum() == 1:
+        vif[usable] = 1.0
+    with np.errstate(divide='ignore'):
+        tolerance = 1.0 / vif
+    
+    return {
+        'names': names,
+        'n_pixels': count,
+        'correlation': correlation.tolist(),
+        'vif': vif.tolist(),
+        'tolerance': tolerance.tolist(),
+        'cancelled': cancelled
+    }
+
+
+def _new_hasher(algorithm):
+    """创建哈希对象 (xxh3_64 需要安装 xxhash)"""
+    if algorithm == "xxh3_64":
+        import xxhash
+        return xxhash.xxh3_64()
+    return hashlib.blake2b(digest_size=16)
+
+
+def default_hash_algorithm():
+    """已安装 xxhash 时使用更快的 xxh3_64，否则使用标准库的 blake2b"""
+    try:
+        import xxhash
+    except ImportError:
+        return "blake2b"
+    return "xxh3_64"
+
+
+def _hash_segment(path, start_row, stop_row, block_rows, algorithm):
+    """
+    顺序读取 [start_row, stop_row) 行范围内的各块并计算哈希 (每个任务单独打开文件)
+    
+    每块依次哈希全部波段，多波段因子中任一波段的内容变化都会反映到块哈希上。
+    """
+    digests = []
+    with rasterio.open(path) as src:
+        # 各波段数据类型可能不同，分别分配缓冲区
+        buffers = [np.empty((min(block_rows, stop_row - start_row), src.width), dtype=dtype)
+                   for dtype in src.dtypes]
+        for row in range(start_row, stop_row, block_rows):
+            height = min(block_rows, stop_row - row)
+            window = Window(0, row, src.width, height)
+            hasher = _new_hasher(algorithm)
+            for band, buffer in enumerate(buffers, 1):
+                out = buffer[:height]
+                src.read(band, window=window, out=out)
+                hasher.update(memoryview(out).cast('B'))
+            digests.append(hasher.hexdigest())
+    return digests
+
+
+def compute_fingerprints(paths, block_rows=FINGERPRINT_BLOCK_ROWS, algorithm=None,
+                         max_workers=None, cancel_event=None, progress=None):
+    """
+    计算各栅格的分块内容指纹
+    
+    每个文件按行块读取全部波段的像元数据并计算哈希，文件再按若干块切分为独立任务，
+    因此单个大文件也能在多核上并行 (哈希计算和栅格读取均释放GIL)。
+    
+    Parameters:
+    -----------
+    paths : list
+        栅格文件路径列表
+    block_rows : int
+        每个哈希块的行数
+    algorithm : str, optional
+        "xxh3_64" 或 "blake2b"，默认见 default_hash_algorithm
+    max_workers : int, optional
+        并行线程数，默认为CPU核数
+    cancel_event : threading.Event, optional
+        置位后不再开始新的任务
+    progress : callable, optional
+        进度回调 progress(已完成任务数, 总任务数)
+    
+    Returns:
+    --------
+    dict
+        路径 -> {algorithm, block_rows, dtype, width, height, blocks, digest}，
+        多波段文件的 dtype 为各波段数据类型以逗号连接，
+        读取失败的项为 {error}，取消时未完成的文件不包含在结果中
+    """
+    algorithm = algorithm or default_hash_algorithm()
+    max_workers = max_workers or os.cpu_count() or 1
+    
+    headers = {}
+    tasks = []
+    fingerprints = {}
+    for path in paths:
+        try:
+            with rasterio.open(path) as src:
+                # 单波段时与只哈希第1波段的旧指纹兼容
+                headers[path] = (",".join(src.dtypes), src.width, src.height)
+        except Exception as e:
+            fingerprints[path] = {'error': str(e)}
+            continue
+        segment_rows = block_rows * FINGERPRINT_SEGMENT_BLOCKS
+        height = headers[path][2]
+        for start in range(0, height, segment_rows):
+            tasks.append((path, start, min(start + segment_rows, height)))
+    
+    segments = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tasks)))) as pool:
+        def run(task):
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            return _hash_segment(task[0], task[1], task[2], block_rows, algorithm)
+        
+        futures = {pool.submit(run, task): task for task in tasks}
+        for done, future in enumerate(as_completed(futures), 1):
+            path, start, _ = futures[future]
+            try:
+                digests = future.result()
+            except Exception as e:
+                fingerprints[path] = {'error': str(e)}
+                digests = None
+            if digests is not None:
+                segments.setdefault(path, {})[start] = digests
+            if progress is not None:
+                progress(done, len(tasks))
+    
+    for path, (dtype, width, height) in headers.items():
+        if path in fingerprints:
+            continue
+        expected = (height + block_rows * FINGERPRINT_SEGMENT_BLOCKS - 1) // (block_rows * FINGERPRINT_SEGMENT_BLOCKS)
+        parts = segments.get(path, {})
+        if len(parts) != expected:
+            continue
+        blocks = [digest for start in sorted(parts) for digest in parts[start]]
+        
+        # 文件指纹: 数据类型、尺寸及全部块哈希的哈希
+        hasher = _new_hasher(algorithm)
+        hasher.update(f"{dtype}|{width}|{height}|{block_rows}|".encode())
+        hasher.update("".join(blocks).encode())
+        fingerprints[path] = {
+            'algorithm': algorithm,
+            'block_rows': block_rows,
+            'dtype': dtype,
+            'width': width,
+            'height': height,
+            'blocks': blocks,
+            'digest': hasher.hexdigest()
+        }
+    
+    return {path: fingerprints[path] for path in paths if path in fingerprints}
+
+
+def compare_fingerprints(current, previous):
+    """
+    将本次指纹与上次的结果比较
+    
+    先按路径匹配，路径不存在时按文件名匹配 (目录整体移动的情况)。
+    
+    Parameters:
+    -----------
+    current, previous : dict
+        路径 -> 指纹 (见 compute_fingerprints)
+    
+    Returns:
+    --------
+    dict
+        路径 -> {status: "unchanged"/"changed"/"new"/"incomparable", changed_rows: [(起始行, 结束行)]}
+    """
+    by_name = {}
+    for path in previous:
+        by_name.setdefault(Path(path).name, []).append(path)
+    
+    comparison = {}
+    for path, fingerprint in current.items():
+        if 'error' in fingerprint:
+            continue
+        old = previous.get(path)
+        if old is None and len(by_name.get(Path(path).name, [])) == 1:
+            old = previous[by_name[Path(path).name][0]]
+        
+        if old is None or 'error' in old:
+            comparison[path] = {'status': "new", 'changed_rows': []}
+        elif (old['algorithm'], old['block_rows']) != (fingerprint['algorithm'], fingerprint['block_rows']):
+            comparison[path] = {'status': "incomparable", 'changed_rows': []}
+        elif old['digest'] == fingerprint['digest']:
+            comparison[path] = {'status': "unchanged", 'changed_rows': []}
+        else:
+            block_rows = fingerprint['block_rows']
+            changed_rows = []
+            if (old['width'], old['height'], old['dtype']) == (fingerprint['width'], fingerprint['height'], fingerprint['dtype']):
+                for i, (a, b) in enumerate(zip(old['blocks'], fingerprint['blocks'])):
+                    if a != b:
+                        changed_rows.append((i * block_rows, min((i + 1) * block_rows, fingerprint['height'])))
+            comparison[path] = {'status': "changed", 'changed_rows': changed_rows}
+    return comparison
+
+
+def save_fingerprints(json_path, fingerprints):
+    """保存指纹 (JSON)"""
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump({'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'fingerprints': fingerprints},
+                  f, ensure_ascii=False)
+
+
+def load_fingerprints(json_path):
+    """
+    读取之前保存的指纹，支持 save_fingerprints 的输出和命令行模式的 JSON 报告
+    
+    Returns:
+    --------
+    dict
+        路径 -> 指纹
+    """
+    with open(json_path, encoding='utf-8') as f:
+        data = json.load(f)
+    if 'fingerprints' in data:
+        return data['fingerprints']
+    return {
+        factor['path']: factor['fingerprint']
+        for factor in data.get('factors', [])
+        if factor.get('fingerprint')
+    }
+
+
+def _import_tk():
+    """导入Tk界面模块 (仅GUI模式需要)"""
+    global tk, ttk, filedialog, messagebox, scrolledtext, simpledialog
+    import tkinter as tk
+    from tkinter import ttk, filedialog, messagebox, scrolledtext, simpledialog
+
+
 class FactorCheckerGUI:
     """因子一致性检查工具 - GUI版本"""
     
@@ -26,6 +1235,21 @@ class FactorCheckerGUI:
         # 存储因子信息
         self.factor_paths = []
         self.factor_info = []
+        self.correlation_result = None
+        
+        # 后台检查线程与界面更新队列
+        self.ui_queue = queue.Queue()
+        self.worker_thread = None
+        self.cancel_event = None
+        self.watcher = None
+        self.watching = False
+        self.watch_report_path = None
+        
+        # 元数据缓存 (不可用时退化为每次重新读取)
+        try:
+            self.metadata_cache = MetadataCache()
+        except Exception:
+            self.metadata_cache = None
         
         # 设置样式
         self.setup_styles()
@@ -80,13 +1304,13 @@ class FactorCheckerGUI:
         dir_entry = ttk.Entry(dir_frame, textvariable=self.dir_var, width=50)
         dir_entry.grid(row=0, column=1, sticky=(tk.W, tk.E), padx=5)
         
-        browse_btn = ttk.Button(
+        self.browse_btn = ttk.Button(
             dir_frame, 
             text="浏览...", 
             command=self.browse_directory,
             style="Accent.TButton"
         )
-        browse_btn.grid(row=0, column=2, padx=(5, 0))
+        self.browse_btn.grid(row=0, column=2, padx=(5, 0))
         
         # 文件过滤器
         filter_frame = ttk.Frame(dir_frame)
@@ -94,7 +1318,7 @@ class FactorCheckerGUI:
         
         ttk.Label(filter_frame, text="文件类型:").pack(side=tk.LEFT, padx=(0, 5))
         
-        self.filter_var = tk.StringVar(value=".tif")
+        self.filter_var = tk.StringVar(value="*.tif")
         filters = [(".tif 文件", "*.tif"), (".tiff 文件", "*.tiff"), ("所有文件", "*.*")]
         
         for text, pattern in filters:
@@ -154,7 +1378,72 @@ class FactorCheckerGUI:
             command=self.export_report,
             state="disabled"
         )
-        self.export_btn.pack(side=tk.LEFT)
+        self.export_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.deep_check_btn = ttk.Button(
+            button_frame,
+            text="🔬 NoData深度检查",
+            command=self.deep_check,
+            state="disabled"
+        )
+        self.deep_check_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.stats_btn = ttk.Button(
+            button_frame,
+            text="📈 统计值分布",
+            command=self.compute_stats,
+            state="disabled"
+        )
+        self.stats_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.correlation_btn = ttk.Button(
+            button_frame,
+            text="🔗 共线性分析",
+            command=self.compute_correlation,
+            state="disabled"
+        )
+        self.correlation_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.fix_btn = ttk.Button(
+            button_frame,
+            text="🧩 生成对齐VRT",
+            command=self.fix_alignment,
+            state="disabled"
+        )
+        self.fix_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.fingerprint_btn = ttk.Button(
+            button_frame,
+            text="🔑 内容指纹",
+            command=self.compute_fingerprints,
+            state="disabled"
+        )
+        self.fingerprint_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.watch_btn = ttk.Button(
+            button_frame,
+            text="👁 监视目录",
+            command=self.start_watch
+        )
+        self.watch_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.cancel_btn = ttk.Button(
+            button_frame,
+            text="⏹ 取消检查",
+            command=self.cancel_check,
+            state="disabled"
+        )
+        self.cancel_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.use_cache_var = tk.BooleanVar(value=self.metadata_cache is not None)
+        ttk.Checkbutton(
+            button_frame,
+            text="使用元数据缓存",
+            variable=self.use_cache_var
+        ).pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.progress = ttk.Progressbar(button_frame, mode="determinate", length=200)
+        self.progress.pack(side=tk.LEFT)
         
         # === 第4部分：检查结果 ===
         result_frame = ttk.LabelFrame(main_frame, text="3. 检查结果", padding="10")
@@ -163,10 +1452,11 @@ class FactorCheckerGUI:
         result_frame.rowconfigure(0, weight=1)
         
         # 结果表格
-        result_columns = ("因子", "宽度", "高度", "像元总数", "坐标系", "分辨率X", "分辨率Y", "状态")
+        result_columns = ("因子", "宽度", "高度", "像元总数", "坐标系", "分辨率X", "分辨率Y",
+                          "最小值", "最大值", "均值", "标准差", "状态")
         self.result_tree = ttk.Treeview(result_frame, columns=result_columns, show="headings", height=6)
         
-        result_col_widths = [120, 70, 70, 90, 100, 80, 80, 100]
+        result_col_widths = [120, 70, 70, 90, 100, 80, 80, 80, 80, 80, 80, 100]
         for col, width in zip(result_columns, result_col_widths):
             self.result_tree.heading(col, text=col)
             self.result_tree.column(col, width=width, anchor=tk.CENTER)
@@ -221,7 +1511,7 @@ class FactorCheckerGUI:
             self.scan_directory()
     
     def scan_directory(self):
-        """扫描目录中的栅格文件"""
+        """扫描目录中的栅格文件 (后台线程遍历，界面分批添加)"""
         directory = self.dir_var.get()
         if not directory or not os.path.exists(directory):
             return
@@ -233,49 +1523,104 @@ class FactorCheckerGUI:
         
         # 获取文件扩展名过滤条件
         ext_filter = self.filter_var.get()
+        self.log("INFO", f"正在扫描目录: {directory}")
         
-        # 扫描文件
-        found_files = []
-        for ext in [ext_filter, "*"] if ext_filter != "*.*" else ["*"]:
-            pattern = f"*{ext}" if ext != "*" else "*"
-            for file_path in Path(directory).rglob(pattern):
-                if file_path.is_file():
-                    found_files.append(file_path)
+        self._set_busy(True)
+        self.progress.config(mode="indeterminate")
+        self.progress.start()
         
-        # 排序并添加
-        found_files.sort()
+        self.cancel_event = threading.Event()
+        self.worker_thread = threading.Thread(
+            target=self._scan_worker,
+            args=(directory, ext_filter, self.cancel_event),
+            daemon=True
+        )
+        self.worker_thread.start()
+        self.root.after(UI_POLL_INTERVAL_MS, self.process_ui_queue)
+    
+    def _scan_worker(self, directory, ext_filter, cancel_event):
+        """后台线程: 遍历目录，分批发送文件路径"""
+        batch = []
+        try:
+            for entry in iter_raster_files(directory, filter_extension(ext_filter)):
+                if cancel_event.is_set():
+                    break
+                batch.append(entry.path)
+                if len(batch) >= SCAN_BATCH_SIZE:
+                    self.ui_queue.put(("files", batch))
+                    batch = []
+        except Exception as e:
+            self.ui_queue.put(("log", "ERROR", f"扫描目录出错: {str(e)}"))
         
-        for idx, file_path in enumerate(found_files[:100], 1):  # 限制最多100个文件
-            self.factor_paths.append(str(file_path))
+        if batch:
+            self.ui_queue.put(("files", batch))
+        self.ui_queue.put(("scan_done", ext_filter, cancel_event.is_set()))
+    
+    def _add_files(self, paths):
+        """向文件列表追加一批文件"""
+        for path in paths:
+            self.factor_paths.append(path)
             self.tree.insert("", "end", values=(
-                idx,
-                file_path.name,
-                str(file_path.parent),
+                len(self.factor_paths),
+                os.path.basename(path),
+                os.path.dirname(path),
                 "待检查"
             ))
+    
+    def _finish_scan(self, ext_filter, cancelled):
+        """扫描结束后更新日志及按钮状态"""
+        self.progress.stop()
+        self.progress.config(mode="determinate", value=0)
+        self._set_busy(False)
         
-        if found_files:
-            self.check_btn.config(state="normal")
-            self.log("SUCCESS", f"找到 {len(found_files)} 个文件")
+        if cancelled:
+            self.log("WARNING", f"扫描已取消，已找到 {len(self.factor_paths)} 个文件")
+        elif self.factor_paths:
+            self.log("SUCCESS", f"找到 {len(self.factor_paths)} 个文件")
         else:
             self.log("WARNING", f"未找到匹配 {ext_filter} 的文件")
+        
+        if not self.factor_paths:
+            self.check_btn.config(state="disabled")
+    
+    def _set_busy(self, busy):
+        """后台任务运行期间禁用会修改列表的按钮"""
+        state = "disabled" if busy else "normal"
+        self.browse_btn.config(state=state)
+        self.check_btn.config(state=state)
+        self.watch_btn.config(state=state)
+        self.clear_btn.config(state=state)
+        self.cancel_btn.config(state="normal" if busy else "disabled")
+        if busy:
+            self.export_btn.config(state="disabled")
+            self.deep_check_btn.config(state="disabled")
+            self.stats_btn.config(state="disabled")
+            self.correlation_btn.config(state="disabled")
+            self.fix_btn.config(state="disabled")
+            self.fingerprint_btn.config(state="disabled")
+        elif self.factor_info:
+            self.export_btn.config(state="normal")
+            self.deep_check_btn.config(state="normal")
+            self.stats_btn.config(state="normal")
+            self.correlation_btn.config(state="normal")
+            self.fix_btn.config(state="normal")
+            self.fingerprint_btn.config(state="normal")
     
     def clear_treeview(self, treeview):
         """清空树状视图"""
-        for item in treeview.get_children():
-            treeview.delete(item)
+        treeview.delete(*treeview.get_children())
     
-    def log(self, level, message):
-        """添加日志信息"""
+    def log(self, level, message, scroll=True):
+        """添加日志信息 (批量写入时可关闭滚动，由调用方最后滚动一次)"""
         timestamp = datetime.now().strftime("%H:%M:%S")
         log_msg = f"[{timestamp}] {message}\n"
         
         self.log_text.insert(tk.END, log_msg, level)
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
+        if scroll:
+            self.log_text.see(tk.END)
     
     def check_consistency(self):
-        """检查因子一致性"""
+        """检查因子一致性 (在后台线程中执行，结果经队列回传界面)"""
         if not self.factor_paths:
             self.log("ERROR", "没有可检查的文件")
             return
@@ -283,107 +1628,178 @@ class FactorCheckerGUI:
         # 清空结果表格
         self.clear_treeview(self.result_tree)
         self.factor_info = []
+        self.correlation_result = None
         
         self.log("INFO", "=" * 60)
         self.log("INFO", "开始检查因子一致性...")
         
-        # 检查每个因子
-        reference_info = None
+        # 切换按钮状态
+        self._set_busy(True)
+        self.progress.config(maximum=len(self.factor_paths), value=0)
+        self.stats_label.config(text="正在检查...")
+        
+        self.cancel_event = threading.Event()
+        self.worker_thread = threading.Thread(
+            target=self._check_worker,
+            args=(
+                list(self.factor_paths),
+                self.cancel_event,
+                self.metadata_cache if self.use_cache_var.get() else None
+            ),
+            daemon=True
+        )
+        self.worker_thread.start()
+        self.root.after(UI_POLL_INTERVAL_MS, self.process_ui_queue)
+    
+    def cancel_check(self):
+        """取消正在进行的扫描或检查"""
+        if self.cancel_event is not None and not self.cancel_event.is_set():
+            self.cancel_event.set()
+            if self.watcher is not None:
+                self.watcher.wake()
+            self.cancel_btn.config(state="disabled")
+            self.log("WARNING", "正在取消...")
+    
+    def _check_worker(self, paths, cancel_event, cache):
+        """后台线程: 并发读取栅格并比较，界面更新通过队列发送"""
+        factor_info = []
         inconsistent_factors = []
+        cache_hits = 0
+        
+        try:
+            for done, result in enumerate(iter_check_results(paths, cancel_event=cancel_event, cache=cache), 1):
+                cache_hits += result['cached']
+                self.ui_queue.put(("row",) + self._result_row(result))
+                self.ui_queue.put(("progress", done))
+                
+                if result['error'] is not None:
+                    continue
+                
+                info = result['info']
+                info['issues'] = result['issues']
+                info['is_reference'] = result['is_reference']
+                factor_info.append(info)
+                if result['issues']:
+                    inconsistent_factors.append((info['name'], result['issues']))
+        except Exception as e:
+            self.ui_queue.put(("log", "ERROR", f"检查过程出错: {str(e)}"))
+        
+        if cache is not None:
+            self.ui_queue.put(("log", "INFO", f"元数据缓存命中: {cache_hits}/{len(paths)}"))
+        self.ui_queue.put(("done", factor_info, inconsistent_factors, cancel_event.is_set()))
+    
+    @staticmethod
+    def _result_row(result):
+        """
+        将检查结果转为结果表格的一行
+        
+        Returns:
+        --------
+        tuple
+            (路径, 各列值, 日志级别, 日志信息)
+        """
+        path = result['path']
+        if result['error'] is not None:
+            return path, (
+                Path(path).name,
+                "ERROR",
+                "ERROR",
+                "ERROR",
+                "ERROR",
+                "ERROR",
+                "ERROR",
+                "", "", "", "",
+                "读取失败"
+            ), "ERROR", f"无法读取文件: {Path(path).name} - {result['error']}"
+        
+        info = result['info']
+        if result['is_reference']:
+            status = "参考因子"
+            status_tag = "SUCCESS"
+        elif not result['issues']:
+            status = "✓ 一致"
+            status_tag = "SUCCESS"
+        else:
+            status = "✗ 不一致: " + "; ".join(result['issues'])
+            status_tag = "ERROR"
         
-        for i, path in enumerate(self.factor_paths, 1):
+        return path, (
+            info['name'],
+            info['width'],
+            info['height'],
+            f"{info['total_pixels']:,}",
+            info['crs'][:15] + "..." if len(info['crs']) > 15 else info['crs'],
+            f"{info['res_x']:.4f}",
+            f"{info['res_y']:.4f}",
+            "", "", "", "",
+            status
+        ), status_tag, f"检查: {info['name']} - {status}"
+    
+    def process_ui_queue(self):
+        """在Tk主线程中批量处理后台线程发来的界面更新"""
+        finished = None
+        budget = UI_BATCH_SIZE
+        
+        while budget > 0:
             try:
-                with rasterio.open(path) as src:
-                    info = {
-                        'name': Path(path).name,
-                        'path': path,
-                        'width': src.width,
-                        'height': src.height,
-                        'total_pixels': src.width * src.height,
-                        'crs': str(src.crs) if src.crs else "无",
-                        'res_x': src.transform.a,
-                        'res_y': abs(src.transform.e),
-                        'bounds': src.bounds,
-                        'nodata': src.nodata,
-                        'dtype': src.dtypes[0]
-                    }
-                    
-                    self.factor_info.append(info)
-                    
-                    # 确定参考因子（第一个有效的因子）
-                    if reference_info is None:
-                        reference_info = info
-                        status = "参考因子"
-                        status_tag = "SUCCESS"
-                    else:
-                        # 检查一致性
-                        is_consistent = True
-                        issues = []
-                        
-                        # 检查尺寸
-                        if info['width'] != reference_info['width']:
-                            issues.append(f"宽度不一致 ({info['width']} != {reference_info['width']})")
-                            is_consistent = False
-                        if info['height'] != reference_info['height']:
-                            issues.append(f"高度不一致 ({info['height']} != {reference_info['height']})")
-                            is_consistent = False
-                        
-                        # 检查坐标系
-                        if info['crs'] != reference_info['crs']:
-                            issues.append("坐标系不一致")
-                            is_consistent = False
-                        
-                        # 检查分辨率（允许微小差异）
-                        if abs(info['res_x'] - reference_info['res_x']) > 0.001:
-                            issues.append(f"X分辨率差异 ({info['res_x']:.6f} != {reference_info['res_x']:.6f})")
-                            is_consistent = False
-                        if abs(info['res_y'] - reference_info['res_y']) > 0.001:
-                            issues.append(f"Y分辨率差异 ({info['res_y']:.6f} != {reference_info['res_y']:.6f})")
-                            is_consistent = False
-                        
-                        if is_consistent:
-                            status = "✓ 一致"
-                            status_tag = "SUCCESS"
-                        else:
-                            status = "✗ 不一致: " + "; ".join(issues)
-                            status_tag = "ERROR"
-                            inconsistent_factors.append((info['name'], issues))
-                    
-                    # 添加到结果表格
-                    self.result_tree.insert("", "end", values=(
-                        info['name'],
-                        info['width'],
-                        info['height'],
-                        f"{info['total_pixels']:,}",
-                        info['crs'][:15] + "..." if len(info['crs']) > 15 else info['crs'],
-                        f"{info['res_x']:.4f}",
-                        f"{info['res_y']:.4f}",
-                        status
-                    ))
-                    
-                    # 记录日志
-                    log_msg = f"检查: {info['name']} - {status}"
-                    self.log(status_tag.split('.')[0], log_msg)
-                    
-            except Exception as e:
-                error_msg = f"无法读取文件: {Path(path).name} - {str(e)}"
-                self.result_tree.insert("", "end", values=(
-                    Path(path).name,
-                    "ERROR",
-                    "ERROR",
-                    "ERROR",
-                    "ERROR",
-                    "ERROR",
-                    "ERROR",
-                    f"读取失败"
-                ))
-                self.log("ERROR", error_msg)
+                message = self.ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            
+            kind = message[0]
+            if kind == "files":
+                self._add_files(message[1])
+                budget -= len(message[1])
+            elif kind == "row":
+                _, path, values, level, log_msg = message
+                self.result_tree.insert("", "end", iid=path, values=values)
+                self.log(level, log_msg, scroll=False)
+                budget -= 1
+            elif kind == "progress":
+                self.progress.config(value=message[1])
+                if len(message) > 2:
+                    self.progress.config(maximum=message[2])
+            elif kind == "log":
+                self.log(message[1], message[2], scroll=False)
+                budget -= 1
+            elif kind == "watch_update":
+                self._apply_watch_update(*message[1:])
+                budget -= len(message[2])
+            elif kind in ("done", "scan_done", "deep_done", "stats_done", "correlation_done", "watch_done",
+                          "fix_done", "fingerprint_done"):
+                finished = message
+                break
+        
+        self.log_text.see(tk.END)
+        
+        if finished is None:
+            self.root.after(UI_POLL_INTERVAL_MS, self.process_ui_queue)
+        elif finished[0] == "done":
+            self._finish_check(*finished[1:])
+        elif finished[0] == "scan_done":
+            self._finish_scan(*finished[1:])
+        elif finished[0] == "stats_done":
+            self._finish_stats(*finished[1:])
+        elif finished[0] == "correlation_done":
+            self._finish_correlation(*finished[1:])
+        elif finished[0] == "watch_done":
+            self._finish_watch()
+        elif finished[0] == "fix_done":
+            self._finish_fix(*finished[1:])
+        elif finished[0] == "fingerprint_done":
+            self._finish_fingerprints(*finished[1:])
+        else:
+            self._finish_deep_check(*finished[1:])
+    
+    def _finish_check(self, factor_info, inconsistent_factors, cancelled):
+        """检查结束后更新统计信息及按钮状态"""
+        self.factor_info = factor_info
         
         # 更新统计信息
         total_factors = len(self.factor_info)
         consistent_count = total_factors - len(inconsistent_factors)
         
-        stats_text = f"检查完成: 共 {total_factors} 个因子 | "
+        stats_text = f"检查{'已取消' if cancelled else '完成'}: 共 {total_factors} 个因子 | "
         stats_text += f"一致: {consistent_count} | "
         stats_text += f"不一致: {len(inconsistent_factors)}"
         
@@ -399,10 +1815,506 @@ class FactorCheckerGUI:
                     self.log("WARNING", f"    - {issue}")
         
         self.log("INFO", "=" * 60)
-        self.log("SUCCESS", f"一致性检查完成！")
+        if cancelled:
+            self.log("WARNING", "一致性检查已取消")
+        else:
+            self.log("SUCCESS", f"一致性检查完成！")
+        
+        # 恢复按钮状态
+        self._set_busy(False)
+    
+    def start_watch(self):
+        """持续监视因子目录，文件新增、修改或删除时只重新检查变化的文件"""
+        directory = self.dir_var.get()
+        if not directory or not os.path.isdir(directory):
+            messagebox.showwarning("警告", "请先选择因子目录")
+            return
+        
+        self.log("INFO", "=" * 60)
+        self.log("INFO", f"开始监视目录: {directory}，点击取消按钮停止")
+        
+        self._set_busy(True)
+        self.progress.config(mode="indeterminate")
+        self.progress.start()
+        self.watching = True
+        self.watch_report_path = None
+        
+        self.cancel_event = threading.Event()
+        self.worker_thread = threading.Thread(
+            target=self._watch_worker,
+            args=(
+                directory,
+                self.filter_var.get(),
+                self.cancel_event,
+                self.metadata_cache if self.use_cache_var.get() else None
+            ),
+            daemon=True
+        )
+        self.worker_thread.start()
+        self.root.after(UI_POLL_INTERVAL_MS, self.process_ui_queue)
+    
+    def _watch_worker(self, directory, ext_filter, cancel_event, cache):
+        """后台线程: 首次全部检查，之后每次目录变化时增量检查并发送更新"""
+        try:
+            watcher = DirectoryWatcher(directory, filter_extension(ext_filter))
+        except Exception as e:
+            self.ui_queue.put(("log", "ERROR", f"无法监视目录: {str(e)}"))
+            self.ui_queue.put(("watch_done",))
+            return
+        self.watcher = watcher
+        mode = "文件系统事件" if watcher.uses_events else f"每 {watcher.interval:g} 秒轮询"
+        self.ui_queue.put(("log", "INFO", f"检测方式: {mode}"))
+        
+        session = WatchSession(cache=cache)
+        
+        def factor_info():
+            infos = []
+            for result in session.ordered_results():
+                if result['info'] is not None:
+                    result['info']['issues'] = result['issues']
+                    result['info']['is_reference'] = result['is_reference']
+                    infos.append(result['info'])
+            return infos
+        
+        try:
+            results = session.full_check(list(watcher.snapshot), cancel_event)
+            self.ui_queue.put(("watch_update", list(session.paths),
+                               [self._result_row(result) for result in results], [], factor_info(), True))
+            
+            while True:
+                changes = watcher.wait_for_changes(cancel_event)
+                if changes is None:
+                    break
+                added, modified, removed = changes
+                self.ui_queue.put(("log", "INFO", f"检测到变化: 新增 {len(added)}，修改 {len(modified)}，删除 {len(removed)}"))
+                
+                rechecked, removed, full = session.apply_changes(
+                    list(watcher.snapshot), added, modified, removed, cancel_event
+                )
+                if full:
+                    self.ui_queue.put(("log", "WARNING", "参考因子发生变化，已全部重新检查"))
+                self.ui_queue.put(("watch_update", list(session.paths),
+                                   [self._result_row(result) for result in rechecked], removed, factor_info(), full))
+        except Exception as e:
+            self.ui_queue.put(("log", "ERROR", f"监视过程出错: {str(e)}"))
+        finally:
+            watcher.stop()
+        
+        self.ui_queue.put(("watch_done",))
+    
+    def _apply_watch_update(self, paths, rows, removed, factor_info, full):
+        """将监视模式的增量检查结果更新到文件列表和结果表格"""
+        if paths != self.factor_paths:
+            self.clear_treeview(self.tree)
+            self.factor_paths = []
+            self._add_files(paths)
+        
+        if full:
+            self.clear_treeview(self.result_tree)
+        for path in removed:
+            if self.result_tree.exists(path):
+                self.result_tree.delete(path)
+            self.log("WARNING", f"已删除: {Path(path).name}", scroll=False)
+        
+        for path, values, level, log_msg in rows:
+            if self.result_tree.exists(path):
+                self.result_tree.item(path, values=values)
+            else:
+                self.result_tree.insert("", "end", iid=path, values=values)
+            self.log(level, log_msg, scroll=False)
+        
+        self.factor_info = factor_info
+        inconsistent = sum(bool(info['issues']) for info in factor_info)
+        self.stats_label.config(
+            text=f"监视中 ({datetime.now().strftime('%H:%M:%S')} 更新): 共 {len(factor_info)} 个因子 | "
+                 f"一致: {len(factor_info) - inconsistent} | 不一致: {inconsistent}"
+        )
+        
+        # 导出只读取当前结果，监视期间保持可用；已导出过的报告随每次更新重写
+        self.export_btn.config(state="normal" if factor_info else "disabled")
+        if self.watch_report_path and factor_info:
+            try:
+                self._write_report(self.watch_report_path)
+                self.log("INFO", f"报告已更新: {self.watch_report_path}", scroll=False)
+            except Exception as e:
+                self.log("ERROR", f"报告更新失败: {str(e)}")
+    
+    def _finish_watch(self):
+        """停止监视后恢复界面状态"""
+        self.watcher = None
+        self.watching = False
+        self.watch_report_path = None
+        self.progress.stop()
+        self.progress.config(mode="determinate", value=0)
+        self._set_busy(False)
+        self.log("INFO", "已停止监视目录")
+    
+    def fix_alignment(self):
+        """为网格与参考因子不一致的因子生成对齐到参考网格的 VRT"""
+        reference = next((info for info in self.factor_info if info.get('is_reference')), None)
+        targets = [info for info in self.factor_info if info.get('issues')]
+        if reference is None or not targets:
+            messagebox.showinfo("提示", "没有需要对齐的因子")
+            return
+        
+        output_dir = filedialog.askdirectory(title="选择对齐VRT输出目录")
+        if not output_dir:
+            return
+        
+        self.log("INFO", "=" * 60)
+        self.log("INFO", f"正在为 {len(targets)} 个因子生成对齐VRT (参考因子: {reference['name']})...")
+        
+        self._set_busy(True)
+        self.progress.config(value=0)
+        
+        self.cancel_event = threading.Event()
+        self.worker_thread = threading.Thread(
+            target=self._fix_worker,
+            args=(targets, reference, output_dir),
+            daemon=True
+        )
+        self.worker_thread.start()
+        self.root.after(UI_POLL_INTERVAL_MS, self.process_ui_queue)
+    
+    def _fix_worker(self, targets, reference, output_dir):
+        """后台线程: 生成对齐VRT"""
+        results = []
+        try:
+            results = fix_alignment(
+                targets, reference, output_dir,
+                progress=lambda done, total: self.ui_queue.put(("progress", done, total))
+            )
+        except Exception as e:
+            self.ui_queue.put(("log", "ERROR", f"生成对齐VRT出错: {str(e)}"))
+        
+        self.ui_queue.put(("fix_done", results, output_dir))
+    
+    def _finish_fix(self, results, output_dir):
+        """生成对齐VRT结束后输出结果"""
+        self._set_busy(False)
+        for path, vrt_path, error in results:
+            if error is None:
+                self.log("SUCCESS", f"  {Path(path).name} -> {Path(vrt_path).name}")
+            else:
+                self.log("ERROR", f"  {Path(path).name}: {error}")
+        
+        fixed = sum(error is None for _, _, error in results)
+        if fixed:
+            self.log("SUCCESS", f"已生成 {fixed} 个对齐VRT: {output_dir} (可直接替代原文件参与建模)")
+    
+    def compute_fingerprints(self):
+        """计算各因子的分块内容指纹，可与之前保存的指纹比较"""
+        paths = [info['path'] for info in self.factor_info]
+        if not paths:
+            return
+        
+        previous = {}
+        if messagebox.askyesno("内容指纹", "是否与之前保存的指纹 (或命令行JSON报告) 比较？"):
+            previous_path = filedialog.askopenfilename(
+                filetypes=[("JSON文件", "*.json")],
+                title="选择之前的指纹文件"
+            )
+            if not previous_path:
+                return
+            try:
+                previous = load_fingerprints(previous_path)
+            except Exception as e:
+                messagebox.showerror("错误", f"无法读取指纹文件:\n{str(e)}")
+                return
+        
+        self.log("INFO", "=" * 60)
+        self.log("INFO", f"开始计算内容指纹 ({len(paths)} 个因子，算法 {default_hash_algorithm()})...")
+        
+        self._set_busy(True)
+        self.progress.config(value=0)
+        
+        self.cancel_event = threading.Event()
+        self.worker_thread = threading.Thread(
+            target=self._fingerprint_worker,
+            args=(paths, previous, self.cancel_event),
+            daemon=True
+        )
+        self.worker_thread.start()
+        self.root.after(UI_POLL_INTERVAL_MS, self.process_ui_queue)
+    
+    def _fingerprint_worker(self, paths, previous, cancel_event):
+        """后台线程: 并行计算内容指纹"""
+        fingerprints = {}
+        comparison = {}
+        try:
+            start = time.perf_counter()
+            fingerprints = compute_fingerprints(
+                paths,
+                cancel_event=cancel_event,
+                progress=lambda done, total: self.ui_queue.put(("progress", done, total))
+            )
+            elapsed = time.perf_counter() - start
+            self.ui_queue.put(("log", "INFO", f"指纹计算耗时 {elapsed:.1f} 秒"))
+            if previous:
+                comparison = compare_fingerprints(fingerprints, previous)
+        except Exception as e:
+            self.ui_queue.put(("log", "ERROR", f"指纹计算出错: {str(e)}"))
+        
+        self.ui_queue.put(("fingerprint_done", fingerprints, comparison, cancel_event.is_set()))
+    
+    def _finish_fingerprints(self, fingerprints, comparison, cancelled):
+        """指纹计算结束后输出结果，并可保存供下次比较"""
+        self._set_busy(False)
+        
+        for info in self.factor_info:
+            fingerprint = fingerprints.get(info['path'])
+            if fingerprint is None:
+                continue
+            if 'error' in fingerprint:
+                self.log("ERROR", f"  {info['name']}: 指纹计算失败 - {fingerprint['error']}")
+                continue
+            info['fingerprint'] = fingerprint
+            info['content_drift'] = comparison.get(info['path'])
+            
+            drift = info['content_drift']
+            if drift is None:
+                self.log("INFO", f"  {info['name']}: {fingerprint['digest']}")
+            elif drift['status'] == "changed":
+                self.log("WARNING", f"  {info['name']}: 内容已变化 (变化行块 {len(drift['changed_rows'])} 个)")
+            else:
+                self.log("SUCCESS" if drift['status'] == "unchanged" else "INFO",
+                         f"  {info['name']}: {FINGERPRINT_STATUS_TEXT[drift['status']]}")
+        
+        if cancelled:
+            self.log("WARNING", "指纹计算已取消，结果不完整")
+            return
+        
+        completed = {path: fingerprint for path, fingerprint in fingerprints.items() if 'error' not in fingerprint}
+        if not completed:
+            return
+        save_path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            initialfile="fingerprints.json",
+            filetypes=[("JSON文件", "*.json")],
+            title="保存指纹供下次比较 (可取消)"
+        )
+        if save_path:
+            save_fingerprints(save_path, completed)
+            self.log("SUCCESS", f"指纹已保存到: {save_path}")
+    
+    def deep_check(self):
+        """逐像元检查各因子NoData范围是否一致 (仅检查表头一致的因子)"""
+        candidates = [info for info in self.factor_info if not info.get('issues')]
+        if len(candidates) < 2:
+            messagebox.showwarning("警告", "表头一致的因子少于两个，无法进行深度检查")
+            return
+        
+        mismatch_path = filedialog.asksaveasfilename(
+            defaultextension=".tif",
+            initialfile="nodata_mismatch.tif",
+            filetypes=[("GeoTIFF文件", "*.tif")],
+            title="保存NoData不一致栅格"
+        )
+        if not mismatch_path:
+            return
+        
+        self.log("INFO", "=" * 60)
+        self.log("INFO", f"开始NoData深度检查 ({len(candidates)} 个因子)...")
+        
+        self._set_busy(True)
+        self.progress.config(value=0)
         
-        # 启用导出按钮
-        self.export_btn.config(state="normal")
+        self.cancel_event = threading.Event()
+        self.worker_thread = threading.Thread(
+            target=self._deep_check_worker,
+            args=([info['path'] for info in candidates], mismatch_path, self.cancel_event),
+            daemon=True
+        )
+        self.worker_thread.start()
+        self.root.after(UI_POLL_INTERVAL_MS, self.process_ui_queue)
+    
+    def _deep_check_worker(self, paths, mismatch_path, cancel_event):
+        """后台线程: 执行NoData深度检查"""
+        result = None
+        try:
+            result = check_nodata_footprints(
+                paths,
+                mismatch_path=mismatch_path,
+                cancel_event=cancel_event,
+                progress=lambda done, total: self.ui_queue.put(("progress", done, total))
+            )
+        except Exception as e:
+            self.ui_queue.put(("log", "ERROR", f"深度检查出错: {str(e)}"))
+        
+        self.ui_queue.put(("deep_done", result, mismatch_path))
+    
+    def _finish_deep_check(self, result, mismatch_path):
+        """深度检查结束后输出结果"""
+        self._set_busy(False)
+        if result is None:
+            return
+        
+        # 记录到因子信息中，随报告导出
+        info_by_path = {info['path']: info for info in self.factor_info}
+        for factor in result['factors']:
+            info = info_by_path[factor['path']]
+            info['nodata_pixels'] = factor['invalid_pixels']
+            info['unique_nodata_pixels'] = factor['unique_invalid_pixels']
+        
+        total = result['total_pixels']
+        self.log("INFO", f"共同有效像元: {result['jointly_valid_pixels']:,}/{total:,} "
+                         f"({result['jointly_valid_pixels'] / total:.2%})")
+        for factor in result['factors']:
+            level = "WARNING" if factor['unique_invalid_pixels'] else "SUCCESS"
+            self.log(level, f"  {factor['name']}: 无效像元 {factor['invalid_pixels']:,}，"
+                            f"其中其余因子均有效的 {factor['unique_invalid_pixels']:,}")
+        
+        if result['cancelled']:
+            self.log("WARNING", "NoData深度检查已取消，结果不完整")
+        elif result['mismatch_pixels']:
+            self.log("WARNING", f"NoData范围不一致像元: {result['mismatch_pixels']:,}，详见 {mismatch_path}")
+        else:
+            self.log("SUCCESS", "所有因子NoData范围一致")
+    
+    def compute_stats(self):
+        """统计各因子有效像元的值分布 (各文件并行、单次流式读取)"""
+        paths = [info['path'] for info in self.factor_info]
+        if not paths:
+            return
+        
+        self.log("INFO", "=" * 60)
+        self.log("INFO", f"开始统计因子值分布 ({len(paths)} 个因子)...")
+        
+        self._set_busy(True)
+        self.progress.config(maximum=len(paths), value=0)
+        
+        self.cancel_event = threading.Event()
+        self.worker_thread = threading.Thread(
+            target=self._stats_worker,
+            args=(paths, self.cancel_event),
+            daemon=True
+        )
+        self.worker_thread.start()
+        self.root.after(UI_POLL_INTERVAL_MS, self.process_ui_queue)
+    
+    def _stats_worker(self, paths, cancel_event):
+        """后台线程: 执行统计"""
+        results = []
+        try:
+            results = compute_statistics(
+                paths,
+                cancel_event=cancel_event,
+                progress=lambda done, total: self.ui_queue.put(("progress", done, total))
+            )
+        except Exception as e:
+            self.ui_queue.put(("log", "ERROR", f"统计过程出错: {str(e)}"))
+        
+        self.ui_queue.put(("stats_done", results, cancel_event.is_set()))
+    
+    def _finish_stats(self, results, cancelled):
+        """统计结束后填充结果表格，并记录到因子信息中随报告导出"""
+        self._set_busy(False)
+        info_by_path = {info['path']: info for info in self.factor_info}
+        
+        for result in results:
+            name = Path(result['path']).name
+            if 'error' in result:
+                self.log("ERROR", f"统计失败: {name} - {result['error']}")
+                continue
+            if result['cancelled']:
+                continue
+            
+            info_by_path[result['path']]['statistics'] = result
+            if result.get('infinite_pixels'):
+                self.log("WARNING", f"  {name}: {result['infinite_pixels']:,} 个像元为 ±inf，已排除在统计之外")
+            if result['valid_pixels'] == 0:
+                self.log("WARNING", f"  {name}: 无有效像元")
+                continue
+            
+            values = [f"{result[key]:.4g}" for key in ('min', 'max', 'mean', 'std')]
+            for column, value in zip(("最小值", "最大值", "均值", "标准差"), values):
+                self.result_tree.set(result['path'], column, value)
+            self.log("INFO", f"  {name}: 有效像元 {result['valid_pixels']:,}，"
+                             f"范围 [{values[0]}, {values[1]}]，均值 {values[2]}，标准差 {values[3]}")
+        
+        if cancelled:
+            self.log("WARNING", "统计已取消，未完成的因子不显示结果")
+        else:
+            self.log("SUCCESS", "因子值分布统计完成！")
+    
+    def compute_correlation(self):
+        """计算表头一致因子间的相关系数矩阵及VIF"""
+        candidates = [info for info in self.factor_info if not info.get('issues')]
+        if len(candidates) < 2:
+            messagebox.showwarning("警告", "表头一致的因子少于两个，无法进行共线性分析")
+            return
+        
+        sample_fraction = simpledialog.askfloat(
+            "像元采样",
+            "参与统计的像元比例 (0-1]，大数据量时可减小以加快计算:",
+            initialvalue=1.0,
+            minvalue=0.001,
+            maxvalue=1.0,
+            parent=self.root
+        )
+        if sample_fraction is None:
+            return
+        
+        self.log("INFO", "=" * 60)
+        self.log("INFO", f"开始共线性分析 ({len(candidates)} 个因子，采样比例 {sample_fraction:g})...")
+        
+        self._set_busy(True)
+        self.progress.config(value=0)
+        
+        self.cancel_event = threading.Event()
+        self.worker_thread = threading.Thread(
+            target=self._correlation_worker,
+            args=([info['path'] for info in candidates], sample_fraction, self.cancel_event),
+            daemon=True
+        )
+        self.worker_thread.start()
+        self.root.after(UI_POLL_INTERVAL_MS, self.process_ui_queue)
+    
+    def _correlation_worker(self, paths, sample_fraction, cancel_event):
+        """后台线程: 执行相关性及VIF计算"""
+        result = None
+        try:
+            result = compute_correlation(
+                paths,
+                sample_fraction=sample_fraction,
+                cancel_event=cancel_event,
+                progress=lambda done, total: self.ui_queue.put(("progress", done, total))
+            )
+        except Exception as e:
+            self.ui_queue.put(("log", "ERROR", f"共线性分析出错: {str(e)}"))
+        
+        self.ui_queue.put(("correlation_done", result))
+    
+    def _finish_correlation(self, result):
+        """共线性分析结束后输出结果"""
+        self._set_busy(False)
+        if result is None:
+            return
+        
+        self.correlation_result = result
+        self.log("INFO", f"参与统计的共同有效像元: {result['n_pixels']:,}")
+        
+        # 强相关因子对
+        names = result['names']
+        correlation = result['correlation']
+        for i in range(len(names)):
+            for j in range(i + 1, len(names)):
+                r = correlation[i][j]
+                if not np.isnan(r) and abs(r) >= 0.7:
+                    self.log("WARNING", f"  强相关: {names[i]} - {names[j]} (r = {r:.3f})")
+        
+        for name, vif, tolerance in zip(names, result['vif'], result['tolerance']):
+            if np.isnan(vif):
+                self.log("WARNING", f"  {name}: 常数因子，无法计算VIF")
+            elif vif >= VIF_THRESHOLD:
+                self.log("WARNING", f"  {name}: VIF = {vif:.2f}，容差 = {tolerance:.3f} (存在多重共线性)")
+            else:
+                self.log("SUCCESS", f"  {name}: VIF = {vif:.2f}，容差 = {tolerance:.3f}")
+        
+        if result['cancelled']:
+            self.log("WARNING", "共线性分析已取消，结果仅基于已读取部分")
+        else:
+            self.log("SUCCESS", "共线性分析完成！")
     
     def clear_list(self):
         """清空文件列表"""
@@ -410,9 +2322,15 @@ class FactorCheckerGUI:
         self.clear_treeview(self.result_tree)
         self.factor_paths = []
         self.factor_info = []
+        self.correlation_result = None
         self.stats_label.config(text="等待检查...")
         self.check_btn.config(state="disabled")
         self.export_btn.config(state="disabled")
+        self.deep_check_btn.config(state="disabled")
+        self.stats_btn.config(state="disabled")
+        self.correlation_btn.config(state="disabled")
+        self.fix_btn.config(state="disabled")
+        self.fingerprint_btn.config(state="disabled")
         self.log("INFO", "列表已清空")
     
     def export_report(self):
@@ -436,74 +2354,406 @@ class FactorCheckerGUI:
             return
         
         try:
-            # 准备数据
-            data = []
-            for info in self.factor_info:
-                data.append({
-                    '文件名': info['name'],
-                    '文件路径': info['path'],
-                    '宽度(列数)': info['width'],
-                    '高度(行数)': info['height'],
-                    '像元总数': info['total_pixels'],
-                    '坐标系': info['crs'],
-                    'X分辨率': info['res_x'],
-                    'Y分辨率': info['res_y'],
-                    '无效值': info['nodata'],
-                    '数据类型': info['dtype'],
-                    '左上X': info['bounds'][0],
-                    '左上Y': info['bounds'][1],
-                    '右下X': info['bounds'][2],
-                    '右下Y': info['bounds'][3]
-                })
-            
-            df = pd.DataFrame(data)
-            
-            # 根据文件类型保存
-            if file_path.endswith('.xlsx'):
-                with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-                    df.to_excel(writer, sheet_name='因子信息', index=False)
-                    
-                    # 添加统计信息
-                    stats_df = pd.DataFrame([{
-                        '检查时间': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                        '总因子数': len(df),
-                        '宽度范围': f"{df['宽度(列数)'].min()} - {df['宽度(列数)'].max()}",
-                        '高度范围': f"{df['高度(行数)'].min()} - {df['高度(列数)'].max()}",
-                        '不一致数量': len(df[df['宽度(列数)'] != df['宽度(列数)'].iloc[0]])
-                    }])
-                    stats_df.to_excel(writer, sheet_name='统计信息', index=False)
-                    
-            elif file_path.endswith('.csv'):
-                df.to_csv(file_path, index=False, encoding='utf-8-sig')
-            else:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write("滑坡因子一致性检查报告\n")
-                    f.write("=" * 60 + "\n\n")
-                    f.write(f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                    f.write(f"总因子数: {len(df)}\n\n")
-                    
-                    f.write("详细信息:\n")
-                    f.write("-" * 60 + "\n")
-                    for _, row in df.iterrows():
-                        f.write(f"\n文件: {row['文件名']}\n")
-                        f.write(f"  尺寸: {row['宽度(列数)']} × {row['高度(行数)']} = {row['像元总数']:,} 像元\n")
-                        f.write(f"  分辨率: {row['X分辨率']:.6f}, {row['Y分辨率']:.6f}\n")
-                        f.write(f"  坐标系: {row['坐标系']}\n")
-            
+            self._write_report(file_path)
             self.log("SUCCESS", f"报告已导出到: {file_path}")
+            if self.watching:
+                # 监视期间记住该路径，之后每次更新后自动重写
+                self.watch_report_path = file_path
+                self.log("INFO", "监视期间每次更新后将自动重写该报告")
             messagebox.showinfo("成功", f"报告已成功导出到:\n{file_path}")
             
         except Exception as e:
             self.log("ERROR", f"导出失败: {str(e)}")
             messagebox.showerror("错误", f"导出失败:\n{str(e)}")
+    
+    def _write_report(self, file_path):
+        """按扩展名将当前检查结果写入 xlsx / csv / txt 报告"""
+        import pandas as pd
+        
+        # 准备数据
+        data = []
+        histogram_rows = []
+        for info in self.factor_info:
+            statistics = info.get('statistics', {})
+            data.append({
+                '文件名': info['name'],
+                '文件路径': info['path'],
+                '宽度(列数)': info['width'],
+                '高度(行数)': info['height'],
+                '像元总数': info['total_pixels'],
+                '坐标系': info['crs'],
+                'X分辨率': info['res_x'],
+                'Y分辨率': info['res_y'],
+                '无效值': info['nodata'],
+                '数据类型': info['dtype'],
+                '左上X': info['bounds'][0],
+                '左上Y': info['bounds'][1],
+                '右下X': info['bounds'][2],
+                '右下Y': info['bounds'][3],
+                '无效像元数': info.get('nodata_pixels'),
+                '独有无效像元数': info.get('unique_nodata_pixels'),
+                '有效像元数': statistics.get('valid_pixels'),
+                '无穷值像元数': statistics.get('infinite_pixels'),
+                '最小值': statistics.get('min'),
+                '最大值': statistics.get('max'),
+                '均值': statistics.get('mean'),
+                '标准差': statistics.get('std'),
+                '内容指纹': info.get('fingerprint', {}).get('digest'),
+                '内容变化': FINGERPRINT_STATUS_TEXT[info['content_drift']['status']] if info.get('content_drift') else None
+            })
+            
+            edges = statistics.get('hist_edges', [])
+            for i, count in enumerate(statistics.get('hist_counts', []) if edges else []):
+                histogram_rows.append({
+                    '文件名': info['name'],
+                    '区间下限': edges[i],
+                    '区间上限': edges[i + 1],
+                    '像元数': count
+                })
+        
+        df = pd.DataFrame(data)
+        histogram_df = pd.DataFrame(histogram_rows, columns=['文件名', '区间下限', '区间上限', '像元数'])
+        
+        correlation_df = None
+        vif_df = None
+        if self.correlation_result is not None:
+            names = self.correlation_result['names']
+            correlation_df = pd.DataFrame(self.correlation_result['correlation'], index=names, columns=names)
+            vif_df = pd.DataFrame({
+                '因子': names,
+                'VIF': self.correlation_result['vif'],
+                '容差': self.correlation_result['tolerance']
+            })
+        
+        # 根据文件类型保存
+        if file_path.endswith('.xlsx'):
+            with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
+                df.to_excel(writer, sheet_name='因子信息', index=False)
+                
+                # 添加统计信息
+                stats_df = pd.DataFrame([{
+                    '检查时间': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    '总因子数': len(df),
+                    '宽度范围': f"{df['宽度(列数)'].min()} - {df['宽度(列数)'].max()}",
+                    '高度范围': f"{df['高度(行数)'].min()} - {df['高度(行数)'].max()}",
+                    '不一致数量': len(df[df['宽度(列数)'] != df['宽度(列数)'].iloc[0]])
+                }])
+                stats_df.to_excel(writer, sheet_name='统计信息', index=False)
+                
+                if not histogram_df.empty:
+                    histogram_df.to_excel(writer, sheet_name='直方图', index=False)
+                
+                if correlation_df is not None:
+                    correlation_df.to_excel(writer, sheet_name='相关系数矩阵')
+                    vif_df.to_excel(writer, sheet_name='共线性诊断', index=False)
+                
+        elif file_path.endswith('.csv'):
+            df.to_csv(file_path, index=False, encoding='utf-8-sig')
+            # 直方图为长表，另存为同名 _histogram.csv
+            if not histogram_df.empty:
+                histogram_df.to_csv(
+                    os.path.splitext(file_path)[0] + "_histogram.csv",
+                    index=False, encoding='utf-8-sig'
+                )
+            if correlation_df is not None:
+                correlation_df.to_csv(os.path.splitext(file_path)[0] + "_correlation.csv", encoding='utf-8-sig')
+                vif_df.to_csv(os.path.splitext(file_path)[0] + "_vif.csv", index=False, encoding='utf-8-sig')
+        else:
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write("滑坡因子一致性检查报告\n")
+                f.write("=" * 60 + "\n\n")
+                f.write(f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+                f.write(f"总因子数: {len(df)}\n\n")
+                
+                f.write("详细信息:\n")
+                f.write("-" * 60 + "\n")
+                for _, row in df.iterrows():
+                    f.write(f"\n文件: {row['文件名']}\n")
+                    f.write(f"  尺寸: {row['宽度(列数)']} × {row['高度(行数)']} = {row['像元总数']:,} 像元\n")
+                    f.write(f"  分辨率: {row['X分辨率']:.6f}, {row['Y分辨率']:.6f}\n")
+                    f.write(f"  坐标系: {row['坐标系']}\n")
+                    if pd.notna(row['均值']):
+                        f.write(f"  值范围: {row['最小值']:.6g} ~ {row['最大值']:.6g}, "
+                                f"均值: {row['均值']:.6g}, 标准差: {row['标准差']:.6g}\n")
+                
+                if correlation_df is not None:
+                    f.write("\n共线性诊断:\n")
+                    f.write("-" * 60 + "\n")
+                    f.write(f"共同有效像元: {self.correlation_result['n_pixels']:,}\n\n")
+                    f.write("相关系数矩阵:\n")
+                    f.write(correlation_df.round(3).to_string() + "\n\n")
+                    for _, row in vif_df.iterrows():
+                        f.write(f"  {row['因子']}: VIF = {row['VIF']:.2f}, 容差 = {row['容差']:.3f}\n")
+
+
+def _print_result(result):
+    """命令行模式下输出单个文件的检查结果"""
+    name = Path(result['path']).name
+    if result['error'] is not None:
+        print(f"[读取失败] {name}: {result['error']}")
+    elif result['is_reference']:
+        print(f"[参考因子] {name}")
+    elif result['issues']:
+        print(f"[不一致] {name}: {'; '.join(result['issues'])}")
+    else:
+        print(f"[一致] {name}")
+
+
+def _summarize(results):
+    """统计 (一致数, 不一致数, 读取失败数)"""
+    errors = sum(result['error'] is not None for result in results)
+    inconsistent = sum(bool(result['issues']) for result in results)
+    return len(results) - inconsistent - errors, inconsistent, errors
 
 
-def main():
-    """主函数"""
+def write_json_report(json_path, results, directory, ext_filter, fingerprints=None, comparison=None):
+    """将检查结果写入 JSON 报告 (可附带内容指纹及与上次指纹的比较结果)"""
+    fingerprints = fingerprints or {}
+    comparison = comparison or {}
+    consistent, inconsistent, errors = _summarize(results)
+    report = {
+        'checked_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'directory': os.path.abspath(directory),
+        'filter': ext_filter,
+        'total': len(results),
+        'consistent': consistent,
+        'inconsistent': inconsistent,
+        'errors': errors,
+        'reference': next((result['path'] for result in results if result['is_reference']), None),
+        'factors': [
+            {
+                'path': result['path'],
+                'is_reference': result['is_reference'],
+                'issues': result['issues'],
+                'error': result['error'],
+                'info': result['info'],
+                'fingerprint': fingerprints.get(result['path']),
+                'content_drift': comparison.get(result['path'])
+            }
+            for result in results
+        ]
+    }
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def write_csv_report(csv_path, results, fingerprints=None, comparison=None):
+    """将检查结果写入 CSV 报告"""
+    fingerprints = fingerprints or {}
+    comparison = comparison or {}
+    with open(csv_path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(['文件名', '文件路径', '宽度(列数)', '高度(行数)', '坐标系', 'X分辨率', 'Y分辨率',
+                         '无效值', '数据类型', '状态', '不一致项', '内容指纹', '内容变化'])
+        for result in results:
+            info = result['info']
+            if result['error'] is not None:
+                writer.writerow([Path(result['path']).name, result['path']] + [''] * 7
+                                + ['读取失败', result['error'], '', ''])
+                continue
+            status = "参考因子" if result['is_reference'] else ("不一致" if result['issues'] else "一致")
+            drift = comparison.get(result['path'])
+            writer.writerow([
+                info['name'], info['path'], info['width'], info['height'], info['crs'],
+                info['res_x'], info['res_y'], info['nodata'], info['dtype'],
+                status, '; '.join(result['issues']),
+                fingerprints.get(result['path'], {}).get('digest', ''),
+                FINGERPRINT_STATUS_TEXT[drift['status']] if drift else ''
+            ])
+
+
+def run_cli(directory, ext_filter="*.tif", json_path=None, csv_path=None,
+            max_workers=MAX_WORKERS, cache_path=DEFAULT_CACHE_PATH, quiet=False,
+            fix_vrt_dir=None, fingerprint=False, previous_path=None,
+            watch=False, interval=WATCH_INTERVAL_S):
+    """
+    命令行批处理: 扫描目录、并发检查元数据一致性并输出报告
+    
+    Parameters:
+    -----------
+    directory : str
+        因子目录
+    ext_filter : str
+        文件类型过滤条件 (同GUI，如 "*.tif"、"*.*")
+    json_path, csv_path : str, optional
+        JSON/CSV 报告输出路径
+    max_workers : int
+        并发读取线程数
+    cache_path : str, optional
+        元数据缓存路径，None 表示不使用缓存
+    quiet : bool
+        只输出汇总信息
+    fix_vrt_dir : str, optional
+        为不一致的因子在该目录生成对齐到参考网格的 VRT
+    fingerprint : bool
+        计算分块内容指纹并写入报告
+    previous_path : str, optional
+        上次的 JSON 报告或指纹文件，与之比较以发现表头相同但内容变化的文件 (隐含 fingerprint)
+    watch : bool
+        检查完成后持续监视目录，只重新检查变化的文件并更新报告，Ctrl+C 退出
+    interval : float
+        监视模式轮询间隔 (秒)
+    
+    Returns:
+    --------
+    int
+        退出码 (监视模式下为退出时的状态): EXIT_OK 全部一致，
+        EXIT_INCONSISTENT 存在不一致、读取失败或内容变化的文件，EXIT_ERROR 目录不存在或未找到文件
+    """
+    if not os.path.isdir(directory):
+        print(f"目录不存在: {directory}", file=sys.stderr)
+        return EXIT_ERROR
+    
+    extension = filter_extension(ext_filter)
+    watcher = DirectoryWatcher(directory, extension, interval) if watch else None
+    paths = list(watcher.snapshot) if watch else [
+        entry.path for entry in iter_raster_files(directory, extension)
+    ]
+    if not paths and not watch:
+        print(f"未找到匹配 {ext_filter} 的文件: {directory}", file=sys.stderr)
+        return EXIT_ERROR
+    
+    previous = {}
+    if previous_path:
+        try:
+            previous = load_fingerprints(previous_path)
+        except Exception as e:
+            print(f"无法读取上次的指纹: {e}", file=sys.stderr)
+            return EXIT_ERROR
+        if not previous:
+            print(f"{previous_path} 中没有指纹 (生成时需加 --fingerprint)", file=sys.stderr)
+        fingerprint = True
+    
+    cache = None
+    if cache_path:
+        try:
+            cache = MetadataCache(cache_path)
+        except Exception as e:
+            print(f"元数据缓存不可用，将直接读取文件: {e}", file=sys.stderr)
+    
+    fingerprints = {}
+    comparison = {}
+    
+    def report(results, printed):
+        if not quiet:
+            for result in printed:
+                _print_result(result)
+        
+        if fingerprint:
+            # 只为本次检查过的文件重新计算指纹
+            current = {result['path'] for result in results}
+            for path in list(fingerprints):
+                if path not in current:
+                    del fingerprints[path]
+            fingerprints.update(compute_fingerprints(
+                [result['path'] for result in printed if result['error'] is None]
+            ))
+            comparison.clear()
+            if previous:
+                comparison.update(compare_fingerprints(fingerprints, previous))
+            for path in (result['path'] for result in printed):
+                if 'error' in fingerprints.get(path, {}):
+                    print(f"[指纹失败] {Path(path).name}: {fingerprints[path]['error']}")
+                elif comparison.get(path, {}).get('status') == "changed":
+                    rows = comparison[path]['changed_rows']
+                    detail = f"，变化行块 {len(rows)} 个 (首个: 第 {rows[0][0]}-{rows[0][1]} 行)" if rows else ""
+                    print(f"[内容变化] {Path(path).name}{detail}")
+        
+        if json_path:
+            write_json_report(json_path, results, directory, ext_filter, fingerprints, comparison)
+        if csv_path:
+            write_csv_report(csv_path, results, fingerprints, comparison)
+        consistent, inconsistent, errors = _summarize(results)
+        summary = f"共 {len(results)} 个因子 | 一致: {consistent} | 不一致: {inconsistent} | 读取失败: {errors}"
+        if previous:
+            drifted = sum(item['status'] == "changed" for item in comparison.values())
+            summary += f" | 内容变化: {drifted}"
+        print(summary)
+    
+    session = WatchSession(max_workers, cache)
+    try:
+        results = session.full_check(paths)
+        report(results, results)
+        
+        if fix_vrt_dir and session.reference_path is not None:
+            targets = [result['info'] for result in results if result['issues']]
+            reference_info = session.results[session.reference_path]['info']
+            for path, vrt_path, error in fix_alignment(targets, reference_info, fix_vrt_dir):
+                if error is None:
+                    print(f"[已对齐] {Path(path).name} -> {vrt_path}")
+                else:
+                    print(f"[对齐失败] {Path(path).name}: {error}")
+        
+        if watch:
+            mode = "文件系统事件" if watcher.uses_events else f"每 {interval:g} 秒轮询"
+            print(f"正在监视目录 ({mode})，按 Ctrl+C 退出...")
+            try:
+                while True:
+                    added, modified, removed = watcher.wait_for_changes()
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] 新增 {len(added)}，"
+                          f"修改 {len(modified)}，删除 {len(removed)}")
+                    for path in removed:
+                        print(f"[已删除] {Path(path).name}")
+                    rechecked, _, full = session.apply_changes(list(watcher.snapshot), added, modified, removed)
+                    if full:
+                        print("参考因子发生变化，已全部重新检查")
+                    report(session.ordered_results(), rechecked)
+            except KeyboardInterrupt:
+                print("已停止监视")
+            finally:
+                watcher.stop()
+    finally:
+        if cache is not None:
+            cache.close()
+    
+    _, inconsistent, errors = _summarize(session.ordered_results())
+    drifted = any(item['status'] == "changed" for item in comparison.values())
+    return EXIT_INCONSISTENT if inconsistent or errors or drifted else EXIT_OK
+
+
+def main(argv=None):
+    """主函数: 无参数时启动GUI，指定目录时以命令行模式运行"""
+    parser = argparse.ArgumentParser(description="滑坡易发性评价因子一致性检查工具 (不带参数运行时启动GUI)")
+    parser.add_argument("directory", nargs="?", help="因子目录 (指定后以命令行模式运行)")
+    parser.add_argument("--filter", default="*.tif", help="文件类型过滤条件，默认 *.tif，*.* 表示所有文件")
+    parser.add_argument("--json", dest="json_path", help="JSON 报告输出路径")
+    parser.add_argument("--csv", dest="csv_path", help="CSV 报告输出路径")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help=f"并发读取线程数，默认 {MAX_WORKERS}")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="元数据缓存路径")
+    parser.add_argument("--no-cache", action="store_true", help="不使用元数据缓存")
+    parser.add_argument("-q", "--quiet", action="store_true", help="只输出汇总信息")
+    parser.add_argument("--fix-vrt", dest="fix_vrt_dir", metavar="DIR",
+                        help="为不一致的因子在 DIR 中生成对齐到参考网格的 VRT (不复制像元数据)")
+    parser.add_argument("--fingerprint", action="store_true", help="计算分块内容指纹并写入报告")
+    parser.add_argument("--previous", dest="previous_path", metavar="JSON",
+                        help="与上次的 JSON 报告或指纹文件比较，发现表头相同但内容变化的文件")
+    parser.add_argument("--watch", action="store_true", help="检查后持续监视目录，只重新检查变化的文件")
+    parser.add_argument("--interval", type=float, default=WATCH_INTERVAL_S,
+                        help=f"监视模式轮询间隔 (秒)，默认 {WATCH_INTERVAL_S:g}")
+    args = parser.parse_args(argv)
+    
+    if args.directory is not None:
+        return run_cli(
+            args.directory,
+            ext_filter=args.filter,
+            json_path=args.json_path,
+            csv_path=args.csv_path,
+            max_workers=args.workers,
+            cache_path=None if args.no_cache else args.cache,
+            quiet=args.quiet,
+            fix_vrt_dir=args.fix_vrt_dir,
+            fingerprint=args.fingerprint,
+            previous_path=args.previous_path,
+            watch=args.watch,
+            interval=args.interval
+        )
+    
+    _import_tk()
     root = tk.Tk()
     app = FactorCheckerGUI(root)
     root.mainloop()
+    return EXIT_OK
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
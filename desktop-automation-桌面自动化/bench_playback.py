@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+桌面自动化工具 - 回放时间精度与吞吐量基准测试
+
+生成指定规模和事件构成的合成录制，按各档播放速度用 PlaybackScheduler 回放到
+输入后端 (默认内存中的假后端，不操作桌面)，统计实际每秒事件数、时间误差百分位数
+及 CPU 占用，并测量输入后端的最大持续吞吐量。结果以 JSON 输出，可追加到历史文件中跟踪变化。
+
+使用方法:
+    python bench_playback.py --events 20000 --speeds 1,10,100,1000,10000 --history playback_bench_history.jsonl
+    xvfb-run python bench_playback.py --backend xtest   # 在虚拟 X 服务器上测试 XTest 后端
+"""
+
+import argparse
+import bisect
+import importlib.util
+import json
+import os
+import random
+import string
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+MODULE_PATH = Path(__file__).with_name('zidonghua.py')
+
+# 默认事件构成 (各类型所占比例)，点击和按键按 按下/释放 成对生成
+DEFAULT_MIX = 'move=0.85,click=0.05,scroll=0.05,key=0.05'
+DEFAULT_SPEEDS = '1,10,100,1000,10000'
+KEY_NAMES = list(string.ascii_lowercase + string.digits) + ['space', 'enter', 'shift', 'backspace']
+SCREEN_SIZE = (1920, 1080)
+
+
+def load_module():
+    """按路径导入 zidonghua.py (输入后端均为按需导入，无桌面环境也可加载)"""
+    spec = importlib.util.spec_from_file_location('zidonghua', MODULE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def parse_mix(text):
+    """解析 'move=0.85,click=0.05' 形式的事件构成，返回归一化后的比例"""
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in ('move', 'click', 'scroll', 'key'):
+            raise ValueError(f"未知的事件类型: {name}")
+        mix[name] = float(weight)
+    total = sum(mix.values())
+    if total <= 0:
+        raise ValueError("事件比例之和必须大于 0")
+    return {name: weight / total for name, weight in mix.items()}
+
+
+def generate_recording(zidonghua, n_events, mix, interval, seed=0):
+    """
+    生成合成录制
+
+    Parameters:
+    -----------
+    n_events : int
+        事件数 (成对事件可能使总数多出 1)
+    mix : dict
+        各事件类型所占比例
+    interval : float
+        相邻事件的平均间隔 (秒)，实际间隔服从指数分布
+    seed : int
+        随机种子，保证多次运行的录制一致
+    """
+    rng = random.Random(seed)
+    EventType = zidonghua.EventType
+    events = zidonghua.EventStore()
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    x, y = SCREEN_SIZE[0] // 2, SCREEN_SIZE[1] // 2
+
+    def gap():
+        return rng.expovariate(1 / interval) if interval > 0 else 0.0
+
+    while len(events) < n_events:
+        kind = rng.choices(names, weights)[0]
+        if kind == 'move':
+            x = min(max(x + rng.randint(-20, 20), 0), SCREEN_SIZE[0] - 1)
+            y = min(max(y + rng.randint(-20, 20), 0), SCREEN_SIZE[1] - 1)
+            events.append(EventType.MOUSE_MOVE, x, y, time=gap())
+        elif kind == 'click':
+            button = rng.choice(('left', 'left', 'left', 'right'))
+            events.append(EventType.MOUSE_CLICK, x, y, key=button, pressed=True, time=gap())
+            events.append(EventType.MOUSE_CLICK, x, y, key=button, pressed=False, time=gap())
+        elif kind == 'scroll':
+            events.append(EventType.MOUSE_SCROLL, x, y, 0, rng.choice((-1, 1)), time=gap())
+        else:
+            key = rng.choice(KEY_NAMES)
+            events.append(EventType.KEY_PRESS, key=key, time=gap())
+            events.append(EventType.KEY_RELEASE, key=key, time=gap())
+    return events
+
+
+def create_backend(zidonghua, name):
+    """创建输入后端；auto 在有 X 显示且安装了 python-xlib 时使用 XTest，否则使用假后端"""
+    if name == 'auto':
+        if os.environ.get('DISPLAY') and importlib.util.find_spec('Xlib') is not None:
+            name = 'xtest'
+        else:
+            name = 'fake'
+    if name == 'fake':
+        # 长时间测试时不保留注入的事件，避免内存增长
+        return zidonghua.FakeBackend(keep_events=False)
+    return zidonghua.INPUT_BACKENDS[name]()
+
+
+def replay(zidonghua, events, backend, speed, max_seconds):
+    """按指定速度回放一次，超过 max_seconds 时提前停止，返回该档速度的统计结果"""
+    scheduler = zidonghua.PlaybackScheduler(events)
+    backend.fast_mode = speed > zidonghua.FAST_MODE_SPEED
+    executed = 0
+
+    def execute(i):
+        nonlocal executed
+        backend.play(events, i)
+        executed += 1
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    stop_at = wall_start + max_seconds
+    finished = scheduler.run(
+        execute,
+        get_speed=lambda: speed,
+        is_playing=lambda: time.perf_counter() < stop_at,
+        is_paused=lambda: False,
+        flush=backend.flush
+    )
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    lateness = scheduler.stats.summary()
+    lateness.pop('count', None)
+    # 按计划在 wall 时间内应执行的事件数，与实际执行数对比可判断是否跟得上
+    scheduled = bisect.bisect_right(scheduler.offsets, wall * speed)
+    return {
+        'speed': speed,
+        'finished': finished,
+        'events': executed,
+        'scheduled_events': scheduled,
+        'wall_s': round(wall, 4),
+        'events_per_s': round(executed / wall, 1) if wall > 0 else None,
+        'target_events_per_s': round(len(events) * speed / scheduler.duration, 1) if scheduler.duration else None,
+        'cpu_percent': round(cpu / wall * 100, 1) if wall > 0 else None,
+        'lateness_ms': {name: round(value, 4) for name, value in lateness.items()}
+    }
+
+
+def measure_throughput(events, backend, max_seconds):
+    """不做任何等待，连续注入事件，测量输入后端的最大持续吞吐量"""
+    n = len(events)
+    executed = 0
+    start = time.perf_counter()
+    stop_at = start + max_seconds
+    while time.perf_counter() < stop_at:
+        for i in range(n):
+            backend.play(events, i)
+        backend.flush()
+        executed += n
+    elapsed = time.perf_counter() - start
+    return {'events': executed, 'wall_s': round(elapsed, 4), 'events_per_s': round(executed / elapsed, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='桌面自动化工具回放时间精度与吞吐量基准测试')
+    parser.add_argument('--events', type=int, default=20000, help='合成录制的事件数')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'事件构成 (默认 {DEFAULT_MIX})')
+    parser.add_argument('--interval', type=float, default=0.01, help='相邻事件的平均间隔 (秒)')
+    parser.add_argument('--speeds', default=DEFAULT_SPEEDS, help=f'测试的播放速度，逗号分隔 (默认 {DEFAULT_SPEEDS})')
+    parser.add_argument('--backend', default='fake', choices=['auto', 'fake', 'xtest', 'pynput', 'pyautogui'],
+                        help='输入后端 (默认 fake，不操作桌面)')
+    parser.add_argument('--max-seconds', type=float, default=10.0, help='每档速度最长运行时间 (秒)')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--history', help='追加结果的历史文件 (JSON Lines)')
+    args = parser.parse_args()
+
+    zidonghua = load_module()
+    speeds = [float(speed) for speed in args.speeds.split(',')]
+    events = generate_recording(zidonghua, args.events, parse_mix(args.mix), args.interval, args.seed)
+    backend = create_backend(zidonghua, args.backend)
+
+    try:
+        # 预热一次，排除首次执行时的缓存及延迟初始化的影响
+        replay(zidonghua, events, backend, max(speeds), min(1.0, args.max_seconds))
+        results = [replay(zidonghua, events, backend, speed, args.max_seconds) for speed in speeds]
+        throughput = measure_throughput(events, backend, min(2.0, args.max_seconds))
+    finally:
+        backend.close()
+
+    report = {
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'python': sys.version.split()[0],
+        'backend': backend.name,
+        'events': len(events),
+        'mix': args.mix,
+        'recorded_duration_s': round(zidonghua.PlaybackScheduler(events).duration, 3),
+        'max_seconds': args.max_seconds,
+        'speeds': results,
+        'max_throughput': throughput
+    }
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    if args.history:
+        with open(args.history, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(report, ensure_ascii=False) + '\n')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
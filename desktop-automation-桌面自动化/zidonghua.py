@@ -1,18 +1,951 @@
 import os
+import sys
 import json
+import mmap
 import time
+import queue
+import struct
+import itertools
+import random
 import threading
+from array import array
+from enum import IntEnum
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import pyautogui
-import keyboard
-import mouse
-from pynput import mouse as pynput_mouse
-from pynput import keyboard as pynput_keyboard
-from pynput.mouse import Button
 from datetime import datetime
 
 
+class EventType(IntEnum):
+    MOUSE_MOVE = 1
+    MOUSE_CLICK = 2
+    MOUSE_SCROLL = 3
+    KEY_PRESS = 4
+    KEY_RELEASE = 5
+
+
+# 事件代码与原 JSON 格式中类型字符串的对应关系
+EVENT_TYPE_NAMES = {
+    EventType.MOUSE_MOVE: 'mouse_move',
+    EventType.MOUSE_CLICK: 'mouse_click',
+    EventType.MOUSE_SCROLL: 'mouse_scroll',
+    EventType.KEY_PRESS: 'key_press',
+    EventType.KEY_RELEASE: 'key_release',
+}
+EVENT_TYPE_CODES = {name: code for code, name in EVENT_TYPE_NAMES.items()}
+
+# 二进制录制文件: 文件头 + 各列连续存放 (按8字节对齐) + 按键名表 (JSON)
+EVENT_FILE_MAGIC = b'AUTOEVT1'
+EVENT_FILE_HEADER = struct.Struct('<8sBxxxIQQ')  # 魔数, 字节序(1=小端), 事件数, 按键表偏移, 按键表长度
+EVENT_FILE_EXT = '.autorec'
+
+# 列名, array 类型码 (type: 事件代码, key: 按键/鼠标按钮名在按键表中的序号, -1 表示无)
+EVENT_COLUMNS = (
+    ('type', 'B'),
+    ('x', 'i'),
+    ('y', 'i'),
+    ('dx', 'f'),
+    ('dy', 'f'),
+    ('key', 'i'),
+    ('pressed', 'B'),
+    ('time', 'd'),
+)
+
+
+class EventStore:
+    """按列存储的录制事件，每个事件约30字节，可保存为可零拷贝加载的二进制文件"""
+
+    def __init__(self):
+        self.columns = {name: array(code) for name, code in EVENT_COLUMNS}
+        self.keys = []
+        self.key_index = {}
+        self._mmap = None
+
+    def __len__(self):
+        return len(self.columns['type'])
+
+    def intern_key(self, key):
+        # 相同的按键名只保存一次
+        if key is None:
+            return -1
+        index = self.key_index.get(key)
+        if index is None:
+            index = len(self.keys)
+            self.keys.append(key)
+            self.key_index[key] = index
+        return index
+
+    def key_name(self, index):
+        # -1 表示没有按键名 (如 pynput 中 char 为 None 的小键盘、多媒体键)
+        return self.keys[index] if index >= 0 else None
+
+    def _ensure_writable(self):
+        # 从文件映射加载的列是只读的 memoryview，修改前先复制为 array
+        if self._mmap is None:
+            return
+        self.columns = {name: array(code, self.columns[name]) for name, code in EVENT_COLUMNS}
+        self._mmap.close()
+        self._mmap = None
+
+    def append(self, event_type, x=0, y=0, dx=0.0, dy=0.0, key=None, pressed=False, time=0.0):
+        self._ensure_writable()
+        columns = self.columns
+        columns['type'].append(event_type)
+        columns['x'].append(int(x))
+        columns['y'].append(int(y))
+        columns['dx'].append(dx)
+        columns['dy'].append(dy)
+        columns['key'].append(self.intern_key(key))
+        columns['pressed'].append(1 if pressed else 0)
+        columns['time'].append(time)
+
+    def append_dict(self, event):
+        event_type = EVENT_TYPE_CODES[event['type']]
+        self.append(
+            event_type,
+            event.get('x', 0),
+            event.get('y', 0),
+            event.get('dx', 0.0),
+            event.get('dy', 0.0),
+            event.get('button') if event_type == EventType.MOUSE_CLICK else event.get('key'),
+            event.get('pressed', False),
+            event.get('time', 0.0)
+        )
+
+    def __getitem__(self, i):
+        # 转换为原 JSON 格式的字典，供播放和导出使用
+        columns = self.columns
+        event_type = columns['type'][i]
+        event = {'type': EVENT_TYPE_NAMES[event_type]}
+        if event_type in (EventType.KEY_PRESS, EventType.KEY_RELEASE):
+            event['key'] = self.key_name(columns['key'][i])
+        else:
+            event['x'] = columns['x'][i]
+            event['y'] = columns['y'][i]
+            if event_type == EventType.MOUSE_CLICK:
+                event['button'] = self.key_name(columns['key'][i])
+                event['pressed'] = bool(columns['pressed'][i])
+            elif event_type == EventType.MOUSE_SCROLL:
+                # 整数滚动量还原为 int (pyautogui.scroll 需要整数)
+                dx, dy = columns['dx'][i], columns['dy'][i]
+                event['dx'] = int(dx) if dx.is_integer() else dx
+                event['dy'] = int(dy) if dy.is_integer() else dy
+        event['time'] = columns['time'][i]
+        return event
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def clear(self):
+        self.close()
+        self.columns = {name: array(code) for name, code in EVENT_COLUMNS}
+        self.keys = []
+        self.key_index = {}
+
+    def close(self):
+        if self._mmap is not None:
+            # 先释放对映射内存的引用再关闭
+            self.columns = {name: array(code) for name, code in EVENT_COLUMNS}
+            self._mmap.close()
+            self._mmap = None
+
+    @classmethod
+    def from_dicts(cls, events):
+        store = cls()
+        for event in events:
+            store.append_dict(event)
+        return store
+
+    def to_dicts(self):
+        return list(self)
+
+    def save(self, file_path):
+        # 写入临时文件后替换，避免保存中断损坏原文件
+        count = len(self)
+        offset = EVENT_FILE_HEADER.size
+        chunks = []
+        for name, code in EVENT_COLUMNS:
+            padding = -offset % 8
+            data = memoryview(self.columns[name]).cast('B')
+            chunks.append(b'\0' * padding)
+            chunks.append(data)
+            offset += padding + len(data)
+        keys = json.dumps(self.keys, ensure_ascii=False).encode('utf-8')
+
+        tmp_path = file_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(EVENT_FILE_HEADER.pack(EVENT_FILE_MAGIC, sys.byteorder == 'little', count, offset, len(keys)))
+            for chunk in chunks:
+                f.write(chunk)
+            f.write(keys)
+        os.replace(tmp_path, file_path)
+
+    @classmethod
+    def load(cls, file_path):
+        # 列直接引用文件映射 (零拷贝)，字节序与本机不同时才复制并转换
+        store = cls()
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < EVENT_FILE_HEADER.size:
+                raise ValueError("不是有效的录制文件")
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # 先按文件头核对各列范围，出错时映射还没有被视图引用，可以直接关闭
+        try:
+            magic, little_endian, count, keys_offset, keys_length = EVENT_FILE_HEADER.unpack_from(mm)
+            if magic != EVENT_FILE_MAGIC:
+                raise ValueError("不是有效的录制文件")
+            layout = []
+            offset = EVENT_FILE_HEADER.size
+            for name, code in EVENT_COLUMNS:
+                offset += -offset % 8
+                size = array(code).itemsize * count
+                layout.append((name, code, offset, size))
+                offset += size
+            if offset > len(mm) or keys_offset + keys_length > len(mm):
+                raise ValueError("录制文件不完整")
+            store.keys = json.loads(mm[keys_offset:keys_offset + keys_length].decode('utf-8'))
+        except Exception:
+            mm.close()
+            raise
+        store.key_index = {key: i for i, key in enumerate(store.keys)}
+
+        view = memoryview(mm)
+        columns = {name: view[offset:offset + size].cast(code) for name, code, offset, size in layout}
+
+        if bool(little_endian) == (sys.byteorder == 'little'):
+            store.columns = columns
+            store._mmap = mm
+        else:
+            for name, code in EVENT_COLUMNS:
+                column = array(code, columns[name])
+                column.byteswap()
+                store.columns[name] = column
+            del columns, view
+            mm.close()
+        return store
+
+    @classmethod
+    def load_json(cls, file_path):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return cls.from_dicts(json.load(f))
+
+    def save_json(self, file_path):
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dicts(), f, indent=2)
+
+    @classmethod
+    def open(cls, file_path):
+        # 根据文件头自动识别二进制或 JSON 格式
+        with open(file_path, 'rb') as f:
+            is_binary = f.read(len(EVENT_FILE_MAGIC)) == EVENT_FILE_MAGIC
+        return cls.load(file_path) if is_binary else cls.load_json(file_path)
+
+
+# 录制日志: 录制时事件直接追加写入磁盘，程序崩溃后可恢复
+JOURNAL_DIR = os.path.join(os.path.expanduser("~"), ".zidonghua", "journal")
+JOURNAL_MAGIC = b'AUTOJNL1'
+JOURNAL_RECORD = struct.Struct('<BiiffiBd')  # 与 EVENT_COLUMNS 顺序一致
+JOURNAL_KEY_RECORD = struct.Struct('<BiH')  # 0, 按键序号, 名称字节数 (其后为 UTF-8 名称)
+JOURNAL_END = b'\xffAUTOEND'  # 正常结束标记
+JOURNAL_BATCH_SIZE = 1024
+JOURNAL_FSYNC_INTERVAL = 1.0  # 秒
+
+
+class JournalWriter:
+    """录制日志写入器: 监听回调只把事件放入队列，由写入线程批量写盘并定期 fsync"""
+
+    def __init__(self, file_path, fsync_interval=JOURNAL_FSYNC_INTERVAL):
+        os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+        self.file_path = file_path
+        self.fsync_interval = fsync_interval
+        self.count = 0
+        self._counter = itertools.count(1)
+        self._queue = queue.SimpleQueue()
+        self._key_index = {}
+        self._file = open(file_path, 'wb')
+        self._file.write(JOURNAL_MAGIC)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def push(self, event_type, x=0, y=0, dx=0.0, dy=0.0, key=None, pressed=False, time=0.0):
+        # 在监听线程中调用，只做入队
+        self._queue.put((event_type, int(x), int(y), dx, dy, key, 1 if pressed else 0, time))
+        self.count = next(self._counter)
+
+    def _pack(self, buffer, item):
+        event_type, x, y, dx, dy, key, pressed, event_time = item
+        index = -1
+        if key is not None:
+            index = self._key_index.get(key)
+            if index is None:
+                index = len(self._key_index)
+                self._key_index[key] = index
+                name = key.encode('utf-8')
+                buffer += JOURNAL_KEY_RECORD.pack(0, index, len(name))
+                buffer += name
+        buffer += JOURNAL_RECORD.pack(event_type, x, y, dx, dy, index, pressed, event_time)
+
+    def _run(self):
+        last_sync = time.monotonic()
+        dirty = False
+        while True:
+            try:
+                item = self._queue.get(timeout=self.fsync_interval)
+            except queue.Empty:
+                item = ()
+
+            # 合并队列中已有的事件，一次写入
+            buffer = bytearray()
+            finished = item is None
+            if item:
+                self._pack(buffer, item)
+            while not finished and len(buffer) < JOURNAL_BATCH_SIZE * JOURNAL_RECORD.size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    finished = True
+                else:
+                    self._pack(buffer, item)
+
+            if buffer:
+                self._file.write(buffer)
+                self._file.flush()
+                dirty = True
+            if finished:
+                self._file.write(JOURNAL_END)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                return
+            if dirty and time.monotonic() - last_sync >= self.fsync_interval:
+                os.fsync(self._file.fileno())
+                last_sync = time.monotonic()
+                dirty = False
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+
+def read_journal(file_path):
+    # 读取录制日志，末尾不完整的记录 (崩溃时未写完) 被忽略
+    # 返回 (EventStore, 是否正常结束)
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(JOURNAL_MAGIC):
+        raise ValueError("不是有效的录制日志")
+
+    store = EventStore()
+    keys = {}
+    offset = len(JOURNAL_MAGIC)
+    record_size = JOURNAL_RECORD.size
+    while offset < len(data):
+        kind = data[offset]
+        if kind == JOURNAL_END[0]:
+            return store, data[offset:] == JOURNAL_END
+        if kind == 0:
+            if offset + JOURNAL_KEY_RECORD.size > len(data):
+                break
+            _, index, length = JOURNAL_KEY_RECORD.unpack_from(data, offset)
+            offset += JOURNAL_KEY_RECORD.size
+            if offset + length > len(data):
+                break
+            keys[index] = data[offset:offset + length].decode('utf-8')
+            offset += length
+            continue
+        if offset + record_size > len(data):
+            break
+        event_type, x, y, dx, dy, index, pressed, event_time = JOURNAL_RECORD.unpack_from(data, offset)
+        store.append(event_type, x, y, dx, dy, keys.get(index), pressed, event_time)
+        offset += record_size
+    return store, False
+
+
+def find_unfinished_journals(directory=JOURNAL_DIR):
+    # 未写入结束标记的日志 (录制时程序异常退出)，按时间从新到旧
+    if not os.path.isdir(directory):
+        return []
+    journals = []
+    for entry in os.scandir(directory):
+        if not entry.name.endswith('.jnl'):
+            continue
+        with open(entry.path, 'rb') as f:
+            size = f.seek(0, os.SEEK_END)
+            if size >= len(JOURNAL_END):
+                f.seek(-len(JOURNAL_END), os.SEEK_END)
+                if f.read() == JOURNAL_END:
+                    continue
+        journals.append((entry.stat().st_mtime, entry.path))
+    return [path for _, path in sorted(journals, reverse=True)]
+
+
+# 录制压缩默认参数
+COMPACT_TOLERANCE_PX = 2  # 鼠标轨迹简化容差 (像素)
+COMPACT_MAX_IDLE = 2.0  # 超过该值的空闲间隔缩短为该值 (秒)，0 表示不处理
+COMPACT_MAX_RUN = 5000  # 连续鼠标移动超过该点数时分段简化，限制最坏情况耗时
+
+
+def simplify_path(xs, ys, tolerance, max_run=COMPACT_MAX_RUN):
+    # Ramer-Douglas-Peucker 轨迹简化，返回保留点的下标 (始终保留首尾点)
+    # 长轨迹按 max_run 个点分段简化 (分段端点保留)，最坏情况耗时 O(n·max_run) 而不是 O(n²)
+    n = len(xs)
+    if n <= 2:
+        return list(range(n))
+    max_run = max(3, max_run)
+    keep = [False] * n
+    stack = [(start, min(start + max_run - 1, n - 1)) for start in range(0, n - 1, max_run - 1)]
+    for start, end in stack:
+        keep[start] = keep[end] = True
+    while stack:
+        start, end = stack.pop()
+        # 点到线段 (start, end) 的距离平方，线段参数只算一次
+        ax, ay = xs[start], ys[start]
+        dx, dy = xs[end] - ax, ys[end] - ay
+        length2 = dx * dx + dy * dy
+        max_distance2, index = 0.0, -1
+        for i in range(start + 1, end):
+            px, py = xs[i] - ax, ys[i] - ay
+            if length2:
+                t = (px * dx + py * dy) / length2
+                t = 0.0 if t < 0.0 else (1.0 if t > 1.0 else t)
+                px, py = px - t * dx, py - t * dy
+            distance2 = px * px + py * py
+            if distance2 > max_distance2:
+                max_distance2, index = distance2, i
+        if index >= 0 and max_distance2 ** 0.5 > tolerance:
+            keep[index] = True
+            stack.append((start, index))
+            stack.append((index, end))
+    return [i for i in range(n) if keep[i]]
+
+
+def compact_events(events, tolerance=COMPACT_TOLERANCE_PX, max_idle=COMPACT_MAX_IDLE):
+    # 压缩录制: 简化连续的鼠标移动轨迹、合并同一位置的连续滚动、缩短过长的空闲间隔
+    # 点击和按键事件全部保留且顺序不变；被删除事件的等待时间并入下一个保留的事件
+    # 因此 max_idle 为 0 时保留事件的绝对时刻不变；截短空闲后，其后的事件整体提前
+    columns = events.columns
+    types = columns['type']
+    xs, ys = columns['x'], columns['y']
+    offsets = list(itertools.accumulate(columns['time']))
+    n = len(events)
+
+    # 选出保留的事件 (kept 为下标列表，scroll_sums 为合并后的滚动量)
+    kept = []
+    scroll_sums = {}
+    i = 0
+    while i < n:
+        event_type = types[i]
+        if event_type == EventType.MOUSE_MOVE:
+            end = i
+            while end + 1 < n and types[end + 1] == EventType.MOUSE_MOVE:
+                end += 1
+            run = range(i, end + 1)
+            kept.extend(i + j for j in simplify_path([xs[k] for k in run], [ys[k] for k in run], tolerance))
+            i = end + 1
+        elif event_type == EventType.MOUSE_SCROLL:
+            end = i
+            dx, dy = columns['dx'][i], columns['dy'][i]
+            while (end + 1 < n and types[end + 1] == EventType.MOUSE_SCROLL
+                   and xs[end + 1] == xs[i] and ys[end + 1] == ys[i]):
+                end += 1
+                dx += columns['dx'][end]
+                dy += columns['dy'][end]
+            kept.append(i)
+            scroll_sums[i] = (dx, dy)
+            i = end + 1
+        else:
+            kept.append(i)
+            i += 1
+
+    compacted = EventStore()
+    previous = 0.0
+    for i in kept:
+        delay = offsets[i] - previous
+        previous = offsets[i]
+        if max_idle and delay > max_idle:
+            delay = max_idle
+        dx, dy = scroll_sums.get(i, (columns['dx'][i], columns['dy'][i]))
+        key = columns['key'][i]
+        compacted.append(
+            types[i], xs[i], ys[i], dx, dy,
+            events.keys[key] if key >= 0 else None,
+            columns['pressed'][i], delay
+        )
+    return compacted
+
+
+# 播放调度: 距截止时间不足该值时改为忙等，以获得亚毫秒级精度
+SPIN_THRESHOLD = 0.002  # 秒
+# 长时间等待时分段睡眠，以便及时响应停止、暂停和调速
+WAIT_SLICE = 0.1  # 秒
+# 统计百分位数时保留的误差样本数上限 (蓄水池抽样)
+LATENESS_SAMPLE_SIZE = 100000
+# 落后于计划时一批最多连续执行的事件数，超过后先提交给输入后端
+FLUSH_MAX_BATCH = 64
+
+
+class LatenessStats:
+    """播放时间误差统计 (实际执行时刻 - 计划时刻)"""
+
+    def __init__(self, sample_size=LATENESS_SAMPLE_SIZE):
+        self.sample_size = sample_size
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.sample = array('d')
+        self._random = random.Random(0)
+
+    def add(self, lateness):
+        self.count += 1
+        self.total += lateness
+        self.max = max(self.max, lateness)
+        if len(self.sample) < self.sample_size:
+            self.sample.append(lateness)
+        else:
+            j = self._random.randrange(self.count)
+            if j < self.sample_size:
+                self.sample[j] = lateness
+
+    def summary(self):
+        # 各项单位为毫秒
+        if not self.count:
+            return {'count': 0}
+        ordered = sorted(self.sample)
+
+        def percentile(q):
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count * 1000,
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+            'max_ms': self.max * 1000,
+        }
+
+
+class PlaybackScheduler:
+    """按绝对截止时间调度播放，执行耗时和等待误差不会逐个事件累积"""
+
+    def __init__(self, events):
+        # 事件相对录制开始的时刻 (由各事件的间隔累加得到)
+        self.offsets = array('d', itertools.accumulate(events.columns['time']))
+        self.duration = self.offsets[-1] if self.offsets else 0.0
+        self.stats = LatenessStats()
+
+    def run(self, execute, get_speed, is_playing, is_paused, repeat_count=1, on_repeat=None, flush=None):
+        # execute(i) 执行第 i 个事件；返回 False 表示被停止
+        # flush() 在等待下一个事件前调用，同一时刻到期的一批事件只提交一次
+        try:
+            return self._run(execute, get_speed, is_playing, is_paused, repeat_count, on_repeat, flush)
+        finally:
+            if flush is not None:
+                flush()
+
+    def _run(self, execute, get_speed, is_playing, is_paused, repeat_count, on_repeat, flush):
+        speed = get_speed()
+        base = time.perf_counter()  # 录制时刻 t 对应的计划时刻为 base + t / speed
+        loop_offset = 0.0
+        pending = 0  # 已执行但尚未提交的事件数
+
+        for repeat in range(1, repeat_count + 1):
+            if on_repeat is not None:
+                on_repeat(repeat)
+
+            for i, offset in enumerate(self.offsets):
+                target = loop_offset + offset
+                while True:
+                    if not is_playing():
+                        return False
+
+                    if pending and flush is not None and (
+                            pending >= FLUSH_MAX_BATCH or is_paused()
+                            or base + target / speed > time.perf_counter()):
+                        flush()
+                        pending = 0
+
+                    if is_paused():
+                        # 暂停的时长整体顺延
+                        paused_at = time.perf_counter()
+                        while is_paused():
+                            if not is_playing():
+                                return False
+                            time.sleep(WAIT_SLICE)
+                        base += time.perf_counter() - paused_at
+
+                    new_speed = get_speed()
+                    if new_speed != speed:
+                        # 调速时以当前播放位置为基准重新计算
+                        now = time.perf_counter()
+                        base = now - (now - base) * speed / new_speed
+                        speed = new_speed
+
+                    remaining = base + target / speed - time.perf_counter()
+                    if remaining <= SPIN_THRESHOLD:
+                        break
+                    time.sleep(min(remaining - SPIN_THRESHOLD, WAIT_SLICE))
+
+                deadline = base + target / speed
+                while time.perf_counter() < deadline:
+                    time.sleep(0)
+
+                self.stats.add(time.perf_counter() - deadline)
+                execute(i)
+                pending += 1
+
+            loop_offset += self.duration
+
+        return True
+
+
+# 播放时的滚动倍数 (pyautogui 的滚动单位很小)，高速模式 (速度 > 100x) 下加倍
+PYAUTOGUI_SCROLL_MULTIPLIER = 100
+PYAUTOGUI_FAST_SCROLL_MULTIPLIER = 200
+FAST_MODE_SPEED = 100
+
+
+class InputBackend:
+    """输入注入后端: 播放时逐个事件调用，flush 时提交已缓冲的事件"""
+
+    name = None
+
+    def __init__(self):
+        self.fast_mode = False
+
+    def move(self, x, y):
+        raise NotImplementedError
+
+    def button(self, x, y, button, pressed):
+        raise NotImplementedError
+
+    def scroll(self, x, y, dx, dy):
+        raise NotImplementedError
+
+    def key(self, key, pressed):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def play(self, events, i):
+        # 直接读取第 i 个事件的列数据，不为每个事件构造字典
+        columns = events.columns
+        event_type = columns['type'][i]
+        if event_type == EventType.MOUSE_MOVE:
+            self.move(columns['x'][i], columns['y'][i])
+        elif event_type == EventType.MOUSE_SCROLL:
+            self.scroll(columns['x'][i], columns['y'][i], columns['dx'][i], columns['dy'][i])
+        else:
+            # 录制时没有按键名/按钮名 (序号 -1) 的事件无法回放，跳过
+            key = columns['key'][i]
+            if key < 0:
+                return
+            if event_type == EventType.MOUSE_CLICK:
+                self.button(columns['x'][i], columns['y'][i], events.keys[key], bool(columns['pressed'][i]))
+            elif event_type == EventType.KEY_PRESS:
+                self.key(events.keys[key], True)
+            elif event_type == EventType.KEY_RELEASE:
+                self.key(events.keys[key], False)
+
+
+class PyAutoGUIBackend(InputBackend):
+    """通过 pyautogui 注入 (跨平台，每次调用开销较大)"""
+
+    name = 'pyautogui'
+    BUTTONS = ('left', 'right', 'middle')
+
+    def __init__(self):
+        super().__init__()
+        import pyautogui
+
+        # 设置 PyAutoGUI 的安全性
+        pyautogui.FAILSAFE = True
+        # 优化 PyAutoGUI 的性能设置
+        pyautogui.PAUSE = 0  # 消除命令之间的默认延迟
+        pyautogui.MINIMUM_DURATION = 0  # 移动时不使用最小duration
+        pyautogui.MINIMUM_SLEEP = 0  # 移动时不使用最小睡眠时间
+        self.pyautogui = pyautogui
+
+    def move(self, x, y):
+        # 直接设置鼠标位置，不使用平滑移动
+        self.pyautogui.moveTo(x, y, duration=0)
+
+    def button(self, x, y, button, pressed):
+        if button not in self.BUTTONS:
+            return
+        if pressed:
+            # 按下前先确保鼠标在正确位置
+            self.pyautogui.moveTo(x, y, duration=0)
+            self.pyautogui.mouseDown(x=x, y=y, button=button)
+        else:
+            self.pyautogui.mouseUp(x=x, y=y, button=button)
+
+    def scroll(self, x, y, dx, dy):
+        self.pyautogui.moveTo(x, y, duration=0)
+        multiplier = PYAUTOGUI_FAST_SCROLL_MULTIPLIER if self.fast_mode else PYAUTOGUI_SCROLL_MULTIPLIER
+        self.pyautogui.scroll(int(dy * multiplier))
+
+    def key(self, key, pressed):
+        try:
+            if pressed:
+                self.pyautogui.keyDown(key)
+            else:
+                self.pyautogui.keyUp(key)
+        except Exception:
+            pass
+
+
+class PynputBackend(InputBackend):
+    """通过 pynput 控制器注入，按键名与录制时一致，无需转换"""
+
+    name = 'pynput'
+
+    def __init__(self):
+        super().__init__()
+        from pynput import mouse as pynput_mouse
+        from pynput import keyboard as pynput_keyboard
+
+        self.Button = pynput_mouse.Button
+        self.Key = pynput_keyboard.Key
+        self.mouse = pynput_mouse.Controller()
+        self.keyboard = pynput_keyboard.Controller()
+        self._keys = {}
+
+    def move(self, x, y):
+        self.mouse.position = (x, y)
+
+    def button(self, x, y, button, pressed):
+        try:
+            button = self.Button[button]
+        except KeyError:
+            return
+        self.mouse.position = (x, y)
+        if pressed:
+            self.mouse.press(button)
+        else:
+            self.mouse.release(button)
+
+    def scroll(self, x, y, dx, dy):
+        self.mouse.position = (x, y)
+        self.mouse.scroll(dx, dy)
+
+    def _resolve_key(self, key):
+        if key not in self._keys:
+            if len(key) == 1:
+                self._keys[key] = key
+            else:
+                self._keys[key] = getattr(self.Key, key, None)
+        return self._keys[key]
+
+    def key(self, key, pressed):
+        resolved = self._resolve_key(key)
+        if resolved is None:
+            return
+        if pressed:
+            self.keyboard.press(resolved)
+        else:
+            self.keyboard.release(resolved)
+
+
+class XTestBackend(InputBackend):
+    """Linux/X11: 通过 python-xlib 的 XTest 扩展注入，事件缓冲后在 flush 时一次性提交"""
+
+    name = 'xtest'
+    BUTTONS = {'left': 1, 'middle': 2, 'right': 3}
+    # pynput 特殊键名 → X keysym 名称，其余如 home、f1 首字母大写即为 keysym 名称
+    KEYSYM_NAMES = {
+        'alt': 'Alt_L', 'alt_l': 'Alt_L', 'alt_r': 'Alt_R', 'alt_gr': 'ISO_Level3_Shift',
+        'ctrl': 'Control_L', 'ctrl_l': 'Control_L', 'ctrl_r': 'Control_R',
+        'shift': 'Shift_L', 'shift_l': 'Shift_L', 'shift_r': 'Shift_R',
+        'cmd': 'Super_L', 'cmd_l': 'Super_L', 'cmd_r': 'Super_R',
+        'enter': 'Return', 'esc': 'Escape', 'backspace': 'BackSpace', 'space': 'space',
+        'caps_lock': 'Caps_Lock', 'num_lock': 'Num_Lock', 'scroll_lock': 'Scroll_Lock',
+        'page_up': 'Prior', 'page_down': 'Next', 'print_screen': 'Print',
+    }
+
+    def __init__(self, display_name=None):
+        super().__init__()
+        from Xlib import X, XK, display
+        from Xlib.ext import xtest
+
+        XK.load_keysym_group('xkb')  # ISO_Level3_Shift 等键位
+        self.X = X
+        self.XK = XK
+        self.xtest = xtest
+        self.display = display.Display(display_name)
+        if not self.display.has_extension('XTEST'):
+            self.display.close()
+            raise RuntimeError("X 服务器不支持 XTEST 扩展")
+        self._keycodes = {}
+
+    def _fake(self, event_type, detail=0, x=0, y=0):
+        self.xtest.fake_input(self.display, event_type, detail, x=x, y=y)
+
+    def move(self, x, y):
+        self._fake(self.X.MotionNotify, x=x, y=y)
+
+    def button(self, x, y, button, pressed):
+        detail = self.BUTTONS.get(button)
+        if detail is None:
+            return
+        self.move(x, y)
+        self._fake(self.X.ButtonPress if pressed else self.X.ButtonRelease, detail)
+
+    def _click(self, detail, count):
+        for _ in range(count):
+            self._fake(self.X.ButtonPress, detail)
+            self._fake(self.X.ButtonRelease, detail)
+
+    def scroll(self, x, y, dx, dy):
+        # X11 的滚轮是按钮 4/5 (上/下) 和 6/7 (左/右)
+        self.move(x, y)
+        if dy:
+            self._click(4 if dy > 0 else 5, int(round(abs(dy))) or 1)
+        if dx:
+            self._click(7 if dx > 0 else 6, int(round(abs(dx))) or 1)
+
+    def _keycode(self, key):
+        if key not in self._keycodes:
+            if len(key) == 1:
+                # Latin-1 字符的 keysym 等于其码位，其余 Unicode 字符为 0x01000000 + 码位
+                code = ord(key)
+                keysym = code if code < 0x100 else 0x01000000 + code
+            else:
+                name = self.KEYSYM_NAMES.get(key, key.capitalize())
+                keysym = self.XK.string_to_keysym(name)
+            self._keycodes[key] = self.display.keysym_to_keycode(keysym) if keysym else 0
+        return self._keycodes[key]
+
+    def key(self, key, pressed):
+        keycode = self._keycode(key)
+        if keycode:
+            self._fake(self.X.KeyPress if pressed else self.X.KeyRelease, keycode)
+
+    def flush(self):
+        self.display.flush()
+
+    def close(self):
+        self.display.close()
+
+
+class FakeBackend(InputBackend):
+    """内存中的假后端: 只记录注入的事件，用于无桌面环境下的测试和性能测试"""
+
+    name = 'fake'
+
+    def __init__(self, keep_events=True):
+        super().__init__()
+        self.keep_events = keep_events
+        self.injected = []
+        self.count = 0
+        self.flushes = 0
+
+    def _record(self, *event):
+        self.count += 1
+        if self.keep_events:
+            self.injected.append(event)
+
+    def move(self, x, y):
+        self._record('move', x, y)
+
+    def button(self, x, y, button, pressed):
+        self._record('button', x, y, button, pressed)
+
+    def scroll(self, x, y, dx, dy):
+        self._record('scroll', x, y, dx, dy)
+
+    def key(self, key, pressed):
+        self._record('key', key, pressed)
+
+    def flush(self):
+        self.flushes += 1
+
+
+INPUT_BACKENDS = {
+    backend.name: backend for backend in (PyAutoGUIBackend, PynputBackend, XTestBackend, FakeBackend)
+}
+DEFAULT_INPUT_BACKEND = 'pyautogui'
+
+
+# 界面刷新帧率: 工作线程投递的更新由 Tk 线程按该频率合并后统一刷新
+UI_REFRESH_FPS = 30
+# 日志面板保留的最大行数
+UI_LOG_MAX_LINES = 2000
+
+
+class UIUpdateBus:
+    """界面更新总线: 任意线程投递，Tk 线程按固定帧率合并执行"""
+
+    def __init__(self, root, log_text, fps=UI_REFRESH_FPS):
+        self.root = root
+        self.log_text = log_text
+        self.interval_ms = max(1, int(1000 / fps))
+        self.queue = queue.SimpleQueue()
+        self._after_id = None
+
+    def set(self, var, value):
+        # 同一帧内对同一变量的多次设置只保留最后一次
+        self.queue.put(('set', var, value))
+
+    def log(self, line):
+        self.queue.put(('log', None, line))
+
+    def call(self, func, *args):
+        # 在 Tk 线程中执行 func(*args)
+        self.queue.put(('call', func, args))
+
+    def start(self):
+        if self._after_id is None:
+            self._after_id = self.root.after(self.interval_ms, self._flush)
+
+    def stop(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _flush(self):
+        pending = {}
+        lines = []
+        while True:
+            try:
+                kind, target, value = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'set':
+                pending[str(target)] = (target, value)
+            elif kind == 'log':
+                lines.append(value)
+            else:
+                # 先应用之前的设置，保证与投递顺序一致
+                self._apply(pending, lines)
+                pending, lines = {}, []
+                try:
+                    target(*value)
+                except Exception as e:
+                    # 写入日志面板，与其他日志的格式一致
+                    timestamp = datetime.now().strftime("%H:%M:%S")
+                    lines.append(f"[{timestamp}] 界面更新出错: {str(e)}\n")
+        self._apply(pending, lines)
+        self._after_id = self.root.after(self.interval_ms, self._flush)
+
+    def _apply(self, pending, lines):
+        for var, value in pending.values():
+            var.set(value)
+        if lines:
+            self.log_text.insert(tk.END, "".join(lines))
+            # 只保留最近的日志，避免长时间运行后文本控件越来越慢
+            excess = int(self.log_text.index('end-1c').split('.')[0]) - 1 - UI_LOG_MAX_LINES
+            if excess > 0:
+                self.log_text.delete('1.0', f'{excess + 1}.0')
+            self.log_text.see(tk.END)
+
+
 class AutomationTool:
     def __init__(self, root):
         self.root = root
@@ -30,10 +963,13 @@ class AutomationTool:
         self.is_recording = False
         self.is_playing = False
         self.is_paused = False
-        self.events = []
+        self.events = EventStore()
+        self.journal = None
         self.current_file = None
         self.play_thread = None
         self.record_thread = None
+        self.load_thread = None  # 停止录制后在后台读回日志的线程
+        self.is_loading = False  # 读回完成 (finish_recording) 前不能开始新的录制或播放
         self.mouse_listener = None
         self.keyboard_listener = None
         self.start_time = None
@@ -41,10 +977,15 @@ class AutomationTool:
         self.playback_speed = 1.0
         self.repeat_count = 1
         self.current_repeat = 0
+        self.backend = None
 
         # 创建UI
         self.create_ui()
 
+        # 工作线程通过更新总线修改界面，避免直接在非 Tk 线程中操作控件
+        self.ui = UIUpdateBus(self.root, self.log_text)
+        self.ui.start()
+
         # 快捷键绑定
         self.setup_hotkeys()
 
@@ -52,6 +993,9 @@ class AutomationTool:
         self.root.bind("<Enter>", self.on_mouse_enter)
         self.root.bind("<Leave>", self.on_mouse_leave)
 
+        # 检查上次是否有未正常结束的录制
+        self.recover_journals()
+
     def create_ui(self):
         # 创建主框架
         main_frame = ttk.Frame(self.root, padding="10")
@@ -106,10 +1050,14 @@ class AutomationTool:
         self.load_btn = ttk.Button(file_frame, text="加载", command=self.load_events)
         self.load_btn.grid(row=0, column=1, padx=5, pady=5)
 
+        # 压缩按钮
+        self.compact_btn = ttk.Button(file_frame, text="压缩", command=self.compact_recording)
+        self.compact_btn.grid(row=0, column=2, padx=5, pady=5)
+
         # 当前文件标签
         self.file_var = tk.StringVar(value="当前文件: 无")
         file_label = ttk.Label(file_frame, textvariable=self.file_var)
-        file_label.grid(row=0, column=2, padx=5, pady=5, sticky=tk.W)
+        file_label.grid(row=0, column=3, padx=5, pady=5, sticky=tk.W)
 
         # 设置框架
         settings_frame = ttk.LabelFrame(main_frame, text="设置", padding="5")
@@ -148,6 +1096,29 @@ class AutomationTool:
         repeat_spinbox = ttk.Spinbox(repeat_frame, from_=1, to=99999, textvariable=self.repeat_var, width=8)
         repeat_spinbox.pack(side=tk.LEFT, padx=5)
 
+        # 压缩参数
+        compact_frame = ttk.Frame(settings_frame)
+        compact_frame.grid(row=3, column=0, columnspan=3, padx=5, pady=5, sticky=tk.W)
+
+        ttk.Label(compact_frame, text="轨迹容差(像素):").pack(side=tk.LEFT, padx=5)
+        self.tolerance_var = tk.DoubleVar(value=COMPACT_TOLERANCE_PX)
+        ttk.Spinbox(compact_frame, from_=0, to=50, increment=1, textvariable=self.tolerance_var,
+                    width=6).pack(side=tk.LEFT, padx=5)
+
+        ttk.Label(compact_frame, text="最长空闲(秒):").pack(side=tk.LEFT, padx=5)
+        self.max_idle_var = tk.DoubleVar(value=COMPACT_MAX_IDLE)
+        ttk.Spinbox(compact_frame, from_=0, to=600, increment=0.5, textvariable=self.max_idle_var,
+                    width=6).pack(side=tk.LEFT, padx=5)
+
+        # 输入后端
+        backend_frame = ttk.Frame(settings_frame)
+        backend_frame.grid(row=4, column=0, columnspan=3, padx=5, pady=5, sticky=tk.W)
+
+        ttk.Label(backend_frame, text="输入后端:").pack(side=tk.LEFT, padx=5)
+        self.backend_var = tk.StringVar(value=DEFAULT_INPUT_BACKEND)
+        ttk.Combobox(backend_frame, textvariable=self.backend_var, values=list(INPUT_BACKENDS),
+                     state='readonly', width=10).pack(side=tk.LEFT, padx=5)
+
         # 快捷键提示框架
         hotkey_frame = ttk.LabelFrame(main_frame, text="快捷键", padding="5")
         hotkey_frame.pack(fill=tk.X, pady=5)
@@ -176,12 +1147,14 @@ class AutomationTool:
         self.log_text.config(yscrollcommand=scrollbar.set)
 
     def setup_hotkeys(self):
-        # 设置全局热键
-        keyboard.add_hotkey('f9', self.toggle_recording)
-        keyboard.add_hotkey('f10', self.toggle_playback)
-        keyboard.add_hotkey('f11', self.toggle_pause)
-        keyboard.add_hotkey('f12', self.stop_all)
-        keyboard.add_hotkey('esc', self.emergency_stop)
+        import keyboard
+
+        # 设置全局热键 (回调在 keyboard 的线程中触发，转交 Tk 线程执行)
+        keyboard.add_hotkey('f9', self.ui.call, args=(self.toggle_recording,))
+        keyboard.add_hotkey('f10', self.ui.call, args=(self.toggle_playback,))
+        keyboard.add_hotkey('f11', self.ui.call, args=(self.toggle_pause,))
+        keyboard.add_hotkey('f12', self.ui.call, args=(self.stop_all,))
+        keyboard.add_hotkey('esc', self.ui.call, args=(self.emergency_stop,))
 
     def update_speed_label(self, *args):
         self.playback_speed = self.speed_var.get()
@@ -195,9 +1168,9 @@ class AutomationTool:
         self.update_speed_label()
 
     def log(self, message):
+        # 可在任意线程调用，由更新总线在下一帧写入日志面板
         timestamp = datetime.now().strftime("%H:%M:%S")
-        self.log_text.insert(tk.END, f"[{timestamp}] {message}\n")
-        self.log_text.see(tk.END)
+        self.ui.log(f"[{timestamp}] {message}\n")
 
     def on_mouse_enter(self, event):
         # 当鼠标进入程序窗口时暂停录制
@@ -215,18 +1188,53 @@ class AutomationTool:
         if self.is_playing:
             self.log("请先停止播放")
             return
+        if self.is_loading:
+            self.log("正在读取上次的录制，请稍候")
+            return
 
         if self.is_recording:
             self.stop_recording()
         else:
             self.start_recording()
 
+    def recover_journals(self):
+        journals = find_unfinished_journals()
+        if not journals:
+            return
+
+        answer = messagebox.askyesnocancel(
+            "恢复录制",
+            f"发现 {len(journals)} 个未正常结束的录制。\n\n"
+            "是: 恢复最近的一个\n否: 全部丢弃\n取消: 暂不处理，下次启动时再询问"
+        )
+        if answer is None:
+            return
+        if answer:
+            try:
+                events, _ = read_journal(journals[0])
+                self.events = events
+                self.ui.set(self.events_count_var, f"事件数: {len(self.events)}")
+                self.log(f"已从录制日志恢复 {len(self.events)} 个事件，请及时保存")
+            except Exception as e:
+                self.log(f"恢复录制失败: {str(e)}")
+                return
+            journals = journals[:1]
+        for path in journals:
+            os.remove(path)
+
     def start_recording(self):
-        self.events = []
+        self.events.clear()
+        # 事件直接写入磁盘日志，录制期间内存占用不随事件数增长
+        journal_path = os.path.join(JOURNAL_DIR, datetime.now().strftime("recording-%Y%m%d-%H%M%S-%f.jnl"))
+        try:
+            self.journal = JournalWriter(journal_path)
+        except OSError as e:
+            self.log(f"无法创建录制日志: {str(e)}")
+            return
         self.is_recording = True
-        self.status_var.set("正在录制...")
+        self.ui.set(self.status_var, "正在录制...")
         self.record_btn.config(text="停止录制 (F9)")
-        self.events_count_var.set("事件数: 0")
+        self.ui.set(self.events_count_var, "事件数: 0")
         self.log("开始录制")
 
         # 记录开始时间
@@ -246,13 +1254,33 @@ class AutomationTool:
         self.is_paused = False
 
         # 停止监听器
-        if self.mouse_listener:
-            self.mouse_listener.stop()
-        if self.keyboard_listener:
-            self.keyboard_listener.stop()
+        self.stop_listeners()
 
-        self.status_var.set("录制已停止")
+        # 写完日志并读回为事件列表 (长时间录制时耗时较长，放到后台线程，不阻塞界面)
+        self.ui.set(self.status_var, "正在读取录制日志...")
         self.record_btn.config(text="开始录制 (F9)")
+        self.is_loading = True
+        self.load_thread = threading.Thread(target=self.load_recording, args=(self.journal,))
+        self.load_thread.daemon = True
+        self.load_thread.start()
+
+    def load_recording(self, journal):
+        # 后台线程: 正常结束的日志读回后随即删除
+        journal.close()
+        try:
+            events, _ = read_journal(journal.file_path)
+            os.remove(journal.file_path)
+        except Exception as e:
+            self.log(f"读取录制日志失败: {str(e)}")
+            events = None
+        self.ui.call(self.finish_recording, events)
+
+    def finish_recording(self, events):
+        self.is_loading = False
+        if events is not None:
+            self.events.close()
+            self.events = events
+        self.ui.set(self.status_var, "录制已停止")
         self.log(f"停止录制，共记录了 {len(self.events)} 个事件")
 
     def pause_recording(self):
@@ -262,12 +1290,9 @@ class AutomationTool:
         self.is_paused = True
 
         # 停止监听器
-        if self.mouse_listener:
-            self.mouse_listener.stop()
-        if self.keyboard_listener:
-            self.keyboard_listener.stop()
+        self.stop_listeners()
 
-        self.status_var.set("录制已暂停")
+        self.ui.set(self.status_var, "录制已暂停")
         self.log("录制已暂停")
 
     def resume_recording(self):
@@ -280,13 +1305,23 @@ class AutomationTool:
         # 重新启动监听器
         self.setup_listeners()
 
-        self.status_var.set("正在录制...")
+        self.ui.set(self.status_var, "正在录制...")
         self.log("录制已恢复")
 
+    def stop_listeners(self):
+        # stop() 不等待监听线程退出；join 之后不会再有回调写入日志
+        for listener in (self.mouse_listener, self.keyboard_listener):
+            if listener:
+                listener.stop()
+                listener.join()
+
     def record_events(self):
         self.setup_listeners()
 
     def setup_listeners(self):
+        from pynput import mouse as pynput_mouse
+        from pynput import keyboard as pynput_keyboard
+
         # 设置鼠标监听器
         self.mouse_listener = pynput_mouse.Listener(
             on_move=self.on_mouse_move,
@@ -309,49 +1344,32 @@ class AutomationTool:
         current_time = time.time()
         # 只记录每隔一定时间的移动，避免记录过多事件
         if current_time - self.last_event_time > 0.05:  # 每50毫秒记录一次
-            event = {
-                'type': 'mouse_move',
-                'x': x,
-                'y': y,
-                'time': current_time - self.last_event_time
-            }
-            self.events.append(event)
+            self.journal.push(EventType.MOUSE_MOVE, x, y, time=current_time - self.last_event_time)
             self.last_event_time = current_time
-            self.events_count_var.set(f"事件数: {len(self.events)}")
+            self.ui.set(self.events_count_var, f"事件数: {self.journal.count}")
 
     def on_mouse_click(self, x, y, button, pressed):
         if not self.is_recording or self.is_paused:
             return
 
         current_time = time.time()
-        event = {
-            'type': 'mouse_click',
-            'x': x,
-            'y': y,
-            'button': str(button).split('.')[-1],  # 转换为字符串，例如 'left'
-            'pressed': pressed,
-            'time': current_time - self.last_event_time
-        }
-        self.events.append(event)
+        self.journal.push(
+            EventType.MOUSE_CLICK, x, y,
+            key=str(button).split('.')[-1],  # 转换为字符串，例如 'left'
+            pressed=pressed,
+            time=current_time - self.last_event_time
+        )
         self.last_event_time = current_time
-        self.events_count_var.set(f"事件数: {len(self.events)}")
+        self.ui.set(self.events_count_var, f"事件数: {self.journal.count}")
 
     def on_mouse_scroll(self, x, y, dx, dy):
         if not self.is_recording or self.is_paused:
             return
 
         current_time = time.time()
-        event = {
-            'type': 'mouse_scroll',
-            'x': x,
-            'y': y,
-            'dx': dx,
-            'dy': dy,
-            'time': current_time - self.last_event_time
-        }
-        self.events.append(event)
+        self.journal.push(EventType.MOUSE_SCROLL, x, y, dx, dy, time=current_time - self.last_event_time)
         self.last_event_time = current_time
-        self.events_count_var.set(f"事件数: {len(self.events)}")
+        self.ui.set(self.events_count_var, f"事件数: {self.journal.count}")
 
     def on_key_press(self, key):
         if not self.is_recording or self.is_paused:
@@ -365,14 +1383,9 @@ class AutomationTool:
             # 特殊键
             key_char = str(key).split('.')[-1]
 
-        event = {
-            'type': 'key_press',
-            'key': key_char,
-            'time': current_time - self.last_event_time
-        }
-        self.events.append(event)
+        self.journal.push(EventType.KEY_PRESS, key=key_char, time=current_time - self.last_event_time)
         self.last_event_time = current_time
-        self.events_count_var.set(f"事件数: {len(self.events)}")
+        self.ui.set(self.events_count_var, f"事件数: {self.journal.count}")
 
     def on_key_release(self, key):
         if not self.is_recording or self.is_paused:
@@ -386,19 +1399,17 @@ class AutomationTool:
             # 特殊键
             key_char = str(key).split('.')[-1]
 
-        event = {
-            'type': 'key_release',
-            'key': key_char,
-            'time': current_time - self.last_event_time
-        }
-        self.events.append(event)
+        self.journal.push(EventType.KEY_RELEASE, key=key_char, time=current_time - self.last_event_time)
         self.last_event_time = current_time
-        self.events_count_var.set(f"事件数: {len(self.events)}")
+        self.ui.set(self.events_count_var, f"事件数: {self.journal.count}")
 
     def toggle_playback(self):
         if self.is_recording:
             self.log("请先停止录制")
             return
+        if self.is_loading:
+            self.log("正在读取上次的录制，请稍候")
+            return
 
         if self.is_playing:
             self.stop_playback()
@@ -410,9 +1421,21 @@ class AutomationTool:
             self.log("没有可播放的事件")
             return
 
+        # 按需创建输入后端，切换后端时关闭旧的
+        name = self.backend_var.get()
+        if self.backend is None or self.backend.name != name:
+            if self.backend is not None:
+                self.backend.close()
+                self.backend = None
+            try:
+                self.backend = INPUT_BACKENDS[name]()
+            except Exception as e:
+                self.log(f"无法初始化输入后端 {name}: {str(e)}")
+                return
+
         self.is_playing = True
         self.is_paused = False
-        self.status_var.set("正在播放...")
+        self.ui.set(self.status_var, "正在播放...")
         self.play_btn.config(text="停止播放 (F10)")
         self.pause_btn.state(['!disabled'])
         self.repeat_count = self.repeat_var.get()
@@ -431,7 +1454,7 @@ class AutomationTool:
 
         self.is_playing = False
         self.is_paused = False
-        self.status_var.set("播放已停止")
+        self.ui.set(self.status_var, "播放已停止")
         self.play_btn.config(text="开始播放 (F10)")
         self.pause_btn.state(['disabled'])
         self.log("播放已停止")
@@ -442,107 +1465,62 @@ class AutomationTool:
 
         if self.is_paused:
             self.is_paused = False
-            self.status_var.set("正在播放...")
+            self.ui.set(self.status_var, "正在播放...")
             self.pause_btn.config(text="暂停 (F11)")
             self.log("播放已恢复")
         else:
             self.is_paused = True
-            self.status_var.set("播放已暂停")
+            self.ui.set(self.status_var, "播放已暂停")
             self.pause_btn.config(text="继续 (F11)")
             self.log("播放已暂停")
 
     def play_events(self):
-        current_repeat = 1
-
-        while current_repeat <= self.repeat_count and self.is_playing:
-            self.log(f"播放第 {current_repeat}/{self.repeat_count} 次")
-
-            for i, event in enumerate(self.events):
-                if not self.is_playing:
-                    return
-
-                # 暂停检查
-                while self.is_paused:
-                    time.sleep(0.1)
-                    if not self.is_playing:
-                        return
+        scheduler = PlaybackScheduler(self.events)
+        total = len(self.events)
+
+        def play_event(i):
+            # 根据事件类型执行操作
+            try:
+                self.execute_event(self.events, i)
+                # 更新状态
+                self.ui.set(self.status_var, f"正在播放... ({i + 1}/{total})")
+            except Exception as e:
+                self.log(f"执行事件时出错: {str(e)}")
+
+        finished = scheduler.run(
+            play_event,
+            get_speed=lambda: self.playback_speed,
+            is_playing=lambda: self.is_playing,
+            is_paused=lambda: self.is_paused,
+            repeat_count=self.repeat_count,
+            on_repeat=lambda repeat: self.log(f"播放第 {repeat}/{self.repeat_count} 次"),
+            flush=self.backend.flush
+        )
 
-                # 根据播放速度调整等待时间
-                wait_time = event['time'] / self.playback_speed
+        stats = scheduler.stats.summary()
+        if stats['count']:
+            self.log(f"时间误差: 平均 {stats['mean_ms']:.2f}ms, P95 {stats['p95_ms']:.2f}ms, "
+                     f"P99 {stats['p99_ms']:.2f}ms, 最大 {stats['max_ms']:.2f}ms")
 
-                # 关键优化点: 设置最小等待时间阈值
-                if wait_time > 0.001:  # 只有大于1毫秒才睡眠
-                    time.sleep(wait_time)
+        # 播放完成 (按钮状态只能在 Tk 线程中修改)
+        if finished:
+            self.ui.call(self.finish_playback)
 
-                # 根据事件类型执行操作
-                try:
-                    self.execute_event(event)
-                    # 更新状态
-                    self.status_var.set(f"正在播放... ({i + 1}/{len(self.events)})")
-                except Exception as e:
-                    self.log(f"执行事件时出错: {str(e)}")
-
-            current_repeat += 1
-
-        # 播放完成
+    def finish_playback(self):
         if self.is_playing:
             self.stop_playback()
-            self.status_var.set("播放完成")
+            self.ui.set(self.status_var, "播放完成")
             self.log("播放完成")
 
-    def execute_event(self, event):
-        event_type = event['type']
-
+    def execute_event(self, events, i):
         # 高速模式判断
-        is_fast_mode = self.playback_speed > 100
+        self.backend.fast_mode = self.playback_speed > FAST_MODE_SPEED
 
         try:
-            if event_type == 'mouse_move':
-                # 直接设置鼠标位置，不使用平滑移动
-                pyautogui.moveTo(event['x'], event['y'], duration=0)
-
-            elif event_type == 'mouse_click':
-                # 如果是按下，先确保鼠标在正确位置
-                if event['pressed']:
-                    # 直接设置位置
-                    pyautogui.moveTo(event['x'], event['y'], duration=0)
-
-                    if event['button'] == 'left':
-                        pyautogui.mouseDown(x=event['x'], y=event['y'], button='left')
-                    elif event['button'] == 'right':
-                        pyautogui.mouseDown(x=event['x'], y=event['y'], button='right')
-                    elif event['button'] == 'middle':
-                        pyautogui.mouseDown(x=event['x'], y=event['y'], button='middle')
-                else:
-                    if event['button'] == 'left':
-                        pyautogui.mouseUp(x=event['x'], y=event['y'], button='left')
-                    elif event['button'] == 'right':
-                        pyautogui.mouseUp(x=event['x'], y=event['y'], button='right')
-                    elif event['button'] == 'middle':
-                        pyautogui.mouseUp(x=event['x'], y=event['y'], button='middle')
-
-            elif event_type == 'mouse_scroll':
-                # 先确保鼠标在正确位置
-                pyautogui.moveTo(event['x'], event['y'], duration=0)
-
-                # 高速模式下增大滚动值
-                scroll_multiplier = 200 if is_fast_mode else 100
-                pyautogui.scroll(event['dy'] * scroll_multiplier)
-
-            elif event_type == 'key_press':
-                try:
-                    pyautogui.keyDown(event['key'])
-                except Exception as e:
-                    pass
-
-            elif event_type == 'key_release':
-                try:
-                    pyautogui.keyUp(event['key'])
-                except Exception as e:
-                    pass
+            self.backend.play(events, i)
         except Exception as e:
-            print(f"执行事件错误: {str(e)}")
-            # 继续执行，不中断整个回放
+            # 经更新总线写入日志面板，继续执行，不中断整个回放
+            self.log(f"执行第 {i + 1} 个事件时出错: {str(e)}")
 
     def stop_all(self):
         if self.is_recording:
@@ -550,7 +1528,7 @@ class AutomationTool:
         if self.is_playing:
             self.stop_playback()
 
-        self.status_var.set("就绪")
+        self.ui.set(self.status_var, "就绪")
         self.log("所有操作已停止")
 
     def emergency_stop(self):
@@ -561,18 +1539,49 @@ class AutomationTool:
     def exit_program(self):
         # 先停止所有操作
         self.stop_all()
+        # 等待录制日志写完并删除，以免下次启动时被当作未正常结束的录制
+        if self.load_thread is not None:
+            self.load_thread.join()
         self.log("程序已退出")
+        self.ui.stop()
+        if self.backend is not None:
+            self.backend.close()
         # 销毁主窗口
         self.root.destroy()
 
+    def compact_recording(self):
+        if self.is_recording or self.is_playing:
+            self.log("请先停止录制或播放")
+            return
+        if not self.events:
+            self.log("没有可压缩的事件")
+            return
+
+        try:
+            tolerance = self.tolerance_var.get()
+            max_idle = self.max_idle_var.get()
+        except tk.TclError:
+            self.log("压缩参数无效")
+            return
+
+        before_count = len(self.events)
+        before_duration = sum(self.events.columns['time'])
+        compacted = compact_events(self.events, tolerance, max_idle)
+        self.events.close()
+        self.events = compacted
+
+        self.ui.set(self.events_count_var, f"事件数: {len(self.events)}")
+        self.log(f"压缩完成: 事件 {before_count} → {len(self.events)}，"
+                 f"时长 {before_duration:.1f}s → {sum(self.events.columns['time']):.1f}s")
+
     def save_events(self):
         if not self.events:
             messagebox.showinfo("保存", "没有可保存的事件")
             return
 
         file_path = filedialog.asksaveasfilename(
-            defaultextension=".json",
-            filetypes=[("JSON 文件", "*.json"), ("所有文件", "*.*")],
+            defaultextension=EVENT_FILE_EXT,
+            filetypes=[("录制文件", "*" + EVENT_FILE_EXT), ("JSON 文件", "*.json"), ("所有文件", "*.*")],
             title="保存自动化事件"
         )
 
@@ -580,8 +1589,11 @@ class AutomationTool:
             return
 
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(self.events, f, indent=2)
+            # .json 导出为原格式，其余保存为二进制录制文件
+            if file_path.lower().endswith('.json'):
+                self.events.save_json(file_path)
+            else:
+                self.events.save(file_path)
 
             self.current_file = file_path
             self.file_var.set(f"当前文件: {os.path.basename(file_path)}")
@@ -592,7 +1604,7 @@ class AutomationTool:
 
     def load_events(self):
         file_path = filedialog.askopenfilename(
-            filetypes=[("JSON 文件", "*.json"), ("所有文件", "*.*")],
+            filetypes=[("录制文件", "*" + EVENT_FILE_EXT), ("JSON 文件", "*.json"), ("所有文件", "*.*")],
             title="加载自动化事件"
         )
 
@@ -600,12 +1612,13 @@ class AutomationTool:
             return
 
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                self.events = json.load(f)
+            events = EventStore.open(file_path)
+            self.events.close()
+            self.events = events
 
             self.current_file = file_path
             self.file_var.set(f"当前文件: {os.path.basename(file_path)}")
-            self.events_count_var.set(f"事件数: {len(self.events)}")
+            self.ui.set(self.events_count_var, f"事件数: {len(self.events)}")
             self.log(f"成功加载 {len(self.events)} 个事件从 {file_path}")
         except Exception as e:
             messagebox.showerror("加载失败", f"加载失败: {str(e)}")
@@ -613,19 +1626,9 @@ class AutomationTool:
 
 
 def main():
-    # 设置 PyAutoGUI 的安全性
-    pyautogui.FAILSAFE = True
-
-    # 优化 PyAutoGUI 的性能设置
-    pyautogui.PAUSE = 0  # 消除命令之间的默认延迟
-
-    # 降低鼠标移动的精度要求，提高速度
-    pyautogui.MINIMUM_DURATION = 0  # 移动时不使用最小duration
-    pyautogui.MINIMUM_SLEEP = 0  # 移动时不使用最小睡眠时间
-
     root = tk.Tk()
     app = AutomationTool(root)
-    root.protocol("WM_DELETE_WINDOW", lambda: [app.stop_all(), root.destroy()])
+    root.protocol("WM_DELETE_WINDOW", app.exit_program)
     root.mainloop()
 
 
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+滑坡易发性评价系统 - 模块导入耗时基准测试
+
+在独立子进程中多次导入 滑坡易发性评价系统.py，统计导入耗时，
+并检查 geopandas、sklearn、matplotlib 等重量级库是否被提前导入。
+结果以 JSON 输出，可追加到历史文件中跟踪变化。
+
+使用方法:
+    python bench_import_time.py --repeat 10 --history import_bench_history.jsonl
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+MODULE_PATH = Path(__file__).with_name('滑坡易发性评价系统.py')
+
+# 应在对应阶段才导入的库
+DEFERRED_MODULES = [
+    'geopandas',
+    'matplotlib',
+    'seaborn',
+    'sklearn',
+    'joblib'
+]
+
+# 子进程中执行: 导入模块并输出耗时及已加载的重量级库
+PROBE = """
+import importlib.util, json, sys, time
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location('landslide', sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    'import_s': elapsed,
+    'loaded': [name for name in json.loads(sys.argv[2]) if name in sys.modules]
+}))
+"""
+
+
+def run_once():
+    """在新进程中导入一次模块，返回导入耗时、进程总耗时及提前加载的库"""
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE, str(MODULE_PATH), json.dumps(DEFERRED_MODULES)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['process_s'] = time.perf_counter() - start
+    return result
+
+
+def top_imports(limit=10):
+    """使用 -X importtime 找出累计耗时最多的顶层导入"""
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE, str(MODULE_PATH), json.dumps(DEFERRED_MODULES)],
+        check=True, capture_output=True, text=True
+    ).stderr
+
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # 嵌套导入以缩进表示，只统计顶层
+        if cumulative.strip().isdigit() and len(name) - len(name.lstrip()) == 1:
+            entries.append((int(cumulative), name.strip()))
+
+    entries.sort(reverse=True)
+    return [{'module': name, 'cumulative_ms': round(us / 1000, 1)} for us, name in entries[:limit]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='滑坡易发性评价系统导入耗时基准测试')
+    parser.add_argument('--repeat', type=int, default=10, help='重复次数')
+    parser.add_argument('--history', help='追加结果的历史文件 (JSON Lines)')
+    args = parser.parse_args()
+
+    # 预热一次，排除首次读取磁盘及生成字节码的影响
+    run_once()
+    runs = [run_once() for _ in range(args.repeat)]
+    import_times = [run['import_s'] for run in runs]
+    process_times = [run['process_s'] for run in runs]
+
+    report = {
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'python': sys.version.split()[0],
+        'repeat': args.repeat,
+        'import_s_median': round(statistics.median(import_times), 4),
+        'import_s_min': round(min(import_times), 4),
+        'process_s_median': round(statistics.median(process_times), 4),
+        'eager_deferred_modules': sorted({name for run in runs for name in run['loaded']}),
+        'top_imports': top_imports()
+    }
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    if args.history:
+        with open(args.history, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(report, ensure_ascii=False) + '\n')
+
+    # 重量级库被提前导入时返回非零，便于在CI中跟踪回退
+    return 1 if report['eager_deferred_modules'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
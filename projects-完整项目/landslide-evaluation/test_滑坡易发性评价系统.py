@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""滑坡易发性评价系统 - 模型与因子顺序一致性测试 (pytest)"""
+
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+MODULE_PATH = Path(__file__).with_name('滑坡易发性评价系统.py')
+
+spec = importlib.util.spec_from_file_location('landslide', MODULE_PATH)
+landslide = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(landslide)
+
+
+def write_raster(path, data):
+    """写出单波段 float32 测试栅格"""
+    with rasterio.open(path, 'w', driver='GTiff', height=data.shape[0], width=data.shape[1], count=1,
+                       dtype='float32', crs='EPSG:4326', transform=from_origin(0, 10, 1, 1)) as dst:
+        dst.write(data.astype(np.float32), 1)
+    return str(path)
+
+
+@pytest.fixture
+def factors(tmp_path):
+    """三个取值范围互不重叠的因子: slope 0~, elevation 100~, river 1000~"""
+    rng = np.random.default_rng(0)
+    return {
+        name: write_raster(tmp_path / f'{name}.tif', offset + rng.random((10, 10)))
+        for name, offset in (('slope', 0), ('elevation', 100), ('river', 1000))
+    }
+
+
+@pytest.fixture
+def model_path(tmp_path, factors):
+    """按 slope, elevation, river 的顺序训练并保存模型"""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
+
+    lsa = landslide.LandslideSusceptibility()
+    lsa.load_factors([factors['slope'], factors['elevation'], factors['river']])
+    X = np.column_stack([factor['data'].ravel() for factor in lsa.factors])
+    y = (X[:, 0] > 0.5).astype(int)
+    lsa.scaler = StandardScaler().fit(X)
+    lsa.model = LogisticRegression().fit(lsa.scaler.transform(X), y)
+    lsa.model_factor_names = list(lsa.factor_names)
+    path = tmp_path / 'model.joblib'
+    lsa.save_model(path)
+    return path
+
+
+def test_load_model_reorders_factors(factors, model_path):
+    lsa = landslide.LandslideSusceptibility()
+    lsa.load_factors([factors['river'], factors['slope'], factors['elevation']], lazy=True)
+    lsa.load_model(model_path)
+
+    assert lsa.factor_names == ['slope', 'elevation', 'river']
+    assert [Path(path).stem for path in lsa.factor_paths] == lsa.factor_names
+
+
+def test_load_factors_after_model_follows_model_order(factors, model_path):
+    lsa = landslide.LandslideSusceptibility()
+    lsa.load_model(model_path)
+    lsa.load_factors([factors['elevation'], factors['river'], factors['slope']], lazy=True)
+
+    assert lsa.factor_names == ['slope', 'elevation', 'river']
+    assert [Path(path).stem for path in lsa.factor_paths] == lsa.factor_names
+
+
+def test_load_model_rejects_different_factors(tmp_path, factors, model_path):
+    other = write_raster(tmp_path / 'road.tif', np.zeros((10, 10)))
+    lsa = landslide.LandslideSusceptibility()
+    lsa.load_factors([factors['slope'], factors['elevation'], other], lazy=True)
+
+    with pytest.raises(ValueError, match='不一致'):
+        lsa.load_model(model_path)
+
+
+def test_query_service_uses_model_factor_order(tmp_path, factors, model_path):
+    lsa = landslide.LandslideSusceptibility()
+    lsa.load_factors([factors['river'], factors['elevation'], factors['slope']], lazy=True)
+    lsa.load_model(model_path)
+    stack_path = lsa.build_factor_stack(tmp_path / 'stack.npy')
+
+    service = landslide.SusceptibilityQueryService(lsa, stack_path)
+    stack = np.load(stack_path)
+    assert stack[0].max() < 1 and stack[2].min() > 1000
+
+    # 与直接按模型顺序取值预测的结果一致
+    points = [[0.5, 9.5], [3.5, 4.5]]
+    X = stack[:, [0, 5], [0, 3]].T.astype(np.float64)
+    expected = lsa.model.predict_proba(lsa.scaler.transform(X))[:, 1]
+    np.testing.assert_allclose(service.query(points), expected)
+
+
+def test_query_service_rejects_stack_in_other_order(tmp_path, factors, model_path):
+    stale = landslide.LandslideSusceptibility()
+    stale.load_factors([factors['river'], factors['elevation'], factors['slope']], lazy=True)
+    stack_path = stale.build_factor_stack(tmp_path / 'stack.npy')
+
+    lsa = landslide.LandslideSusceptibility()
+    lsa.load_factors([factors['river'], factors['elevation'], factors['slope']], lazy=True)
+    lsa.load_model(model_path)
+
+    with pytest.raises(ValueError, match='build_factor_stack'):
+        landslide.SusceptibilityQueryService(lsa, stack_path)
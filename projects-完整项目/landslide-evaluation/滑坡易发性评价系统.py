@@ -3,43 +3,143 @@
 """
 滑坡易发性评价系统
 Landslide Susceptibility Assessment System
+
+geopandas、sklearn 及 matplotlib 在用到的阶段才导入，
+仅做预测或点查询时不承担这些库的导入开销 (见 bench_import_time.py)。
 """
 
 import numpy as np
 import pandas as pd
 import rasterio
 from rasterio.transform import from_bounds
-import geopandas as gpd
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.svm import SVC
-from sklearn.linear_model import LogisticRegression
-from sklearn.neural_network import MLPClassifier
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score, confusion_matrix
-import matplotlib.pyplot as plt
-import seaborn as sns
+from rasterio.windows import Window
+from rasterio.enums import Resampling
+from rasterio.features import rasterize
 from pathlib import Path
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import copy
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
 import warnings
 warnings.filterwarnings('ignore')
 
+# 易发性分区: 等间距断点及对应等级
+ZONING_BREAKS = [0.2, 0.4, 0.6, 0.8]
+ZONING_LABELS = ['极低易发区', '低易发区', '中易发区', '高易发区', '极高易发区']
+ZONING_COLORS = ['#1a9641', '#a6d96a', '#ffffbf', '#fdae61', '#d7191c']
+
+# 快视图中文字体候选 (Windows / macOS / Linux)，使用系统中第一个可用的
+CJK_FONTS = ['SimHei', 'Microsoft YaHei', 'PingFang SC', 'Heiti SC', 'Noto Sans CJK SC',
+             'Source Han Sans SC', 'WenQuanYi Micro Hei', 'Arial Unicode MS']
+# 快视图文字: 系统没有中文字体时改用英文，避免图中出现方框
+QUICKLOOK_TEXT = {
+    'zh': {
+        'probability': '易发性概率', 'susceptibility': '滑坡易发性', 'zoning': '滑坡易发性分区',
+        'zones': ZONING_LABELS, 'fpr': '假阳性率', 'tpr': '真阳性率', 'roc': 'ROC曲线 (测试集)'
+    },
+    'en': {
+        'probability': 'Susceptibility probability', 'susceptibility': 'Landslide susceptibility',
+        'zoning': 'Landslide susceptibility zoning', 'zones': ['Very low', 'Low', 'Moderate', 'High', 'Very high'],
+        'fpr': 'False positive rate', 'tpr': 'True positive rate', 'roc': 'ROC curve (test set)'
+    }
+}
+
+
+def _overview_factors(rows, cols, min_size=256):
+    """计算金字塔层级 (2的幂)，直到最长边小于 min_size"""
+    factors = []
+    factor = 2
+    while max(rows, cols) / factor >= min_size:
+        factors.append(factor)
+        factor *= 2
+    return factors
+
+
+def _quicklook_style():
+    """
+    选择快视图的字体配置及文字语言
+
+    Returns:
+    --------
+    tuple
+        (matplotlib rc 配置, QUICKLOOK_TEXT 中的文字)
+    """
+    from matplotlib import font_manager, rcParams
+
+    installed = {font.name for font in font_manager.fontManager.ttflist}
+    fonts = [name for name in CJK_FONTS if name in installed]
+    if not fonts:
+        return {}, QUICKLOOK_TEXT['en']
+    return {
+        'font.sans-serif': fonts + list(rcParams['font.sans-serif']),
+        'axes.unicode_minus': False  # 中文字体通常缺少 Unicode 负号
+    }, QUICKLOOK_TEXT['zh']
+
+
+def _permuted_auc(model, X, y, col, seed):
+    """打乱第 col 列后计算模型AUC (置换重要性的单个任务)"""
+    from sklearn.metrics import roc_auc_score
+
+    X_permuted = X.copy()
+    X_permuted[:, col] = np.random.default_rng(seed).permutation(X_permuted[:, col])
+    return roc_auc_score(y, model.predict_proba(X_permuted)[:, 1])
+
+
+def _stack_names_path(stack_path):
+    """因子栈的层顺序文件 (与 .npy 同名的 .factors.json)"""
+    return str(Path(stack_path).with_suffix('.factors.json'))
+
+
+def _put_until(q, item, abort):
+    """向有界队列放入数据，队列满时等待，直到成功或 abort 被置位"""
+    while not abort.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get_until(q, abort):
+    """从队列取数据，直到取到或 abort 被置位 (此时返回None)"""
+    while not abort.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return None
+
+
 class LandslideSusceptibility:
     """滑坡易发性评价主类"""
     
     def __init__(self):
         self.factors = []
         self.factor_names = []
+        self.factor_paths = []
         self.landslide_points = None
         self.non_landslide_points = None
         self.study_area = None
-        self.scaler = StandardScaler()
+        self.scaler = None
         self.model = None
+        self.model_factor_names = None  # 模型训练时的因子顺序
         self.X_train = None
         self.X_test = None
         self.y_train = None
         self.y_test = None
+        self.y_test_proba = None
+        self.factor_importance = None
+        self.pipeline_metrics = None
         
-    def load_factors(self, factor_paths):
+    def load_factors(self, factor_paths, lazy=False):
         """
         加载影响因子栅格数据
         
@@ -47,26 +147,57 @@ class LandslideSusceptibility:
         -----------
         factor_paths : list
             影响因子TIF文件路径列表
+        lazy : bool
+            为True时只读取元数据，像元留在磁盘上 (供分块预测使用)
         """
         print("正在加载影响因子数据...")
         self.factors = []
         self.factor_names = []
+        self.factor_paths = [str(path) for path in factor_paths]
         
         for path in factor_paths:
             with rasterio.open(path) as src:
-                data = src.read(1)
+                data = None if lazy else src.read(1)
                 self.factors.append({
                     'data': data,
                     'transform': src.transform,
                     'crs': src.crs,
                     'nodata': src.nodata,
                     'bounds': src.bounds,
-                    'shape': data.shape
+                    'shape': (src.height, src.width)
                 })
                 self.factor_names.append(Path(path).stem)
         
         print(f"已加载 {len(self.factors)} 个影响因子: {', '.join(self.factor_names)}")
         
+        # 先加载了模型时，按模型的因子顺序排列；因子不同说明要重新训练，只给出提示
+        if self.model_factor_names is not None:
+            if sorted(self.factor_names) == sorted(self.model_factor_names):
+                self._align_factors(self.model_factor_names)
+            else:
+                print("警告: 加载的因子与当前模型不一致，请重新训练模型后再预测")
+    
+    def _align_factors(self, names):
+        """
+        将已加载的因子按给定的因子顺序重新排列
+
+        Parameters:
+        -----------
+        names : list
+            目标因子顺序 (模型训练时的 factor_names)
+        """
+        if sorted(self.factor_names) != sorted(names):
+            missing = [name for name in names if name not in self.factor_names]
+            extra = [name for name in self.factor_names if name not in names]
+            raise ValueError(f"已加载的因子与模型不一致: 缺少 {missing}，多出 {extra}")
+        if self.factor_names == list(names):
+            return
+        order = [self.factor_names.index(name) for name in names]
+        self.factors = [self.factors[i] for i in order]
+        self.factor_paths = [self.factor_paths[i] for i in order]
+        self.factor_names = list(names)
+        print(f"已按模型的因子顺序重新排列: {', '.join(self.factor_names)}")
+        
     def load_points(self, landslide_path, non_landslide_path):
         """
         加载滑坡点和非滑坡点
@@ -78,6 +209,8 @@ class LandslideSusceptibility:
         non_landslide_path : str
             非滑坡点shapefile路径
         """
+        import geopandas as gpd
+
         print("正在加载样本点...")
         self.landslide_points = gpd.read_file(landslide_path)
         self.non_landslide_points = gpd.read_file(non_landslide_path)
@@ -87,6 +220,8 @@ class LandslideSusceptibility:
         
     def load_study_area(self, area_path):
         """加载研究区范围"""
+        import geopandas as gpd
+
         print("正在加载研究区范围...")
         self.study_area = gpd.read_file(area_path)
         print(f"研究区已加载")
@@ -132,7 +267,41 @@ class LandslideSusceptibility:
             samples.append(sample)
         
         return pd.DataFrame(samples)
-    
+
+    def sample_factor_values(self, xs, ys):
+        """
+        批量提取坐标处的因子值 (向量化)
+
+        Parameters:
+        -----------
+        xs, ys : array-like
+            样本点坐标
+
+        Returns:
+        --------
+        ndarray
+            形状为 (点数, 因子数) 的因子值矩阵，范围外或NoData处为NaN
+        """
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        values = np.full((len(xs), len(self.factors)), np.nan)
+
+        for i, factor in enumerate(self.factors):
+            cols, rows = ~factor['transform'] * (xs, ys)
+            rows = np.floor(rows).astype(np.int64)
+            cols = np.floor(cols).astype(np.int64)
+
+            # 检查是否在栅格范围内
+            inside = (rows >= 0) & (rows < factor['shape'][0]) & (cols >= 0) & (cols < factor['shape'][1])
+            column = factor['data'][rows[inside], cols[inside]].astype(np.float64)
+
+            # 处理NoData值
+            if factor['nodata'] is not None:
+                column[column == factor['nodata']] = np.nan
+            values[inside, i] = column
+
+        return values
+
     def prepare_dataset(self):
         """准备训练数据集"""
         print("\n正在准备数据集...")
@@ -152,8 +321,12 @@ class LandslideSusceptibility:
         X = data_clean[self.factor_names].values
         y = data_clean['label'].values
         
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import StandardScaler
+
         # 归一化处理
         print("正在进行数据归一化...")
+        self.scaler = StandardScaler()
         X_normalized = self.scaler.fit_transform(X)
         
         # 划分训练集和测试集 (70% 训练, 30% 测试)
@@ -165,6 +338,51 @@ class LandslideSusceptibility:
         print(f"测试集样本数: {len(self.X_test)}")
         
         return X_normalized, y
+
+    def write_sample_chunks(self, chunk_dir, chunk_rows=1_000_000, random_state=42):
+        """
+        将样本点的因子值分块写入磁盘，供 train_model_incremental 流式读取
+
+        每个分块为一个 .npy 文件，前若干列为因子值 (顺序同 factor_names)，最后一列为标签。
+        两类样本先整体随机打乱再分块，每个分块都按总体比例包含滑坡点和非滑坡点。
+
+        Parameters:
+        -----------
+        chunk_dir : str
+            分块输出目录
+        chunk_rows : int
+            每个分块的样本数
+        random_state : int
+            打乱样本顺序的随机种子
+
+        Returns:
+        --------
+        list
+            分块文件路径列表
+        """
+        chunk_path = Path(chunk_dir)
+        chunk_path.mkdir(parents=True, exist_ok=True)
+        print(f"\n正在写出样本分块到 {chunk_dir} ...")
+
+        xs = np.concatenate([self.landslide_points.geometry.x.values,
+                             self.non_landslide_points.geometry.x.values])
+        ys = np.concatenate([self.landslide_points.geometry.y.values,
+                             self.non_landslide_points.geometry.y.values])
+        labels = np.concatenate([np.ones(len(self.landslide_points)),
+                                 np.zeros(len(self.non_landslide_points))])
+        order = np.random.default_rng(random_state).permutation(len(labels))
+
+        chunk_files = []
+        for start in range(0, len(order), chunk_rows):
+            index = order[start:start + chunk_rows]
+            values = self.sample_factor_values(xs[index], ys[index])
+            chunk = np.column_stack([values, labels[index]])
+            file_path = chunk_path / f"samples_{start // chunk_rows:05d}.npy"
+            np.save(file_path, chunk)
+            chunk_files.append(str(file_path))
+
+        print(f"已写出 {len(chunk_files)} 个样本分块")
+        return chunk_files
     
     def train_model(self, model_type='random_forest', **kwargs):
         """
@@ -181,6 +399,7 @@ class LandslideSusceptibility:
         
         # 选择模型
         if model_type == 'random_forest':
+            from sklearn.ensemble import RandomForestClassifier
             self.model = RandomForestClassifier(
                 n_estimators=kwargs.get('n_estimators', 100),
                 max_depth=kwargs.get('max_depth', 20),
@@ -188,6 +407,7 @@ class LandslideSusceptibility:
                 n_jobs=-1
             )
         elif model_type == 'svm':
+            from sklearn.svm import SVC
             self.model = SVC(
                 C=kwargs.get('C', 1.0),
                 kernel=kwargs.get('kernel', 'rbf'),
@@ -195,12 +415,14 @@ class LandslideSusceptibility:
                 random_state=42
             )
         elif model_type == 'logistic':
+            from sklearn.linear_model import LogisticRegression
             self.model = LogisticRegression(
                 C=kwargs.get('C', 1.0),
                 max_iter=1000,
                 random_state=42
             )
         elif model_type == 'gradient_boost':
+            from sklearn.ensemble import GradientBoostingClassifier
             self.model = GradientBoostingClassifier(
                 n_estimators=kwargs.get('n_estimators', 100),
                 learning_rate=kwargs.get('learning_rate', 0.1),
@@ -208,6 +430,7 @@ class LandslideSusceptibility:
                 random_state=42
             )
         elif model_type == 'neural_network':
+            from sklearn.neural_network import MLPClassifier
             self.model = MLPClassifier(
                 hidden_layer_sizes=kwargs.get('hidden_layers', (100, 50)),
                 max_iter=1000,
@@ -218,12 +441,156 @@ class LandslideSusceptibility:
         
         # 训练模型
         self.model.fit(self.X_train, self.y_train)
+        self.model_factor_names = list(self.factor_names)
         
         # 模型评估
         self.evaluate_model()
+
+    def train_model_incremental(self, chunk_paths, model_type='sgd_logistic', epochs=5,
+                                memory_budget_mb=256, test_size=0.3, max_eval_samples=200_000,
+                                random_state=42, **kwargs):
+        """
+        外存增量训练 (样本量超出内存时使用)
+
+        从磁盘分块流式读取样本 (write_sample_chunks 生成的 .npy 文件，以内存映射方式打开)，
+        先用 partial_fit 增量拟合归一化器，再按批次多轮增量训练模型。
+        每批行数由内存预算决定，训练过程内存占用固定。
+
+        Parameters:
+        -----------
+        chunk_paths : list
+            样本分块文件路径列表 (最后一列为标签)
+        model_type : str
+            模型类型: 'sgd_logistic' (SGD逻辑回归), 'neural_network' (MLP)
+        epochs : int
+            训练轮数
+        memory_budget_mb : int
+            单批数据的内存预算 (MB)
+        test_size : float
+            测试样本比例 (按样本随机划分，各轮保持一致)
+        max_eval_samples : int
+            保留在内存中用于评估的训练/测试样本上限 (每类各占一半，按类别蓄水池抽样)
+        random_state : int
+            随机种子
+        **kwargs : dict
+            模型参数
+        """
+        from sklearn.metrics import roc_auc_score
+        from sklearn.preprocessing import StandardScaler
+
+        print(f"\n正在外存增量训练 {model_type} 模型 ({len(chunk_paths)} 个分块, {epochs} 轮)...")
+
+        if model_type == 'sgd_logistic':
+            from sklearn.linear_model import SGDClassifier
+            self.model = SGDClassifier(
+                loss='log_loss',
+                alpha=kwargs.get('alpha', 1e-4),
+                random_state=random_state
+            )
+        elif model_type == 'neural_network':
+            from sklearn.neural_network import MLPClassifier
+            self.model = MLPClassifier(
+                hidden_layer_sizes=kwargs.get('hidden_layers', (100, 50)),
+                learning_rate_init=kwargs.get('learning_rate', 0.001),
+                random_state=random_state
+            )
+        else:
+            raise ValueError(f"不支持增量训练的模型类型: {model_type}")
+
+        chunks = [np.load(path, mmap_mode='r') for path in chunk_paths]
+        n_columns = chunks[0].shape[1]
+
+        # 原始块、归一化结果及模型中间量约4份副本
+        batch_rows = max(1000, memory_budget_mb * 1024 ** 2 // (n_columns * 8 * 4))
+        batches = [(c, start) for c, chunk in enumerate(chunks) for start in range(0, len(chunk), batch_rows)]
+        print(f"每批样本数: {batch_rows}, 共 {len(batches)} 批")
+
+        def load_batch(c, start):
+            data = np.asarray(chunks[c][start:start + batch_rows], dtype=np.float64)
+            data = data[~np.isnan(data).any(axis=1)]
+            # 测试样本划分只与批次位置有关，保证各轮一致
+            is_test = np.random.default_rng([random_state, c, start]).random(len(data)) < test_size
+            return data[:, :-1], data[:, -1].astype(int), is_test
+
+        # 评估样本按 (训练/测试, 类别) 分别蓄水池抽样: 给每行一个随机键，
+        # 始终保留键最小的 per_class 行，结果等价于对该类全部样本的均匀抽样
+        per_class = max(1, max_eval_samples // 2)
+        reservoirs = {}
+
+        def add_to_reservoir(split, X, y, keys):
+            for label in (0, 1):
+                mask = y == label
+                if not mask.any():
+                    continue
+                new_keys, new_X = keys[mask], X[mask]
+                if (split, label) in reservoirs:
+                    old_keys, old_X = reservoirs[(split, label)]
+                    new_keys, new_X = np.concatenate([old_keys, new_keys]), np.concatenate([old_X, new_X])
+                if len(new_keys) > per_class:
+                    keep = np.argpartition(new_keys, per_class - 1)[:per_class]
+                    new_keys, new_X = new_keys[keep], new_X[keep]
+                reservoirs[(split, label)] = (new_keys, new_X)
+
+        # 第一遍: 增量拟合归一化器，同时抽取评估样本
+        print("正在增量拟合归一化器...")
+        self.scaler = StandardScaler()
+        n_train = n_test = 0
+        n_single_class = 0
+        for c, start in batches:
+            X, y, is_test = load_batch(c, start)
+            if (~is_test).any():
+                self.scaler.partial_fit(X[~is_test])
+            n_train += int((~is_test).sum())
+            n_test += int(is_test.sum())
+            if len(np.unique(y)) < 2:
+                n_single_class += 1
+            keys = np.random.default_rng([random_state, c, start, 1]).random(len(y))
+            add_to_reservoir('train', X[~is_test], y[~is_test], keys[~is_test])
+            add_to_reservoir('test', X[is_test], y[is_test], keys[is_test])
+        print(f"训练样本数: {n_train}, 测试样本数: {n_test}")
+
+        missing = [f"{'训练' if split == 'train' else '测试'}集缺少{'滑坡' if label == 1 else '非滑坡'}样本"
+                   for split in ('train', 'test') for label in (0, 1) if (split, label) not in reservoirs]
+        if missing:
+            raise ValueError("评估样本不完整: " + "，".join(missing))
+        if n_single_class:
+            print(f"警告: {n_single_class}/{len(batches)} 个批次只含一类样本，增量训练可能不稳定，"
+                  "建议用 write_sample_chunks 重新生成混合分块")
+
+        def stack(split):
+            X = np.concatenate([reservoirs[(split, label)][1] for label in (0, 1)])
+            y = np.concatenate([np.full(len(reservoirs[(split, label)][1]), label) for label in (0, 1)])
+            return self.scaler.transform(X), y
+
+        self.X_train, self.y_train = stack('train')
+        self.X_test, self.y_test = stack('test')
+        print(f"评估样本数: 训练 {len(self.y_train)} (滑坡 {int(self.y_train.sum())}), "
+              f"测试 {len(self.y_test)} (滑坡 {int(self.y_test.sum())})")
+
+        # 多轮增量训练，每轮打乱批次顺序及批内样本顺序
+        classes = np.array([0, 1])
+        rng = np.random.default_rng(random_state)
+        for epoch in range(1, epochs + 1):
+            for b in rng.permutation(len(batches)):
+                X, y, is_test = load_batch(*batches[b])
+                order = rng.permutation(int((~is_test).sum()))
+                if len(order) == 0:
+                    continue
+                X_batch = self.scaler.transform(X[~is_test][order])
+                self.model.partial_fit(X_batch, y[~is_test][order], classes=classes)
+
+            auc = roc_auc_score(self.y_test, self.model.predict_proba(self.X_test)[:, 1])
+            print(f"  第 {epoch}/{epochs} 轮完成, 测试AUC: {auc:.4f}")
+        # 分块的列顺序同写出分块时的 factor_names
+        self.model_factor_names = list(self.factor_names)
+
+        # 模型评估
+        self.evaluate_model()
         
     def evaluate_model(self):
         """评估模型性能"""
+        from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score, confusion_matrix
+
         print("\n模型评估结果:")
         print("="*50)
         
@@ -235,6 +602,9 @@ class LandslideSusceptibility:
         y_test_pred = self.model.predict(self.X_test)
         y_test_proba = self.model.predict_proba(self.X_test)[:, 1]
         
+        # 缓存测试集预测概率，供因子重要性等后续阶段复用
+        self.y_test_proba = y_test_proba
+        
         # 计算指标
         metrics = {
             '训练集': {
@@ -265,7 +635,130 @@ class LandslideSusceptibility:
         print(cm)
         
         return metrics
-    
+
+    def compute_factor_importance(self, n_repeats=10, subsample=None, n_jobs=-1, random_state=42):
+        """
+        置换重要性评价各影响因子的贡献
+
+        在测试集上逐个打乱因子列，以AUC下降值作为该因子的重要性。
+        各 (因子, 重复) 任务并行执行，基准预测直接复用 evaluate_model 缓存的测试集概率。
+
+        Parameters:
+        -----------
+        n_repeats : int
+            每个因子的重复打乱次数
+        subsample : int or float, optional
+            分层抽样的测试样本数 (int) 或比例 (float)，用于限制计算量；None 表示使用全部测试集
+        n_jobs : int
+            并行线程数，-1 表示使用全部CPU
+        random_state : int
+            随机种子
+
+        Returns:
+        --------
+        DataFrame
+            按重要性降序排列的因子重要性表
+        """
+        if self.model is None or self.X_test is None:
+            raise ValueError("请先准备数据集并训练模型")
+
+        from joblib import Parallel, delayed
+        from sklearn.metrics import roc_auc_score
+        from sklearn.model_selection import train_test_split
+
+        print(f"\n正在计算因子置换重要性 (重复 {n_repeats} 次)...")
+
+        if self.y_test_proba is None:
+            self.y_test_proba = self.model.predict_proba(self.X_test)[:, 1]
+
+        X = self.X_test
+        y = self.y_test
+        baseline_proba = self.y_test_proba
+
+        # 分层抽样，控制计算量
+        if subsample is not None and subsample < (1.0 if isinstance(subsample, float) else len(y)):
+            index, _ = train_test_split(
+                np.arange(len(y)), train_size=subsample, random_state=random_state, stratify=y
+            )
+            X, y, baseline_proba = X[index], y[index], baseline_proba[index]
+            print(f"分层抽样后样本数: {len(y)}")
+
+        baseline_score = roc_auc_score(y, baseline_proba)
+
+        # 每个 (因子, 重复) 使用独立的随机序列，保证结果可复现
+        n_factors = X.shape[1]
+        seeds = np.random.SeedSequence(random_state).spawn(n_factors * n_repeats)
+        tasks = [(col, seeds[col * n_repeats + r]) for col in range(n_factors) for r in range(n_repeats)]
+
+        # 线程后端避免模型在进程间反复序列化
+        scores = Parallel(n_jobs=n_jobs, prefer='threads')(
+            delayed(_permuted_auc)(self.model, X, y, col, seed) for col, seed in tasks
+        )
+        drops = baseline_score - np.asarray(scores).reshape(n_factors, n_repeats)
+
+        importance = pd.DataFrame({
+            '因子': self.factor_names,
+            '重要性均值': drops.mean(axis=1),
+            '重要性标准差': drops.std(axis=1)
+        }).sort_values('重要性均值', ascending=False, ignore_index=True)
+        importance['排名'] = np.arange(1, len(importance) + 1)
+
+        self.factor_importance = importance
+
+        print(f"基准AUC: {baseline_score:.4f}")
+        for _, row in importance.iterrows():
+            print(f"  {row['排名']:>2}. {row['因子']}: {row['重要性均值']:.4f} ± {row['重要性标准差']:.4f}")
+
+        return importance
+
+    def save_model(self, model_path):
+        """
+        保存模型、归一化器及因子信息
+
+        Parameters:
+        -----------
+        model_path : str
+            模型文件路径 (.joblib)
+        """
+        import joblib
+
+        joblib.dump({
+            'model': self.model,
+            'scaler': self.scaler,
+            'factor_names': self.factor_names,
+            'factor_importance': self.factor_importance
+        }, model_path)
+        print(f"✓ 模型文件已保存: {model_path}")
+
+    def load_model(self, model_path):
+        """
+        加载 save_model 保存的模型文件
+
+        Parameters:
+        -----------
+        model_path : str
+            模型文件路径 (.joblib)
+        """
+        import joblib
+
+        artifact = joblib.load(model_path)
+        self.model = artifact['model']
+        self.scaler = artifact['scaler']
+        self.model_factor_names = list(artifact['factor_names'])
+        if self.factors:
+            # 模型按保存时的因子顺序取特征，已加载的因子须与之一致
+            self._align_factors(self.model_factor_names)
+        else:
+            self.factor_names = list(self.model_factor_names)
+        self.factor_importance = artifact.get('factor_importance')
+        # 数据划分和测试集概率属于之前的模型，清空以免评价和绘图沿用旧结果
+        self.X_train = None
+        self.X_test = None
+        self.y_train = None
+        self.y_test = None
+        self.y_test_proba = None
+        print(f"已加载模型: {model_path}")
+
     def predict_susceptibility(self):
         """预测整个研究区的易发性"""
         print("\n正在预测滑坡易发性...")
@@ -300,6 +793,607 @@ class LandslideSusceptibility:
         
         print("易发性预测完成！")
         return susceptibility_map, reference
+
+    def _score_block(self, block):
+        """
+        对一个因子数据块进行预测
+
+        Parameters:
+        -----------
+        block : ndarray
+            形状为 (因子数, 行, 列) 的数据块，无效值为NaN
+
+        Returns:
+        --------
+        ndarray
+            形状为 (行, 列) 的易发性概率 (float32)，无效像元为NaN
+        """
+        n_factors, rows, cols = block.shape
+        X = block.reshape(n_factors, -1).T
+        valid_mask = ~np.isnan(X).any(axis=1)
+
+        result = np.full(rows * cols, np.nan, dtype=np.float32)
+        if valid_mask.any():
+            result[valid_mask] = self.model.predict_proba(
+                self.scaler.transform(X[valid_mask])
+            )[:, 1]
+        return result.reshape(rows, cols)
+
+    def _score_block_with_uncertainty(self, block, pool, n_groups):
+        """
+        对一个因子数据块进行预测，同时给出集成成员间的标准差
+
+        各成员 (随机森林的树或Bagging成员) 的预测概率以 Welford 算法逐个累加均值与方差，
+        不堆叠全部成员的结果；成员分组在线程池中并行累加，最后按 Chan 公式合并。
+
+        Parameters:
+        -----------
+        block : ndarray
+            形状为 (因子数, 行, 列) 的数据块，无效值为NaN
+        pool : ThreadPoolExecutor
+            用于并行累加成员分组的线程池
+        n_groups : int
+            成员分组数
+
+        Returns:
+        --------
+        tuple
+            (易发性概率, 标准差)，形状均为 (行, 列) 的 float32 数组，无效像元为NaN
+        """
+        n_factors, rows, cols = block.shape
+        X = block.reshape(n_factors, -1).T
+        valid_mask = ~np.isnan(X).any(axis=1)
+
+        mean_map = np.full(rows * cols, np.nan, dtype=np.float32)
+        std_map = np.full(rows * cols, np.nan, dtype=np.float32)
+        if not valid_mask.any():
+            return mean_map.reshape(rows, cols), std_map.reshape(rows, cols)
+
+        X_valid = self.scaler.transform(X[valid_mask])
+        estimators = self.model.estimators_
+        features = getattr(self.model, 'estimators_features_', None)
+
+        def accumulate(members):
+            count = 0
+            mean = np.zeros(len(X_valid))
+            m2 = np.zeros(len(X_valid))
+            for i in members:
+                X_member = X_valid if features is None else X_valid[:, features[i]]
+                proba = estimators[i].predict_proba(X_member)[:, 1]
+                count += 1
+                delta = proba - mean
+                mean += delta / count
+                m2 += delta * (proba - mean)
+            return count, mean, m2
+
+        groups = [g for g in np.array_split(np.arange(len(estimators)), n_groups) if len(g)]
+        partials = list(pool.map(accumulate, groups))
+
+        # Chan 公式合并各分组的均值与二阶矩
+        count, mean, m2 = partials[0]
+        for count_b, mean_b, m2_b in partials[1:]:
+            total = count + count_b
+            delta = mean_b - mean
+            mean = mean + delta * (count_b / total)
+            m2 = m2 + m2_b + delta ** 2 * (count * count_b / total)
+            count = total
+
+        mean_map[valid_mask] = mean
+        std_map[valid_mask] = np.sqrt(m2 / count)
+        return mean_map.reshape(rows, cols), std_map.reshape(rows, cols)
+
+    def predict_susceptibility_tiled(self, output_dir='output', block_size=512, prefetch=2,
+                                     build_overviews=True, with_uncertainty=False):
+        """
+        分块流水线预测，结果直接写入 GeoTIFF
+
+        读线程预取后续窗口的因子数据，写线程落盘已完成的结果块，
+        主线程只负责预测，磁盘I/O与模型推理相互重叠。两端均为有界队列，内存占用固定。
+
+        Parameters:
+        -----------
+        output_dir : str
+            输出目录
+        block_size : int
+            分块大小 (像元)，为16的倍数时输出按相同大小分瓦片存储
+        prefetch : int
+            读/写队列深度 (预取块数)
+        build_overviews : bool
+            是否在写出后建立金字塔，供快视图等降采样读取使用
+        with_uncertainty : bool
+            是否同时输出集成成员间的标准差 (susceptibility_uncertainty.tif)，
+            仅适用于随机森林、Bagging 等由独立成员组成的集成模型
+
+        Returns:
+        --------
+        tuple
+            (输出TIF路径, 流水线统计指标)
+        """
+        if self.model is None:
+            raise ValueError("请先训练或加载模型")
+
+        print(f"\n正在分块预测滑坡易发性 (块大小: {block_size})...")
+
+        output_path = Path(output_dir)
+        output_path.mkdir(exist_ok=True)
+        tif_path = output_path / 'susceptibility_map.tif'
+        output_paths = [tif_path]
+
+        pool = None
+        if with_uncertainty:
+            estimators = getattr(self.model, 'estimators_', None)
+            if estimators is None or not hasattr(estimators[0], 'predict_proba'):
+                raise ValueError(f"模型 {type(self.model).__name__} 不是由独立成员组成的集成模型，无法输出不确定性")
+            output_paths.append(output_path / 'susceptibility_uncertainty.tif')
+            n_groups = min(len(estimators), os.cpu_count() or 1)
+            pool = ThreadPoolExecutor(max_workers=n_groups)
+
+        # 以第一个因子为参考网格，分块读取要求所有因子网格一致
+        reference = self.factors[0]
+        rows, cols = reference['shape']
+        for name, factor in zip(self.factor_names, self.factors):
+            if factor['shape'] != reference['shape'] or factor['transform'] != reference['transform']:
+                raise ValueError(f"因子 {name} 与参考因子网格不一致，无法分块预测")
+
+        windows = [
+            Window(col, row, min(block_size, cols - col), min(block_size, rows - row))
+            for row in range(0, rows, block_size)
+            for col in range(0, cols, block_size)
+        ]
+
+        profile = {
+            'driver': 'GTiff',
+            'height': rows,
+            'width': cols,
+            'count': 1,
+            'dtype': 'float32',
+            'crs': reference['crs'],
+            'transform': reference['transform'],
+            'nodata': np.nan,
+            'compress': 'deflate',
+            'BIGTIFF': 'IF_SAFER'
+        }
+        if block_size % 16 == 0:
+            profile.update(tiled=True, blockxsize=block_size, blockysize=block_size)
+
+        read_queue = queue.Queue(maxsize=prefetch)
+        write_queue = queue.Queue(maxsize=prefetch)
+        failed = threading.Event()
+        errors = []
+        metrics = {
+            'blocks': len(windows),
+            'read_time': 0.0,           # 读线程读取耗时
+            'reader_stall': 0.0,        # 读线程因队列已满等待 (推理为瓶颈)
+            'compute_time': 0.0,        # 模型推理耗时
+            'compute_wait_input': 0.0,  # 推理等待输入 (读取为瓶颈)
+            'compute_wait_output': 0.0, # 推理等待写队列 (写出为瓶颈)
+            'write_time': 0.0,          # 写线程写出耗时
+            'writer_stall': 0.0         # 写线程等待结果
+        }
+
+        def reader():
+            try:
+                with ExitStack() as stack:
+                    sources = [stack.enter_context(rasterio.open(path)) for path in self.factor_paths]
+                    for window in windows:
+                        start = time.perf_counter()
+                        block = np.empty((len(sources), window.height, window.width), dtype=np.float64)
+                        for i, src in enumerate(sources):
+                            data = src.read(1, window=window)
+                            block[i] = data
+                            # 处理NoData值
+                            if src.nodata is not None:
+                                block[i][data == src.nodata] = np.nan
+                        metrics['read_time'] += time.perf_counter() - start
+
+                        start = time.perf_counter()
+                        if not _put_until(read_queue, (window, block), failed):
+                            return
+                        metrics['reader_stall'] += time.perf_counter() - start
+            except Exception as e:
+                errors.append(e)
+                failed.set()
+            finally:
+                _put_until(read_queue, None, failed)
+
+        def writer():
+            try:
+                with ExitStack() as stack:
+                    destinations = [stack.enter_context(rasterio.open(path, 'w', **profile)) for path in output_paths]
+                    while True:
+                        start = time.perf_counter()
+                        item = _get_until(write_queue, failed)
+                        metrics['writer_stall'] += time.perf_counter() - start
+                        if item is None:
+                            break
+
+                        window, results = item
+                        start = time.perf_counter()
+                        for dst, result in zip(destinations, results):
+                            dst.write(result, 1, window=window)
+                        metrics['write_time'] += time.perf_counter() - start
+
+                    if build_overviews and not failed.is_set():
+                        start = time.perf_counter()
+                        for dst in destinations:
+                            dst.build_overviews(_overview_factors(rows, cols), Resampling.average)
+                            dst.update_tags(ns='rio_overview', resampling='average')
+                        metrics['write_time'] += time.perf_counter() - start
+            except Exception as e:
+                errors.append(e)
+                failed.set()
+
+        total_start = time.perf_counter()
+        reader_thread = threading.Thread(target=reader, daemon=True)
+        writer_thread = threading.Thread(target=writer, daemon=True)
+        reader_thread.start()
+        writer_thread.start()
+
+        try:
+            done = 0
+            while True:
+                start = time.perf_counter()
+                item = _get_until(read_queue, failed)
+                metrics['compute_wait_input'] += time.perf_counter() - start
+                if item is None:
+                    break
+
+                window, block = item
+                start = time.perf_counter()
+                if pool is None:
+                    results = (self._score_block(block),)
+                else:
+                    results = self._score_block_with_uncertainty(block, pool, n_groups)
+                metrics['compute_time'] += time.perf_counter() - start
+
+                start = time.perf_counter()
+                if not _put_until(write_queue, (window, results), failed):
+                    break
+                metrics['compute_wait_output'] += time.perf_counter() - start
+
+                done += 1
+                if done % 100 == 0 or done == len(windows):
+                    print(f"  已完成 {done}/{len(windows)} 块")
+        except BaseException:
+            failed.set()
+            raise
+        finally:
+            _put_until(write_queue, None, failed)
+            reader_thread.join()
+            writer_thread.join()
+            if pool is not None:
+                pool.shutdown()
+
+        if errors:
+            raise errors[0]
+
+        metrics['total_time'] = time.perf_counter() - total_start
+        self.pipeline_metrics = metrics
+
+        for path in output_paths:
+            print(f"✓ TIF文件已保存: {path}")
+        print(f"流水线统计: 总耗时 {metrics['total_time']:.2f}s | "
+              f"读取 {metrics['read_time']:.2f}s | 推理 {metrics['compute_time']:.2f}s | "
+              f"写出 {metrics['write_time']:.2f}s")
+        print(f"流水线停顿: 推理等待读取 {metrics['compute_wait_input']:.2f}s | "
+              f"推理等待写出 {metrics['compute_wait_output']:.2f}s | "
+              f"读线程阻塞 {metrics['reader_stall']:.2f}s | 写线程空闲 {metrics['writer_stall']:.2f}s")
+
+        return tif_path, metrics
+    
+    def build_factor_stack(self, stack_path, block_rows=512):
+        """
+        将全部因子写入一个内存映射文件 (.npy)，供点查询服务常驻使用
+
+        Parameters:
+        -----------
+        stack_path : str
+            输出 .npy 文件路径，数组形状为 (因子数, 行, 列)，float32，NoData 为 NaN；
+            层顺序另存为同名 .factors.json
+        block_rows : int
+            每次读取的行数
+
+        Returns:
+        --------
+        str
+            因子栈文件路径
+        """
+        reference = self.factors[0]
+        rows, cols = reference['shape']
+        for name, factor in zip(self.factor_names, self.factors):
+            if factor['shape'] != reference['shape'] or factor['transform'] != reference['transform']:
+                raise ValueError(f"因子 {name} 与参考因子网格不一致，无法建立因子栈")
+
+        print(f"\n正在建立因子栈: {stack_path}")
+        stack = np.lib.format.open_memmap(stack_path, mode='w+', dtype=np.float32,
+                                          shape=(len(self.factor_paths), rows, cols))
+        for i, path in enumerate(self.factor_paths):
+            with rasterio.open(path) as src:
+                for row in range(0, rows, block_rows):
+                    height = min(block_rows, rows - row)
+                    data = src.read(1, window=Window(0, row, cols, height))
+                    block = data.astype(np.float32)
+                    # 处理NoData值
+                    if src.nodata is not None:
+                        block[data == src.nodata] = np.nan
+                    stack[i, row:row + height] = block
+        stack.flush()
+        del stack
+        # 记录因子栈的层顺序，供查询服务核对
+        with open(_stack_names_path(stack_path), 'w', encoding='utf-8') as f:
+            json.dump(self.factor_names, f, ensure_ascii=False)
+
+        print(f"✓ 因子栈已保存: {stack_path}")
+        return str(stack_path)
+
+    def serve_point_queries(self, stack_path, host='127.0.0.1', port=8765, unix_socket=None):
+        """
+        启动常驻的点查询服务
+
+        模型、归一化器常驻内存，因子栈以内存映射方式打开，按坐标采样后实时预测。
+        接口:
+            POST /query    请求体 {"points": [[x, y], ...]}，返回 {"susceptibility": [...]}
+            GET  /metrics  请求数、点数、错误数及延迟分位数 (毫秒)
+            GET  /health   服务状态
+
+        Parameters:
+        -----------
+        stack_path : str
+            build_factor_stack 生成的因子栈文件
+        host : str
+            监听地址 (默认仅本机)
+        port : int
+            监听端口
+        unix_socket : str, optional
+            Unix socket 路径，指定时不再监听TCP端口
+        """
+        if self.model is None:
+            raise ValueError("请先训练或加载模型")
+
+        service = SusceptibilityQueryService(self, stack_path)
+        if unix_socket:
+            # Windows 下没有 UnixStreamServer，仅在需要时导入
+            from socketserver import ThreadingMixIn, UnixStreamServer
+
+            class ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+                daemon_threads = True
+
+            if os.path.exists(unix_socket):
+                os.remove(unix_socket)
+            server = ThreadingUnixHTTPServer(unix_socket, _QueryRequestHandler)
+            address = unix_socket
+        else:
+            server = ThreadingHTTPServer((host, port), _QueryRequestHandler)
+            address = f"http://{host}:{port}"
+        server.service = service
+
+        print(f"\n点查询服务已启动: {address} (Ctrl+C 停止)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            print("点查询服务已停止")
+
+    def render_quicklooks(self, output_dir='output', max_pixels=1_000_000, dpi=100):
+        """
+        生成易发性图、分区图和ROC曲线的PNG快视图
+
+        栅格按像元预算降采样读取 (存在金字塔时由GDAL直接读取概览层)，
+        ROC曲线使用缓存的测试集预测概率，耗时与栅格大小基本无关。
+
+        Parameters:
+        -----------
+        output_dir : str
+            输出目录 (需已包含 susceptibility_map.tif)
+        max_pixels : int
+            快视图像元数上限
+        dpi : int
+            输出图片分辨率
+
+        Returns:
+        --------
+        list
+            生成的PNG文件路径列表
+        """
+        # 直接使用 Figure 对象，不经过 pyplot 及交互式后端
+        from matplotlib import rc_context
+        from matplotlib.figure import Figure
+        from matplotlib.colors import ListedColormap
+        from matplotlib.patches import Patch
+        from sklearn.metrics import roc_auc_score, roc_curve
+
+        output_path = Path(output_dir)
+        tif_path = output_path / 'susceptibility_map.tif'
+        print(f"\n正在生成快视图 (像元预算: {max_pixels:,})...")
+        start = time.perf_counter()
+
+        # 按像元预算降采样读取
+        with rasterio.open(tif_path) as src:
+            scale = max(1.0, np.sqrt(src.width * src.height / max_pixels))
+            out_shape = (max(1, int(src.height / scale)), max(1, int(src.width / scale)))
+            data = src.read(1, out_shape=out_shape, resampling=Resampling.nearest).astype(np.float32)
+            if src.nodata is not None and not np.isnan(src.nodata):
+                data[data == src.nodata] = np.nan
+            left, bottom, right, top = src.bounds
+        extent = (left, right, bottom, top)
+        figsize = (out_shape[1] / dpi + 2, out_shape[0] / dpi + 1)
+
+        png_paths = []
+        # 字体在绘制时才解析，savefig 也须在 rc_context 内
+        rc, text = _quicklook_style()
+        with rc_context(rc):
+            # 1. 易发性概率图
+            fig = Figure(figsize=figsize, dpi=dpi)
+            ax = fig.add_subplot()
+            image = ax.imshow(data, cmap='RdYlGn_r', vmin=0, vmax=1, extent=extent, interpolation='nearest')
+            fig.colorbar(image, ax=ax, label=text['probability'])
+            ax.set_title(text['susceptibility'])
+            png_path = output_path / 'susceptibility_quicklook.png'
+            fig.savefig(png_path, bbox_inches='tight')
+            png_paths.append(png_path)
+
+            # 2. 易发性分区图
+            zones = np.ma.masked_invalid(np.where(np.isnan(data), np.nan, np.digitize(data, ZONING_BREAKS)))
+            fig = Figure(figsize=figsize, dpi=dpi)
+            ax = fig.add_subplot()
+            ax.imshow(zones, cmap=ListedColormap(ZONING_COLORS), vmin=-0.5, vmax=len(ZONING_LABELS) - 0.5,
+                      extent=extent, interpolation='nearest')
+            ax.legend(handles=[Patch(color=color, label=label) for color, label in zip(ZONING_COLORS, text['zones'])],
+                      loc='lower right', fontsize='small')
+            ax.set_title(text['zoning'])
+            png_path = output_path / 'zoning_quicklook.png'
+            fig.savefig(png_path, bbox_inches='tight')
+            png_paths.append(png_path)
+
+            # 3. ROC曲线 (使用缓存的测试集预测概率)
+            if self.y_test_proba is not None:
+                fpr, tpr, _ = roc_curve(self.y_test, self.y_test_proba)
+                fig = Figure(figsize=(5, 5), dpi=dpi)
+                ax = fig.add_subplot()
+                ax.plot(fpr, tpr, label=f"AUC = {roc_auc_score(self.y_test, self.y_test_proba):.4f}")
+                ax.plot([0, 1], [0, 1], linestyle='--', color='gray')
+                ax.set_xlabel(text['fpr'])
+                ax.set_ylabel(text['tpr'])
+                ax.set_title(text['roc'])
+                ax.legend(loc='lower right')
+                png_path = output_path / 'roc_curve.png'
+                fig.savefig(png_path, bbox_inches='tight')
+                png_paths.append(png_path)
+
+        for png_path in png_paths:
+            print(f"✓ 快视图已保存: {png_path}")
+        print(f"快视图生成耗时: {time.perf_counter() - start:.2f}s")
+
+        return png_paths
+    
+    def compute_zonal_statistics(self, zones_path, output_dir='output', block_rows=512,
+                                 percentiles=(25, 50, 75, 90), n_bins=1000):
+        """
+        按行政单元等面要素统计易发性
+
+        面要素一次性栅格化到易发性图网格 (写入输出目录中的临时内存映射文件，统计结束后删除)，随后按行块流式读取易发性图，
+        用 np.bincount 累加各单元的像元数和总和，直方图及分区像元数只累加块内出现的 (单元, 区间)，
+        内存占用与栅格大小无关。
+        百分位数由 n_bins 个等宽直方图区间推算 (精度 1/n_bins)。
+
+        Parameters:
+        -----------
+        zones_path : str
+            统计单元面要素文件路径 (如乡镇shapefile)
+        output_dir : str
+            输出目录 (需已包含 susceptibility_map.tif)
+        block_rows : int
+            每次读取的行数
+        percentiles : tuple
+            需要统计的百分位数
+        n_bins : int
+            直方图区间数
+
+        Returns:
+        --------
+        DataFrame
+            各单元属性及统计结果
+        """
+        import geopandas as gpd
+
+        output_path = Path(output_dir)
+        tif_path = output_path / 'susceptibility_map.tif'
+        print(f"\n正在按单元统计易发性: {zones_path}")
+
+        zones = gpd.read_file(zones_path)
+        n_zones = len(zones)
+        n_classes = len(ZONING_LABELS)
+
+        # 栅格化结果只在本次统计中使用，写入临时文件以免大栅格占用内存
+        fd, zone_ids_path = tempfile.mkstemp(prefix='zone_ids_', suffix='.npy', dir=output_path)
+        os.close(fd)
+        try:
+            with rasterio.open(tif_path) as src:
+                rows, cols = src.height, src.width
+                pixel_area = abs(src.transform.a * src.transform.e)
+                if zones.crs is not None and src.crs is not None and zones.crs != src.crs:
+                    zones = zones.to_crs(src.crs)
+
+                # 一次性栅格化统计单元 (0 表示不属于任何单元)
+                zone_ids = np.lib.format.open_memmap(zone_ids_path, mode='w+', dtype=np.int32, shape=(rows, cols))
+                rasterize(
+                    ((geom, zone_id) for zone_id, geom in enumerate(zones.geometry, 1) if geom is not None),
+                    out=zone_ids,
+                    transform=src.transform,
+                    fill=0
+                )
+                print(f"已栅格化 {n_zones} 个统计单元")
+
+                counts = np.zeros(n_zones + 1, dtype=np.int64)
+                sums = np.zeros(n_zones + 1)
+                minimums = np.full(n_zones + 1, np.inf)
+                maximums = np.full(n_zones + 1, -np.inf)
+                histograms = np.zeros((n_zones + 1, n_bins), dtype=np.int64)
+                class_counts = np.zeros((n_zones + 1, n_classes), dtype=np.int64)
+
+                for row in range(0, rows, block_rows):
+                    height = min(block_rows, rows - row)
+                    values = src.read(1, window=Window(0, row, cols, height)).ravel().astype(np.float64)
+                    ids = np.asarray(zone_ids[row:row + height]).ravel()
+
+                    valid = (ids > 0) & ~np.isnan(values)
+                    if src.nodata is not None and not np.isnan(src.nodata):
+                        valid &= values != src.nodata
+                    ids = ids[valid]
+                    values = values[valid]
+
+                    counts += np.bincount(ids, minlength=n_zones + 1)
+                    sums += np.bincount(ids, weights=values, minlength=n_zones + 1)
+                    np.minimum.at(minimums, ids, values)
+                    np.maximum.at(maximums, ids, values)
+
+                    # 只累加本块出现的 (单元, 区间)，不为每块分配 单元数×区间数 的临时数组
+                    bins = np.clip((values * n_bins).astype(np.int64), 0, n_bins - 1)
+                    cells, cell_counts = np.unique(ids * n_bins + bins, return_counts=True)
+                    histograms.reshape(-1)[cells] += cell_counts
+
+                    classes = np.digitize(values, ZONING_BREAKS)
+                    cells, cell_counts = np.unique(ids * n_classes + classes, return_counts=True)
+                    class_counts.reshape(-1)[cells] += cell_counts
+        finally:
+            # 先释放内存映射再删除 (Windows 下映射中的文件无法删除)
+            zone_ids = None
+            os.remove(zone_ids_path)
+
+        # 去掉背景 (编号0)
+        counts, sums = counts[1:], sums[1:]
+        minimums, maximums = minimums[1:], maximums[1:]
+        histograms, class_counts = histograms[1:], class_counts[1:]
+        has_data = counts > 0
+
+        stats = pd.DataFrame({
+            '像元数': counts,
+            '面积': counts * pixel_area,
+            '均值': np.where(has_data, sums / np.maximum(counts, 1), np.nan),
+            '最小值': np.where(has_data, minimums, np.nan),
+            '最大值': np.where(has_data, maximums, np.nan)
+        })
+
+        # 由累计直方图推算百分位数 (取区间中值)
+        cumulative = np.cumsum(histograms, axis=1)
+        for p in percentiles:
+            bin_index = np.argmax(cumulative >= (p / 100.0) * counts[:, None], axis=1)
+            stats[f'P{p}'] = np.where(has_data, (bin_index + 0.5) / n_bins, np.nan)
+
+        for i, label in enumerate(ZONING_LABELS):
+            stats[f'{label}占比'] = np.where(has_data, class_counts[:, i] / np.maximum(counts, 1), np.nan)
+
+        # 关联回统计单元属性
+        attributes = pd.DataFrame(zones.drop(columns=zones.geometry.name)).reset_index(drop=True)
+        result = pd.concat([attributes, stats], axis=1)
+
+        csv_path = output_path / 'zonal_statistics.csv'
+        result.to_csv(csv_path, index=False, encoding='utf-8-sig')
+        print(f"✓ 单元统计表已保存: {csv_path}")
+
+        return result
     
     def export_results(self, susceptibility_map, reference, output_dir='output'):
         """
@@ -314,6 +1408,8 @@ class LandslideSusceptibility:
         output_dir : str
             输出目录
         """
+        from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
+
         output_path = Path(output_dir)
         output_path.mkdir(exist_ok=True)
         
@@ -333,6 +1429,9 @@ class LandslideSusceptibility:
             nodata=np.nan
         ) as dst:
             dst.write(susceptibility_map, 1)
+            # 建立金字塔，快视图渲染时直接读取概览层
+            dst.build_overviews(_overview_factors(*susceptibility_map.shape), Resampling.average)
+            dst.update_tags(ns='rio_overview', resampling='average')
         print(f"✓ TIF文件已保存: {tif_path}")
         
         # 2. 导出CSV文件
@@ -366,19 +1465,180 @@ class LandslideSusceptibility:
             
             # 写入评估指标
             y_test_pred = self.model.predict(self.X_test)
-            y_test_proba = self.model.predict_proba(self.X_test)[:, 1]
-            
+            y_test_proba = self.y_test_proba
+            if y_test_proba is None:
+                y_test_proba = self.model.predict_proba(self.X_test)[:, 1]
+
             f.write("模型性能指标:\n")
             f.write(f"准确率: {accuracy_score(self.y_test, y_test_pred):.4f}\n")
             f.write(f"精确率: {precision_score(self.y_test, y_test_pred):.4f}\n")
             f.write(f"召回率: {recall_score(self.y_test, y_test_pred):.4f}\n")
             f.write(f"F1分数: {f1_score(self.y_test, y_test_pred):.4f}\n")
             f.write(f"AUC: {roc_auc_score(self.y_test, y_test_proba):.4f}\n")
-        
+
+            # 写入因子重要性排名
+            if self.factor_importance is not None:
+                f.write("\n因子重要性 (置换重要性, AUC下降值):\n")
+                for _, row in self.factor_importance.iterrows():
+                    f.write(f"{row['排名']}. {row['因子']}: {row['重要性均值']:.4f} ± {row['重要性标准差']:.4f}\n")
+
         print(f"✓ 评价报告已保存: {report_path}")
+
+        # 4. 导出因子重要性表及模型文件
+        if self.factor_importance is not None:
+            importance_path = output_path / 'factor_importance.csv'
+            self.factor_importance.to_csv(importance_path, index=False, encoding='utf-8-sig')
+            print(f"✓ 因子重要性已保存: {importance_path}")
+
+        self.save_model(output_path / 'model.joblib')
         print("\n所有结果导出完成！")
 
 
+class SusceptibilityQueryService:
+    """常驻点查询服务 - 模型与内存映射因子栈保持加载状态"""
+
+    def __init__(self, lsa, stack_path, latency_window=10000):
+        self.model = lsa.model
+        self.scaler = lsa.scaler
+        self.inverse_transform = ~lsa.factors[0]['transform']
+        self.stack = np.load(stack_path, mmap_mode='r')
+        _, self.rows, self.cols = self.stack.shape
+
+        # 因子栈各层须与模型的特征顺序一一对应
+        factor_names = lsa.model_factor_names or lsa.factor_names
+        if lsa.factor_names != factor_names:
+            raise ValueError(f"已加载的因子顺序 {lsa.factor_names} 与模型 {factor_names} 不一致")
+        names_path = _stack_names_path(stack_path)
+        if os.path.exists(names_path):
+            with open(names_path, encoding='utf-8') as f:
+                stack_names = json.load(f)
+            if stack_names != factor_names:
+                raise ValueError(f"因子栈的层顺序 {stack_names} 与模型 {factor_names} 不一致，"
+                                 "请重新运行 build_factor_stack")
+        if self.stack.shape[0] != len(factor_names):
+            raise ValueError(f"因子栈有 {self.stack.shape[0]} 层，模型需要 {len(factor_names)} 个因子")
+
+        # 单点批量查询时，joblib 并行调度的开销远大于预测本身。
+        # 在浅拷贝上修改 (共享已训练的参数)，不影响 lsa 中模型的批量/分块预测并行度
+        if hasattr(self.model, 'n_jobs'):
+            self.model = copy.copy(self.model)
+            self.model.n_jobs = 1
+
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=latency_window)
+        self.request_count = 0
+        self.point_count = 0
+        self.error_count = 0
+        self.started = time.time()
+
+        # 预热: 首次预测会触发惰性初始化
+        self.model.predict_proba(np.zeros((1, self.stack.shape[0])))
+
+    def query(self, points):
+        """
+        查询一批坐标的易发性
+
+        Parameters:
+        -----------
+        points : list
+            [[x, y], ...] 坐标列表 (与因子栅格同一坐标系)
+
+        Returns:
+        --------
+        ndarray
+            各点易发性概率，范围外或NoData处为NaN
+        """
+        coords = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        cols, rows = self.inverse_transform * (coords[:, 0], coords[:, 1])
+        rows = np.floor(rows).astype(np.int64)
+        cols = np.floor(cols).astype(np.int64)
+        inside = (rows >= 0) & (rows < self.rows) & (cols >= 0) & (cols < self.cols)
+
+        values = np.full((len(coords), self.stack.shape[0]), np.nan)
+        values[inside] = self.stack[:, rows[inside], cols[inside]].T
+
+        result = np.full(len(coords), np.nan)
+        valid = ~np.isnan(values).any(axis=1)
+        if valid.any():
+            result[valid] = self.model.predict_proba(self.scaler.transform(values[valid]))[:, 1]
+        return result
+
+    def record(self, n_points, latency, error=False):
+        """记录一次请求的统计信息"""
+        with self.lock:
+            self.request_count += 1
+            self.point_count += n_points
+            self.error_count += int(error)
+            self.latencies.append(latency)
+
+    def metrics(self):
+        """返回请求数、点数、错误数及延迟分位数"""
+        with self.lock:
+            latencies = np.asarray(self.latencies) * 1000
+            metrics = {
+                'uptime_s': round(time.time() - self.started, 1),
+                'requests': self.request_count,
+                'points': self.point_count,
+                'errors': self.error_count
+            }
+        if len(latencies):
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            metrics.update(latency_ms_p50=round(p50, 3), latency_ms_p95=round(p95, 3),
+                           latency_ms_p99=round(p99, 3), latency_ms_max=round(latencies.max(), 3))
+        return metrics
+
+
+class _QueryRequestHandler(BaseHTTPRequestHandler):
+    """点查询服务的HTTP请求处理"""
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == '/metrics':
+            self._send_json(200, service.metrics())
+        elif self.path == '/health':
+            self._send_json(200, {'status': 'ok'})
+        else:
+            self._send_json(404, {'error': f"未知路径: {self.path}"})
+
+    def do_POST(self):
+        service = self.server.service
+        if self.path != '/query':
+            self._send_json(404, {'error': f"未知路径: {self.path}"})
+            return
+
+        start = time.perf_counter()
+        n_points = 0
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            points = body['points']
+            n_points = len(points)
+            result = service.query(points)
+        except Exception as e:
+            service.record(n_points, time.perf_counter() - start, error=True)
+            self._send_json(400, {'error': str(e)})
+            return
+
+        susceptibility = [None if np.isnan(value) else round(float(value), 6) for value in result]
+        service.record(n_points, time.perf_counter() - start)
+        self._send_json(200, {'susceptibility': susceptibility})
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # Unix socket 连接没有客户端地址
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        # 高频查询时不逐条打印访问日志，统计见 /metrics
+        pass
+
+
 def main():
     """主函数 - 示例使用流程"""
     
@@ -420,12 +1680,34 @@ def main():
     # lsa.train_model('gradient_boost', n_estimators=100, learning_rate=0.1)
     # lsa.train_model('neural_network', hidden_layers=(100, 50))
     
-    # 6. 预测易发性
+    # 样本量超出内存时，可改用外存增量训练:
+    # chunk_files = lsa.write_sample_chunks('samples', chunk_rows=1_000_000)
+    # lsa.train_model_incremental(chunk_files, 'sgd_logistic', epochs=5, memory_budget_mb=256)
+    
+    # 6. 因子重要性分析
+    lsa.compute_factor_importance(n_repeats=10)
+    
+    # 7. 预测易发性
     susceptibility_map, reference = lsa.predict_susceptibility()
     
-    # 7. 导出结果
+    # 大范围研究区可改用分块流水线预测 (结果直接写入 output/susceptibility_map.tif):
+    # lsa.predict_susceptibility_tiled(output_dir='output', block_size=512, prefetch=2)
+    # 随机森林可同时输出各树预测的标准差 (output/susceptibility_uncertainty.tif):
+    # lsa.predict_susceptibility_tiled(output_dir='output', with_uncertainty=True)
+    
+    # 8. 导出结果
     lsa.export_results(susceptibility_map, reference, output_dir='output')
     
+    # 9. 生成快视图
+    lsa.render_quicklooks(output_dir='output')
+    
+    # 10. 按乡镇统计易发性 (可选)
+    # lsa.compute_zonal_statistics('C:/Users/lenovo/Desktop/训练/乡镇界线.shp', output_dir='output')
+    
+    # 11. 常驻点查询服务 (可选，可在单独进程中加载 output/model.joblib 后启动)
+    # lsa.build_factor_stack('output/factor_stack.npy')
+    # lsa.serve_point_queries('output/factor_stack.npy', port=8765)
+    
     print("\n" + "="*50)
     print("滑坡易发性评价完成！")
     print("="*50)